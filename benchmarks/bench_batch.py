@@ -0,0 +1,92 @@
+"""
+Benchmark de las recomendaciones por lotes y del micro-batching de los endpoints GET.
+
+- funciones: recomendaciones de N usuarios (y N juegos) con una llamada por ID frente a una sola llamada por lotes,
+  comprobando que los resultados son idénticos.
+- micro-batching: C peticiones GET concurrentes a /recomendacion-usuario contra la aplicación en proceso (ASGI),
+  sin micro-batching y con una ventana de MICRO_BATCH_MS milisegundos.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_batch.py --usuarios 5000 --concurrencia 200
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+# Añadir el directorio de los módulos a sys.path
+sys.path.append("./src/data")
+sys.path.append("./src/models")
+sys.path.append("./src/features")
+
+from artifacts import load_model
+from modelos import recomendacion_juego, recomendacion_juego_batch, recomendacion_usuario, recomendacion_usuario_batch
+
+# Peticiones concurrentes contra la aplicación en proceso; imprime peticiones por segundo y el tamaño medio de lote
+MICRO_BATCH_CODE = '''
+import asyncio, sys, time
+import httpx
+import main
+
+async def run(user_ids):
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://api') as client:
+        await client.get(f'/recomendacion-usuario/{user_ids[0]}')
+        inicio = time.perf_counter()
+        await asyncio.gather(*[client.get(f'/recomendacion-usuario/{user_id}') for user_id in user_ids])
+        return time.perf_counter() - inicio
+
+user_ids = list(main.registry.model.user_neighbors.user_index)[:int(sys.argv[1])]
+segundos = asyncio.run(run(user_ids))
+lote = main.user_batchers['first'].stats()['tamano_medio'] if main.user_batchers else 1.0
+print(len(user_ids) / segundos, lote)
+'''
+
+
+def timed(function, *args, **kwargs):
+    inicio = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models-dir', default='./models')
+    parser.add_argument('--usuarios', type=int, default=5000)
+    parser.add_argument('--concurrencia', type=int, default=200)
+    parser.add_argument('--ventanas-ms', type=float, nargs='+', default=[2, 10])
+    args = parser.parse_args()
+
+    model = load_model(args.models_dir)
+    user_ids = list(model.user_neighbors.user_index)[:args.usuarios]
+    item_ids = model.df_item['item_id'].tolist()[:args.usuarios]
+
+    print(f"{'caso':>28} {'IDs':>7} {'uno a uno s':>12} {'lote s':>8} {'aceleración':>12} {'iguales':>8}")
+    for scoring in ('first', 'weighted'):
+        single, single_s = timed(lambda: [recomendacion_usuario(user_id, model.user_items, model.user_neighbors,
+                                                                scoring=scoring) for user_id in user_ids])
+        batch, batch_s = timed(recomendacion_usuario_batch, user_ids, model.user_items, model.user_neighbors,
+                               scoring=scoring)
+        print(f"{'usuarios ' + scoring:>28} {len(user_ids):>7} {single_s:>12.3f} {batch_s:>8.3f} "
+              f"{single_s / batch_s:>11.1f}x {str(single == batch):>8}")
+    single, single_s = timed(lambda: [recomendacion_juego(item_id, model.df_item, model.item_neighbors)
+                                      for item_id in item_ids])
+    batch, batch_s = timed(recomendacion_juego_batch, item_ids, model.df_item, model.item_neighbors)
+    print(f"{'juegos':>28} {len(item_ids):>7} {single_s:>12.3f} {batch_s:>8.3f} "
+          f"{single_s / batch_s:>11.1f}x {str(single == batch):>8}")
+
+    print(f"\n{'micro-batching':>28} {'pet/s':>10} {'lote medio':>11}")
+    for ventana in [0] + args.ventanas_ms:
+        env = dict(os.environ, MODELS_DIR=args.models_dir, MICRO_BATCH_MS=str(ventana))
+        output = subprocess.run([sys.executable, '-c', MICRO_BATCH_CODE, str(args.concurrencia)], env=env,
+                                capture_output=True, text=True, check=True).stdout
+        throughput, lote = map(float, output.strip().splitlines()[-1].split())
+        nombre = 'desactivado' if ventana == 0 else f'{ventana:g} ms'
+        print(f"{nombre:>28} {throughput:>10.0f} {lote:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
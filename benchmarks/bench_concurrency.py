@@ -0,0 +1,153 @@
+"""
+Prueba de concurrencia: peticiones mixtas en paralelo contra la API y latencia de cola por tipo de endpoint.
+
+Se inicia la API con serve.py (un worker) y varios hilos envían durante unos segundos una mezcla de peticiones:
+
+- consultas: los endpoints de agregados (baratos);
+- item y usuario: los endpoints GET de recomendación;
+- lote: POST /recomendacion-usuario/batch con muchos usuarios (caro).
+
+Se reportan, por tipo, el número de peticiones, las respuestas 503 y los percentiles p50/p95/p99 y el máximo de
+latencia de las respuestas 200. Si el trabajo de CPU se hiciera en el bucle de eventos, la latencia de las
+consultas crecería hasta la de los lotes; con el pool acotado las consultas siguen respondiendo rápido y, cuando
+el pool se satura, las recomendaciones reciben 503 de inmediato. El código de salida es 1 si alguna respuesta
+no es 200 ni 503, o si el p99 de las consultas supera --max-p99-consultas-ms.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_concurrency.py --hilos 32 --segundos 10 --cpu-workers 2 --cpu-queue 8
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+# Añadir el directorio de los módulos a sys.path
+sys.path.append("./src/data")
+sys.path.append("./src/models")
+sys.path.append("./src/features")
+sys.path.append("./benchmarks")
+
+from artifacts import load_model
+from bench_workers import wait_ready
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, q):
+    """
+    Percentil q (0-100) de una lista de valores, por el método del rango más cercano.
+    """
+    values = sorted(values)
+    if not values:
+        return float('nan')
+    return values[min(len(values) - 1, max(0, int(round(q / 100 * len(values) + 0.5)) - 1))]
+
+
+def requests_mix(model, lote):
+    """
+    Devuelve las peticiones de cada tipo como (método, ruta, cuerpo).
+    """
+    user_ids = list(model.user_neighbors.user_index)
+    item_ids = model.df_item['item_id'].tolist()
+    consultas = [('GET', path, None) for path in (
+        '/playtime-genre/Action', '/user-for-genre/Indie', '/users-recommend/2015',
+        '/users-worst-developer/2015', '/sentiment-analysis/Valve')]
+    return {
+        'consultas': consultas,
+        'item': [('GET', f'/recomendacion-item/{item_id}', None) for item_id in item_ids[:500]],
+        'usuario': [('GET', f'/recomendacion-usuario/{user_id}', None) for user_id in user_ids[:500]],
+        'lote': [('POST', '/recomendacion-usuario/batch',
+                  json.dumps({'user_ids': random.Random(i).sample(user_ids, min(lote, len(user_ids)))}))
+                 for i in range(4)],
+    }
+
+
+def run_load(port, mix, weights, hilos, segundos):
+    """
+    Envía peticiones desde 'hilos' hilos durante 'segundos'. Devuelve {tipo: [(estado, segundos), ...]}.
+    """
+    kinds = list(mix)
+    results = {kind: [] for kind in kinds}
+    lock = threading.Lock()
+    fin = time.perf_counter() + segundos
+
+    def worker(seed):
+        rng = random.Random(seed)
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=120)
+        while time.perf_counter() < fin:
+            kind = rng.choices(kinds, weights=[weights[k] for k in kinds])[0]
+            method, path, body = rng.choice(mix[kind])
+            headers = {'Content-Type': 'application/json'} if body else {}
+            inicio = time.perf_counter()
+            connection.request(method, path, body=body, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            with lock:
+                results[kind].append((response.status, time.perf_counter() - inicio))
+
+    threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(hilos)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models-dir', default='./models')
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--hilos', type=int, default=32)
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--lote', type=int, default=2000, help='usuarios por petición de lote')
+    parser.add_argument('--cpu-workers', type=int, default=None)
+    parser.add_argument('--cpu-queue', type=int, default=None)
+    parser.add_argument('--max-p99-consultas-ms', type=float, default=None)
+    args = parser.parse_args()
+
+    model = load_model(args.models_dir)
+    mix = requests_mix(model, args.lote)
+    del model
+    weights = {'consultas': 4, 'item': 3, 'usuario': 3, 'lote': 1}
+
+    env = dict(os.environ, MODELS_DIR=args.models_dir)
+    if args.cpu_workers is not None:
+        env['CPU_WORKERS'] = str(args.cpu_workers)
+    if args.cpu_queue is not None:
+        env['CPU_QUEUE'] = str(args.cpu_queue)
+    server = subprocess.Popen([sys.executable, 'serve.py', '--workers', '1', '--port', str(args.port),
+                               '--models-dir', args.models_dir], env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_ready(args.port, 600)
+        results = run_load(args.port, mix, weights, args.hilos, args.segundos)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    failed = False
+    print(f"{'tipo':>10} {'pet':>7} {'503':>6} " + ' '.join(f"{'p%d ms' % q:>9}" for q in PERCENTILES)
+          + f" {'máx ms':>9}")
+    for kind, samples in results.items():
+        ok = [seconds * 1000 for status, seconds in samples if status == 200]
+        rejected = sum(status == 503 for status, _ in samples)
+        failed |= any(status not in (200, 503) for status, _ in samples)
+        print(f"{kind:>10} {len(samples):>7} {rejected:>6} "
+              + ' '.join(f"{percentile(ok, q):>9.1f}" for q in PERCENTILES) + f" {max(ok, default=0):>9.1f}")
+
+    p99 = percentile([s * 1000 for status, s in results['consultas'] if status == 200], 99)
+    if args.max_p99_consultas_ms is not None and p99 > args.max_p99_consultas_ms:
+        print(f"p99 de las consultas {p99:.1f} ms > {args.max_p99_consultas_ms} ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,227 @@
+"""
+Prueba del pipeline ETL (src/data/make_dataset.py): resultado frente a los notebooks y memoria frente al tamaño.
+
+Genera archivos originales sintéticos con el formato de los de STEAM (steam_games.json en JSON, user_reviews.json
+y users_items.json como diccionarios de Python, reseñas con apóstrofes, fechas no interpretables, precios en
+texto, juegos sin géneros, usuarios sin juegos y líneas nulas) en varias escalas, y para cada una:
+
+- ejecuta el pipeline en un proceso nuevo y reporta el tiempo, el tamaño de los archivos y la memoria residente
+  máxima;
+- con --verificar, calcula el dataset con el código de los notebooks 1.0 y 2.0 (todo en memoria) y comprueba que
+  el del pipeline es igual, fila por fila.
+
+En las escalas, los usuarios sin reseñas y los juegos de cada usuario crecen con el factor y las reseñas no, de
+modo que el archivo de items (el más grande) crece. Con --escalar-resenas también crecen los usuarios con
+reseñas, y con ellos las claves (user_id, item_id) distintas que el pipeline debe unir y deduplicar; el pipeline
+usa particiones de --particion-mb MB de reseñas, así que en ambos casos la memoria del pipeline debería
+mantenerse casi constante. El código de salida es 1 si algún dataset difiere.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_etl.py --usuarios 2000 --escalas 1 4 16 --verificar
+    python benchmarks/bench_etl.py --usuarios 20000 --escalas 1 4 16 --escalar-resenas --particion-mb 0.5
+"""
+
+import argparse
+import ast
+import json
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+GENRES = ['Action', 'Indie', 'Adventure', 'RPG', 'Strategy', 'Simulation', 'Casual', 'Sports', 'Racing']
+DEVELOPERS = ['Valve', 'Ubisoft', 'Tripwire Interactive', 'Hopoo Games, LLC', 'Bethesda', 'CD PROJEKT RED']
+DATES = ['2018-01-04', '2017-07-24', '2014-05-20', '2009-03-12', 'Soon..', 'Jan 2018', None]
+PRICES = [4.99, 9.99, 19.99, 0.99, 'Free To Play', 'Free', 'Third-party', None]
+REVIEWS = ["Simple yet with great replayability.", "I don't like it, it's terrible and boring.",
+           "It's \"ok\" I guess", "Best game ever! Great fun.", "Awful.", "meh", "Worst purchase, bad bad bad",
+           "Nice graphics and a good story"]
+
+
+def generate(raw_dir, usuarios, juegos, escala, seed=0, escalar_resenas=False):
+    """
+    Escribe los tres archivos originales sintéticos en raw_dir (con usuarios * escala usuarios con reseñas si
+    escalar_resenas).
+    """
+    rng = random.Random(seed)
+    if escalar_resenas:
+        usuarios, escala = usuarios * escala, 1
+    os.makedirs(raw_dir, exist_ok=True)
+    item_ids = [str(10 + 10 * i) for i in range(juegos)]
+
+    with open(os.path.join(raw_dir, 'steam_games.json'), 'w', encoding='utf-8') as file:
+        for i in range(juegos // 50):
+            file.write(json.dumps({'publisher': float('nan'), 'genres': float('nan'), 'id': float('nan')}) + '\n')
+        for i, item_id in enumerate(item_ids):
+            genres = rng.sample(GENRES, rng.choice([0, 1, 1, 2, 3])) if i else ['Action']
+            record = {
+                'publisher': 'Pub', 'genres': genres or float('nan'), 'app_name': f'Juego {i}',
+                'title': f'Juego {i}', 'url': 'http://store', 'release_date': DATES[0] if i == 0 else rng.choice(DATES),
+                'tags': ['Action'], 'reviews_url': 'http://reviews', 'specs': ['Single-player'],
+                'price': rng.choice(PRICES), 'early_access': False, 'id': item_id,
+                'developer': rng.choice(DEVELOPERS + [None]),
+            }
+            file.write(json.dumps(record) + '\n')
+
+    reviewed = {}
+    with open(os.path.join(raw_dir, 'user_reviews.json'), 'w', encoding='utf-8') as file:
+        for u in range(usuarios):
+            user_id = str(76561197970982479 + u) if u % 3 == 0 else f'user_{u}'
+            items = rng.sample(item_ids, rng.randint(0, 3))
+            reviewed[user_id] = items
+            reviews = [{'funny': '', 'posted': 'Posted November 5, 2011.', 'last_edited': '', 'item_id': item_id,
+                        'helpful': 'No ratings yet', 'recommend': rng.random() < 0.8,
+                        'review': rng.choice(REVIEWS)} for item_id in items]
+            file.write(str({'user_id': user_id, 'user_url': f'http://steamcommunity.com/id/{user_id}',
+                            'reviews': reviews}) + '\n')
+
+    with open(os.path.join(raw_dir, 'users_items.json'), 'w', encoding='utf-8') as file:
+        reviewers = list(reviewed)
+        for u in range(usuarios * escala):
+            user_id = reviewers[u] if u < usuarios else f'sin_resena_{u}'
+            owned = set(reviewed.get(user_id, [])[:2]) | set(rng.sample(item_ids, rng.randint(0, 20 * escala)))
+            items = [{'item_id': item_id, 'item_name': 'x', 'playtime_forever': rng.randint(0, 5000),
+                      'playtime_2weeks': 0} for item_id in owned]
+            file.write(str({'user_id': user_id, 'items_count': len(items), 'steam_id': '7656',
+                            'user_url': 'http://steamcommunity.com', 'items': items}) + '\n')
+
+
+def reference_dataset(raw_dir, work_dir):
+    """
+    Dataset calculado con el código de los notebooks 1.0 y 2.0, cargando los archivos completos en memoria.
+    """
+    sys.path.append("./src/features")
+    from sentiment import classify_sentiment
+
+    def is_nan(value):
+        return math.isnan(value) if isinstance(value, float) else False
+
+    cleaned = os.path.join(work_dir, 'cleaned_steam_games.json')
+    with open(os.path.join(raw_dir, 'steam_games.json'), encoding='utf-8') as input_file, \
+            open(cleaned, 'w', encoding='utf-8') as output_file:
+        for line in input_file:
+            record = json.loads(line)
+            if not all(is_nan(value) for value in record.values()):
+                json.dump(record, output_file)
+                output_file.write('\n')
+    data = pd.read_json(cleaned, lines=True)
+    data['genres'] = data['genres'].apply(lambda x: x if isinstance(x, list) else [])
+    data['release_date'] = pd.to_datetime(data['release_date'], errors='coerce')
+    data['release_year'] = data['release_date'].dt.year.fillna(0).astype(int)
+    df_games = data.explode('genres').reset_index(drop=True)
+    df_games = df_games.drop(['publisher', 'title', 'url', 'release_date', 'tags', 'reviews_url', 'specs',
+                              'early_access'], axis=1)
+    df_games = df_games.dropna(subset=['genres', 'release_year', 'developer'])
+    df_games.to_csv(os.path.join(work_dir, 'games.csv'), index=False)
+
+    with open(os.path.join(raw_dir, 'user_reviews.json')) as file:
+        content = file.read()
+    content = content.replace("\'", "\"").replace(" True", " true").replace(" False", " false")
+    content = re.sub(r'(?<!\\)"(?=[^"]*"[^"]*":)', '\\"', content)
+    patterns = {field: re.compile(rf'"{field}":\s*"([^"]+?)"(?=\s*,|\s*}})')
+                for field in ['user_id', 'user_url', 'item_id', 'posted', 'review']}
+    extracted, current = [], {}
+    for line in content.split('\n'):
+        matches = {field: pattern.search(line) for field, pattern in patterns.items()}
+        for field, match in matches.items():
+            if match:
+                current[field] = match.group(1).rstrip('\\')
+        if matches['review']:
+            extracted.append(current.copy())
+            current.clear()
+    df_reviews = pd.DataFrame(extracted)
+    df_reviews['sentiment'] = df_reviews['review'].apply(classify_sentiment)
+    df_reviews = df_reviews.drop(['user_url', 'posted', 'review'], axis=1)
+    df_reviews.to_csv(os.path.join(work_dir, 'reviews.csv'), index=False)
+
+    with open(os.path.join(raw_dir, 'users_items.json'), encoding='utf-8') as file:
+        df = pd.DataFrame([ast.literal_eval(line) for line in file.readlines()])
+    exploded_df = df.explode('items')
+    df_users = pd.concat([exploded_df.drop(['items'], axis=1), exploded_df['items'].apply(pd.Series)], axis=1)
+    df_users = df_users.drop(['steam_id', 'user_url', 'item_name', 'playtime_2weeks', 0], axis=1, errors='ignore')
+    df_users.to_csv(os.path.join(work_dir, 'items.csv'), index=False)
+
+    steam_games_df = pd.read_csv(os.path.join(work_dir, 'games.csv'))
+    users_reviews_df = pd.read_csv(os.path.join(work_dir, 'reviews.csv'), dtype={'user_id': str})
+    users_items_df = pd.read_csv(os.path.join(work_dir, 'items.csv'), dtype={'user_id': str})
+    combined = pd.merge(users_reviews_df, users_items_df, on=['user_id', 'item_id'], how='inner')
+    steam_games_df.rename(columns={'id': 'item_id'}, inplace=True)
+    df_complete = pd.merge(combined, steam_games_df, on='item_id', how='left')
+    df_complete['sentiment'] = df_complete['sentiment'].fillna(1)
+    df_complete = df_complete.dropna(subset=['genres', 'release_year', 'playtime_forever'])
+    df_complete['price'] = df_complete['price'].fillna(0)
+    df_complete['price'] = pd.to_numeric(df_complete['price'], errors='coerce').fillna(0)
+    return df_complete.drop_duplicates().reset_index(drop=True)
+
+
+def normalized(df):
+    """
+    Dataset con tipos comparables: textos como str y números como float.
+    """
+    df = df.copy()
+    for column in ['user_id', 'genres', 'app_name', 'developer']:
+        df[column] = df[column].astype(str)
+    for column in ['item_id', 'sentiment', 'items_count', 'playtime_forever', 'price', 'release_year']:
+        df[column] = df[column].astype(float)
+    return df.reset_index(drop=True)
+
+
+def run_pipeline(raw_dir, work_dir, particion_mb):
+    """
+    Ejecuta el pipeline en un proceso nuevo. Devuelve (segundos, memoria residente máxima en MB, salida).
+    """
+    output = os.path.join(work_dir, 'dataset_full.csv')
+    code = ('import sys; sys.argv = sys.argv[:1] + sys.argv[2:]; import runpy; '
+            'module = runpy.run_module("src.data.make_dataset", run_name="__main__"); '
+            'print(module["peak_rss_mb"](), file=sys.stderr)')
+    inicio = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', code, '--', '--raw-dir', raw_dir, '--processed-dir',
+                             os.path.join(work_dir, 'processed'), '--output', output, '--chunk-size', '2000',
+                             '--sentiment-cache', os.path.join(work_dir, 'sentiment.sqlite'),
+                             '--particion-mb', str(particion_mb)],
+                            capture_output=True, text=True, check=True)
+    segundos = time.perf_counter() - inicio
+    peak = float(result.stderr.strip().splitlines()[-1])
+    return segundos, peak, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--usuarios', type=int, default=2000, help='usuarios con reseñas')
+    parser.add_argument('--juegos', type=int, default=3000)
+    parser.add_argument('--escalas', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--verificar', action='store_true', help='compara con el código de los notebooks')
+    parser.add_argument('--escalar-resenas', action='store_true', help='los usuarios con reseñas crecen con la escala')
+    parser.add_argument('--particion-mb', type=float, default=0.25, help='MB de reseñas por partición del pipeline')
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'escala':>7} {'raw MB':>8} {'filas':>8} {'segundos':>9} {'RSS máx MB':>11} {'igual':>6}")
+    for escala in args.escalas:
+        with tempfile.TemporaryDirectory() as work_dir:
+            raw_dir = os.path.join(work_dir, 'raw')
+            generate(raw_dir, args.usuarios, args.juegos, escala, escalar_resenas=args.escalar_resenas)
+            raw_mb = sum(os.path.getsize(os.path.join(raw_dir, name)) for name in os.listdir(raw_dir)) / 2**20
+            segundos, peak, output = run_pipeline(raw_dir, work_dir, args.particion_mb)
+            dataset = pd.read_csv(output, dtype={'user_id': str})
+
+            igual = '-'
+            if args.verificar:
+                reference = reference_dataset(raw_dir, work_dir)
+                same = normalized(dataset).equals(normalized(reference))
+                igual = 'sí' if same else 'no'
+                failed |= not same
+            print(f"{escala:>7} {raw_mb:>8.1f} {len(dataset):>8} {segundos:>9.1f} {peak:>11.0f} {igual:>6}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
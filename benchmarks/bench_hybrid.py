@@ -0,0 +1,92 @@
+"""
+Benchmark de la recomendación híbrida frente a la recomendación usuario-ítem actual.
+
+Para N usuarios tomados al azar (con la semilla --semilla) mide la latencia p50/p95/p99 de una llamada por usuario
+de recomendacion_usuario ('first' y 'weighted') y de recomendacion_hibrida, y el tiempo de una sola llamada por
+lotes de cada una. También reporta qué fracción de las recomendaciones híbridas no aparece en las de usuario-ítem
+('weighted'), es decir, juegos que solo se recomiendan por contenido.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_hybrid.py --models-dir ./models --usuarios 500
+"""
+
+import argparse
+import random
+import sys
+import time
+
+# Añadir el directorio de los módulos a sys.path
+sys.path.append("./src/data")
+sys.path.append("./src/models")
+sys.path.append("./src/features")
+sys.path.append("./benchmarks")
+
+from artifacts import load_model
+from bench_concurrency import PERCENTILES, percentile
+from modelos import (recomendacion_hibrida, recomendacion_hibrida_batch, recomendacion_usuario,
+                     recomendacion_usuario_batch)
+
+
+def latencies(function, user_ids):
+    """
+    Resultados y latencias en milisegundos de una llamada por usuario.
+    """
+    results, samples = [], []
+    for user_id in user_ids:
+        inicio = time.perf_counter()
+        results.append(function(user_id))
+        samples.append((time.perf_counter() - inicio) * 1000)
+    return results, samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--models-dir', default='./models')
+    parser.add_argument('--usuarios', type=int, default=500)
+    parser.add_argument('--alpha', type=float, default=0.5)
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+
+    model = load_model(args.models_dir)
+    users = list(model.user_neighbors.user_index)
+    user_ids = random.Random(args.semilla).sample(users, min(args.usuarios, len(users)))
+    print(f"{len(users)} usuarios, {len(model.user_items.item_ids)} juegos, {len(user_ids)} consultas")
+
+    casos = {
+        'usuario first': (
+            lambda user_id: recomendacion_usuario(user_id, model.user_items, model.user_neighbors),
+            lambda ids: recomendacion_usuario_batch(ids, model.user_items, model.user_neighbors)),
+        'usuario weighted': (
+            lambda user_id: recomendacion_usuario(user_id, model.user_items, model.user_neighbors,
+                                                  scoring='weighted'),
+            lambda ids: recomendacion_usuario_batch(ids, model.user_items, model.user_neighbors, scoring='weighted')),
+        'híbrida': (
+            lambda user_id: recomendacion_hibrida(user_id, model.user_items, model.user_neighbors, model.item_tfidf,
+                                                  alpha=args.alpha),
+            lambda ids: recomendacion_hibrida_batch(ids, model.user_items, model.user_neighbors, model.item_tfidf,
+                                                    alpha=args.alpha)),
+    }
+
+    print(f"{'caso':>18} " + ' '.join(f"{'p%d ms' % q:>9}" for q in PERCENTILES) + f" {'lote s':>8} {'iguales':>8}")
+    resultados = {}
+    for nombre, (single, batch) in casos.items():
+        single(user_ids[0])
+        results, samples = latencies(single, user_ids)
+        inicio = time.perf_counter()
+        batch_results = batch(user_ids)
+        batch_s = time.perf_counter() - inicio
+        resultados[nombre] = results
+        print(f"{nombre:>18} " + ' '.join(f"{percentile(samples, q):>9.2f}" for q in PERCENTILES)
+              + f" {batch_s:>8.3f} {str(results == batch_results):>8}")
+
+    nuevos = total = 0
+    for hybrid, weighted in zip(resultados['híbrida'], resultados['usuario weighted']):
+        if isinstance(hybrid, list):
+            collaborative = {rec['item_id'] for rec in weighted}
+            nuevos += sum(rec['item_id'] not in collaborative for rec in hybrid)
+            total += len(hybrid)
+    print(f"\nRecomendaciones híbridas que no están en 'usuario weighted': {nuevos}/{total}")
+
+
+if __name__ == '__main__':
+    main()
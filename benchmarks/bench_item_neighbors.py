@@ -0,0 +1,108 @@
+"""
+Benchmark del sistema de recomendación ítem-ítem: matriz densa N x N contra el índice de K vecinos.
+
+Para cada tamaño de catálogo mide el pico de memoria durante la construcción (tracemalloc), el tamaño de la
+estructura que queda residente y la latencia media de una recomendación. El catálogo se escala replicando los
+juegos del dataset con nuevos item_id, manteniendo sus géneros y desarrolladores.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_item_neighbors.py --escalas 1 2 4 --consultas 200
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics.pairwise import cosine_similarity
+
+# Añadir el directorio de los módulos a sys.path
+sys.path.append("./src/models")
+sys.path.append("./src/features")
+
+from neighbors import build_item_neighbors
+from modelos import recomendacion_juego
+
+
+def catalogo_escalado(file_path, escala):
+    """
+    Devuelve un DataFrame con un registro por juego, replicado 'escala' veces con item_id nuevos.
+    """
+    df_item = pd.read_csv(file_path).drop_duplicates(subset='item_id')
+    copias = []
+    for i in range(escala):
+        copia = df_item.copy()
+        copia['item_id'] = copia['item_id'] + i * (df_item['item_id'].max() + 1)
+        copias.append(copia)
+    df_item = pd.concat(copias, ignore_index=True)
+    df_item['combined_features'] = df_item['genres'] + " " + df_item['developer']
+    return df_item
+
+
+def recomendacion_densa(item_id, df, cosine_sim):
+    """
+    Camino anterior: ordena la fila completa de la matriz densa para cada consulta.
+    """
+    idx = df.index[df['item_id'] == item_id].tolist()[0]
+    sim_scores = sorted(enumerate(cosine_sim[idx]), key=lambda x: x[1], reverse=True)[1:6]
+    return df.iloc[[i[0] for i in sim_scores]][['item_id', 'app_name']].to_dict('records')
+
+
+def medir(construir, consultar, item_ids):
+    """
+    Construye la estructura midiendo tiempo y pico de memoria, y luego mide la latencia media de las consultas.
+    """
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    estructura = construir()
+    construccion = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    inicio = time.perf_counter()
+    for item_id in item_ids:
+        consultar(item_id, estructura)
+    latencia = (time.perf_counter() - inicio) / len(item_ids)
+    return estructura, construccion, pico, latencia
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--file-path', default='./src/data/dataset_full.csv')
+    parser.add_argument('--escalas', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--consultas', type=int, default=200)
+    parser.add_argument('--k', type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'items':>8} {'ruta':>8} {'construcción s':>15} {'pico MB':>10} {'residente MB':>13} {'latencia ms':>12}")
+
+    for escala in args.escalas:
+        df_item = catalogo_escalado(args.file_path, escala)
+        tfidf_matrix = TfidfVectorizer(stop_words='english').fit_transform(df_item['combined_features'])
+        item_ids = rng.choice(df_item['item_id'].values, size=args.consultas)
+
+        densa, t_densa, pico_densa, lat_densa = medir(
+            lambda: cosine_similarity(tfidf_matrix),
+            lambda item_id, cosine_sim: recomendacion_densa(item_id, df_item, cosine_sim),
+            item_ids)
+        residente_densa = densa.nbytes
+        del densa
+
+        vecinos, t_vecinos, pico_vecinos, lat_vecinos = medir(
+            lambda: build_item_neighbors(tfidf_matrix, df_item['item_id'], k=args.k),
+            lambda item_id, item_neighbors: recomendacion_juego(item_id, df_item, item_neighbors),
+            item_ids)
+        residente_vecinos = vecinos.indices.nbytes + vecinos.scores.nbytes
+
+        n_items = len(df_item)
+        for ruta, t, pico, residente, lat in [('densa', t_densa, pico_densa, residente_densa, lat_densa),
+                                              ('top-k', t_vecinos, pico_vecinos, residente_vecinos, lat_vecinos)]:
+            print(f"{n_items:>8} {ruta:>8} {t:>15.2f} {pico / 2**20:>10.1f} {residente / 2**20:>13.1f} {lat * 1000:>12.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark de las consultas de agregación (POST /consulta) con índices invertidos frente a recorrer el dataset.
+
+Para cada consulta mide el tiempo de QueryIndex.query (con los índices ya construidos) y el de la misma consulta
+resuelta con máscaras booleanas sobre todas las filas y groupby de pandas, y verifica que ambos resultados
+coincidan. También reporta el tiempo de construcción y los bytes de los índices de cada dimensión.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_query_index.py --dataset ./src/data/dataset_full.csv --repeticiones 20
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+# Añadir el directorio de los módulos a sys.path
+sys.path.append("./src/data")
+sys.path.append("./src/features")
+
+from columnar import load_dataset
+from query_index import DIMENSIONS, QueryIndex
+
+# Consultas del benchmark: (filtros, dimensiones de agrupación, métrica)
+CONSULTAS = [
+    ({'genres': ['Action']}, ['release_year'], 'horas'),
+    ({'release_year': {'min': 2010, 'max': 2015}, 'sentiment': [2]}, ['genres'], 'filas'),
+    ({'developer': ['Valve', 'Ubisoft'], 'price': {'max': 20}}, ['developer', 'release_year'], 'usuarios'),
+    ({'genres': ['Indie'], 'sentiment': [0]}, ['price'], 'filas'),
+    ({}, ['developer'], 'horas'),
+]
+
+
+def escaneo(dataset, filters, group_by, metric):
+    """
+    La consulta con una máscara sobre todas las filas y groupby de pandas (sin rangos de precio al agrupar).
+    """
+    mask = np.ones(len(dataset), dtype=bool)
+    for dimension, condition in filters.items():
+        column = dataset[dimension]
+        if isinstance(condition, dict):
+            if condition.get('min') is not None:
+                mask &= (column >= np.asarray(condition['min'], dtype=column.dtype)).to_numpy()
+            if condition.get('max') is not None:
+                mask &= (column <= np.asarray(condition['max'], dtype=column.dtype)).to_numpy()
+        else:
+            mask &= column.isin(condition).to_numpy()
+    rows = dataset[mask]
+    grouped = rows.groupby(group_by, observed=True) if group_by else rows.groupby(np.zeros(len(rows)))
+    if metric == 'filas':
+        return grouped.size()
+    if metric == 'horas':
+        return grouped['playtime_forever'].sum()
+    return grouped['user_id'].nunique()
+
+
+def medir(function, repeticiones):
+    """
+    Resultado de la primera llamada y mediana en milisegundos de 'repeticiones' llamadas.
+    """
+    result = function()
+    samples = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - inicio) * 1000)
+    return result, float(np.median(samples))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--dataset', default='./src/data/dataset_full.csv')
+    parser.add_argument('--repeticiones', type=int, default=20)
+    args = parser.parse_args()
+
+    dataset = load_dataset(args.dataset)
+    index = QueryIndex(dataset)
+    print(f"{len(dataset)} filas")
+    for dimension in DIMENSIONS:
+        inicio = time.perf_counter()
+        built = index.index(dimension)
+        segundos = time.perf_counter() - inicio
+        nbytes = sum(array.nbytes for array in built if array.dtype != object)
+        print(f"índice {dimension:>12}: {len(built.values):>6} valores, {nbytes / 2**20:>7.1f} MB, {segundos:.3f} s")
+
+    print(f"\n{'consulta':>60} {'índice ms':>10} {'escaneo ms':>11} {'iguales':>8}")
+    for filters, group_by, metric in CONSULTAS:
+        result, indexed_ms = medir(lambda: list(index.query(filters, group_by, metric).rows), args.repeticiones)
+        expected, scan_ms = medir(lambda: escaneo(dataset, filters, group_by, metric), args.repeticiones)
+        if group_by != ['price']:
+            got = {tuple(row[dimension] for dimension in group_by): row[metric] for row in result}
+            expected = {(key if isinstance(key, tuple) else (key,)) if group_by else (): value
+                        for key, value in expected.items() if value or metric != 'horas'}
+            got = {key: value for key, value in got.items() if value or metric != 'horas'}
+            iguales = got.keys() == expected.keys() and all(np.isclose(got[key], expected[key]) for key in got)
+        else:
+            iguales = sum(row[metric] for row in result) == expected.sum()
+        nombre = f"{filters} / {','.join(group_by) or '-'} / {metric}"
+        print(f"{nombre[-60:]:>60} {indexed_ms:>10.2f} {scan_ms:>11.2f} {str(iguales):>8}")
+
+
+if __name__ == '__main__':
+    main()
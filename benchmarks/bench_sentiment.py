@@ -0,0 +1,102 @@
+"""
+Benchmark del análisis de sentimiento: reseñas por segundo según el número de procesos, con y sin caché.
+
+Genera reseñas sintéticas en inglés (con palabras positivas, negativas y neutrales, de largo variable) donde una
+fracción son textos cortos repetidos, como 'good game' o '10/10' en las reseñas de STEAM, y mide:
+
+- apply: classify_sentiment reseña por reseña con pandas.apply, como en el notebook;
+- procesos=N: SentimentScorer sin caché (deduplicación y pool de N procesos);
+- caché fría / caché caliente: SentimentScorer con caché en disco en la primera y en la segunda ejecución.
+
+Todas las variantes deben producir exactamente las mismas etiquetas que apply; el código de salida es 1 si alguna
+difiere.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_sentiment.py --resenas 20000 --procesos 1 2 4
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+# Añadir el directorio de los módulos a sys.path
+sys.path.append("./src/features")
+
+from sentiment import SentimentScorer, classify_sentiment
+
+POSITIVE = ['great', 'good', 'amazing', 'fun', 'beautiful', 'best', 'awesome', 'nice', 'excellent', 'perfect']
+NEGATIVE = ['bad', 'terrible', 'boring', 'awful', 'worst', 'broken', 'poor', 'horrible', 'ugly', 'stupid']
+NEUTRAL = ['game', 'the', 'story', 'graphics', 'play', 'i', 'it', 'with', 'friends', 'hours', 'and', 'but', 'is',
+           'was', 'not', 'really', 'very', 'this', 'steam', 'level', 'multiplayer', 'price']
+COMMON = ['good game', '10/10', 'great game', 'fun', 'bad', 'nice', 'best game ever', 'meh', 'nan', 'ok']
+
+
+def generate_reviews(n, repeated=0.3, seed=0):
+    """
+    Genera n reseñas sintéticas; una fracción 'repeated' son textos cortos frecuentes.
+    """
+    rng = random.Random(seed)
+    reviews = []
+    for _ in range(n):
+        if rng.random() < repeated:
+            reviews.append(rng.choice(COMMON))
+        else:
+            words = rng.choices(NEUTRAL, k=rng.randint(3, 80))
+            for _ in range(rng.randint(0, 4)):
+                words.insert(rng.randrange(len(words) + 1), rng.choice(POSITIVE + NEGATIVE))
+            reviews.append(' '.join(words).capitalize() + '.')
+    return reviews
+
+
+def measure(label, reviews, baseline, score, chunk_size):
+    """
+    Clasifica las reseñas por bloques con score(), imprime reseñas/s y devuelve si las etiquetas son iguales.
+    """
+    inicio = time.perf_counter()
+    labels = []
+    for start in range(0, len(reviews), chunk_size):
+        labels.extend(score(reviews[start:start + chunk_size]))
+    segundos = time.perf_counter() - inicio
+    same = baseline is None or labels == baseline
+    print(f"{label:>22} {segundos:>9.2f} {len(reviews) / segundos:>12.0f} {'sí' if same else 'no':>6}")
+    return labels, same
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--resenas', type=int, default=20000)
+    parser.add_argument('--repetidas', type=float, default=0.3, help='fracción de reseñas cortas repetidas')
+    parser.add_argument('--procesos', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--bloque', type=int, default=10000, help='reseñas por bloque, como en el pipeline ETL')
+    args = parser.parse_args()
+
+    reviews = generate_reviews(args.resenas, args.repetidas)
+    print(f"{len(reviews)} reseñas, {len(set(reviews))} distintas, {os.cpu_count()} CPUs")
+    print(f"{'variante':>22} {'segundos':>9} {'reseñas/s':>12} {'igual':>6}")
+
+    baseline, _ = measure('apply', reviews, None, lambda chunk: pd.Series(chunk).apply(classify_sentiment).tolist(),
+                          args.bloque)
+    ok = True
+    for workers in args.procesos:
+        with SentimentScorer(workers=workers) as scorer:
+            ok &= measure(f'procesos={workers}', reviews, baseline, scorer.score, args.bloque)[1]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, 'sentiment.sqlite')
+        workers = max(args.procesos)
+        for label in ('caché fría', 'caché caliente'):
+            with SentimentScorer(cache_path, workers=workers) as scorer:
+                ok &= measure(f'{label} (p={workers})', reviews, baseline, scorer.score, args.bloque)[1]
+        print(f"caché en disco: {os.path.getsize(cache_path) / 2**20:.1f} MB")
+
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Benchmark de arranque: tiempo de carga y memoria residente del dataset antes y después del artefacto columnar, y
+tiempo hasta el primer byte de las comprobaciones de salud de la API.
+
+Cada escenario se ejecuta en un proceso nuevo para medir un arranque en frío:
+
+- csv: el camino anterior, dos lecturas del CSV con pd.read_csv (funciones.py y load_and_preprocess_data).
+- columnar: dos llamadas a load_dataset, que abren el artefacto mapeado en memoria y comparten la copia.
+- main: importar main.py completo (datos, agregados y modelos).
+- main-background: importar main.py con STARTUP_MODE=background (los datos se cargan después, en un hilo).
+
+Se reporta el tiempo de pared y la memoria residente (VmRSS) al terminar la carga. El artefacto se genera antes
+de medir, por lo que el escenario columnar no incluye la conversión que se hace una sola vez.
+
+Los escenarios main usan un directorio de modelos temporal con el modelo del dataset ya construido.
+
+Con --http se inicia además uvicorn con cada modo de arranque (eager y background) y se consulta /health/live
+cada 5 ms desde el lanzamiento del proceso y después /health/ready cada 100 ms (con un solo CPU, consultar más
+seguido retrasa la carga): se reporta el tiempo hasta el primer byte de la primera respuesta de liveness y hasta
+la primera respuesta 200 de readiness. Con --frio cada arranque usa un directorio de modelos vacío, por lo que
+incluye la construcción del modelo.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_startup.py --file-path ./src/data/dataset_full.csv --http --frio
+"""
+
+import argparse
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+# Añadir el directorio de los módulos a sys.path
+sys.path.append("./src/data")
+
+from columnar import load_dataset
+
+# Código de cada escenario; cada uno imprime el tiempo de carga en segundos y la memoria residente en bytes
+PRELUDE = '''
+import json, sys, time
+sys.path.append("./src/data")
+
+def rss():
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+import pandas as pd
+inicio = time.perf_counter()
+'''
+
+SCENARIOS = {
+    'csv': '''
+dataset = pd.read_csv(FILE_PATH)
+df = pd.read_csv(FILE_PATH)
+''',
+    'columnar': '''
+from columnar import load_dataset
+dataset = load_dataset(FILE_PATH)
+df = load_dataset(FILE_PATH)
+''',
+    'main': '''
+import main
+''',
+    'main-background': '''
+import os
+os.environ['STARTUP_MODE'] = 'background'
+import main
+''',
+}
+
+EPILOGUE = '''
+print(json.dumps({'segundos': time.perf_counter() - inicio, 'rss': rss()}))
+'''
+
+
+def run(scenario, file_path, models_dir):
+    """
+    Ejecuta un escenario en un proceso nuevo y devuelve sus mediciones.
+    """
+    code = PRELUDE + f'FILE_PATH = {file_path!r}\n' + SCENARIOS[scenario] + EPILOGUE
+    env = dict(os.environ, DATASET_PATH=file_path, MODELS_DIR=models_dir)
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True,
+                            env=env).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def get_status(port, path):
+    """
+    Hace GET a path y devuelve el estado, o None si el puerto todavía no acepta conexiones.
+    """
+    try:
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        connection.request('GET', path)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+    except OSError:
+        return None
+
+
+def run_http(mode, file_path, models_dir, timeout=600):
+    """
+    Inicia uvicorn con STARTUP_MODE=mode y mide los segundos desde el lanzamiento hasta la primera respuesta de
+    /health/live y hasta la primera respuesta 200 de /health/ready.
+    """
+    port = free_port()
+    env = dict(os.environ, STARTUP_MODE=mode, DATASET_PATH=file_path, MODELS_DIR=models_dir)
+    inicio = time.perf_counter()
+    server = subprocess.Popen([sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port),
+                               '--log-level', 'warning'], env=env)
+    live = ready = None
+    try:
+        while ready is None and time.perf_counter() - inicio < timeout:
+            if server.poll() is not None:
+                raise RuntimeError(f"uvicorn terminó con código {server.returncode}")
+            if live is None and get_status(port, '/health/live') is not None:
+                live = time.perf_counter() - inicio
+            if live is not None and get_status(port, '/health/ready') == 200:
+                ready = time.perf_counter() - inicio
+            time.sleep(0.005 if live is None else 0.1)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return live, ready
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--file-path', default='./src/data/dataset_full.csv')
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--escenarios', nargs='+', default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument('--http', action='store_true', help='mide /health/live y /health/ready con uvicorn')
+    parser.add_argument('--frio', action='store_true', help='construye el modelo en cada arranque HTTP')
+    args = parser.parse_args()
+
+    # Genera el artefacto (y su caché de agregados si se mide main) antes de medir
+    load_dataset(args.file_path)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        models_dir = os.path.join(tmp, 'models')
+        # Construye el modelo del dataset (y sus agregados) antes de medir
+        run('main', args.file_path, models_dir)
+
+        print(f"{'escenario':>16} {'carga s':>10} {'RSS MB':>10}")
+        for scenario in args.escenarios:
+            results = [run(scenario, args.file_path, models_dir) for _ in range(args.repeticiones)]
+            segundos = min(r['segundos'] for r in results)
+            rss = min(r['rss'] for r in results)
+            print(f"{scenario:>16} {segundos:>10.3f} {rss / 2**20:>10.1f}")
+
+        if not args.http:
+            return
+
+        print(f"\n{'arranque':>16} {'live s':>10} {'ready s':>10}  ({'frío' if args.frio else 'con modelo guardado'})")
+        for mode in ('eager', 'background'):
+            results = []
+            for _ in range(args.repeticiones):
+                if args.frio:
+                    shutil.rmtree(models_dir, ignore_errors=True)
+                results.append(run_http(mode, args.file_path, models_dir))
+            live = min(r[0] for r in results)
+            ready = min(r[1] for r in results)
+            print(f"{mode:>16} {live:>10.3f} {ready:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,360 @@
+"""
+Suite de benchmarks de la API y de los sistemas de recomendación, con datos escalados y resultados en JSON.
+
+Para cada escala (1 = dataset original; 10, 100, 1000 = dataset sintético de benchmarks/synthetic.py) se ejecuta
+un proceso nuevo con DATASET_PATH y MODELS_DIR temporales que mide:
+
+- micro: load_and_preprocess_data (carga y construcción completa del modelo), recomendacion_juego,
+  recomendacion_usuario y las cinco funciones *_func de funciones.py, con la latencia p50/p95/p99 de --consultas
+  llamadas con argumentos variados;
+- http: un generador de carga en el mismo proceso (httpx sobre ASGI, sin red) contra main.app que envía, para cada
+  endpoint, --peticiones peticiones con --concurrencia simultáneas y reporta peticiones/s, p50/p95/p99, errores y
+  la memoria residente máxima durante ese endpoint (VmHWM, reiniciado entre endpoints).
+
+La caché de respuestas se desactiva (RESPONSE_CACHE_MB=0) para medir el cálculo de cada petición, salvo con
+--con-cache. Cada escala tiene un límite de --timeout segundos: si el proceso falla o se agota el tiempo, se
+registra el error y se sigue con la siguiente escala, de modo que se ve en qué escala se rompe cada camino.
+
+Los resultados se guardan en --salida con los metadatos de la ejecución (commit, CPUs, versiones). Con --comparar
+se imprime la razón de cada métrica frente a un JSON anterior y el código de salida es 1 si algún p95 empeora (o
+algún rendimiento baja) más de --tolerancia.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_suite.py --escalas 1 10 100 --salida resultados/bench.json
+    python benchmarks/bench_suite.py --escalas 1 10 --comparar resultados/bench.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import quote
+
+import numpy as np
+
+# Añadir la raíz del repositorio (main.py y funciones.py) y los benchmarks a sys.path
+sys.path.append(".")
+sys.path.append("./benchmarks")
+
+from bench_concurrency import PERCENTILES, percentile
+from synthetic import scale_dataset
+
+
+def peak_rss_mb():
+    """
+    Memoria residente máxima del proceso en MB (VmHWM).
+    """
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith('VmHWM:'):
+                return int(line.split()[1]) / 1024
+    return float('nan')
+
+
+def reset_peak_rss():
+    """
+    Reinicia VmHWM a la memoria residente actual (Linux); si no se puede, la medición queda acumulada.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+    except OSError:
+        pass
+
+
+def summary(seconds):
+    """
+    Número de mediciones, media y percentiles en milisegundos.
+    """
+    ms = [s * 1000 for s in seconds]
+    result = {'n': len(ms), 'media_ms': float(np.mean(ms)) if ms else float('nan')}
+    result.update({f'p{q}_ms': percentile(ms, q) for q in PERCENTILES})
+    return result
+
+
+def timed(function, calls):
+    """
+    Ejecuta function(*args) para cada args de 'calls' y devuelve el resumen de latencias.
+    """
+    seconds = []
+    for args in calls:
+        inicio = time.perf_counter()
+        function(*args)
+        seconds.append(time.perf_counter() - inicio)
+    return summary(seconds)
+
+
+def micro_benchmarks(consultas, rng):
+    """
+    Micro-benchmarks de las funciones de carga, recomendación y consultas sobre DATASET_PATH.
+    """
+    sys.path.append("./src/data")
+    sys.path.append("./src/models")
+    sys.path.append("./src/features")
+    from columnar import load_dataset
+    from preprocessing import load_and_preprocess_data
+    from modelos import recomendacion_juego, recomendacion_usuario
+
+    file_path = os.environ['DATASET_PATH']
+    results = {}
+
+    # La primera carga incluye la conversión del CSV al artefacto columnar
+    results['load_dataset'] = timed(load_dataset, [(file_path,)])
+    results['load_and_preprocess_data'] = timed(load_and_preprocess_data, [(file_path,)])
+    _, df_item, item_neighbors, user_neighbors, user_items = load_and_preprocess_data(file_path)
+
+    item_ids = rng.sample(df_item['item_id'].tolist(), min(consultas, len(df_item)))
+    user_ids = rng.sample(list(user_neighbors.user_index), min(consultas, len(user_neighbors.user_index)))
+    results['recomendacion_juego'] = timed(recomendacion_juego,
+                                           [(item_id, df_item, item_neighbors) for item_id in item_ids])
+    results['recomendacion_usuario'] = timed(recomendacion_usuario,
+                                             [(user_id, user_items, user_neighbors) for user_id in user_ids])
+
+    # Al importar funciones se calculan (o se leen del disco) los agregados
+    inicio = time.perf_counter()
+    import funciones
+    results['agregados'] = summary([time.perf_counter() - inicio])
+    arguments = sample_arguments(funciones.aggregates, consultas, rng)
+    for name, key in [('PlayTimeGenre_func', 'genre'), ('UserForGenre_func', 'genre'),
+                      ('usersRecommend_func', 'year'), ('UsersWorstDeveloper_func', 'year'),
+                      ('SentimentAnalysis_func', 'developer')]:
+        results[name] = timed(getattr(funciones, name), [(value,) for value in arguments[key]])
+    return results
+
+
+def sample_arguments(aggregates, n, rng):
+    """
+    Géneros, años y desarrolladores de ejemplo, tomados de los agregados. Se omiten los nombres con '/', que no se
+    pueden pasar como parámetro de ruta.
+    """
+    def sample(values):
+        values = [value for value in values if '/' not in str(value)]
+        return [rng.choice(values) for _ in range(n)]
+
+    return {
+        'genre': sample(aggregates['genre_year_playtime']),
+        'year': [int(year) for year in sample(aggregates['year_app_positive'])],
+        'developer': sample(aggregates['developer_sentiment']),
+    }
+
+
+async def load_endpoint(client, requests_, concurrencia):
+    """
+    Envía las peticiones con 'concurrencia' simultáneas. Devuelve (latencias en segundos, errores, segundos).
+    """
+    semaphore = asyncio.Semaphore(concurrencia)
+    latencies, errors = [], 0
+
+    async def one(method, path, body):
+        nonlocal errors
+        async with semaphore:
+            inicio = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies.append(time.perf_counter() - inicio)
+            errors += response.status_code != 200
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*[one(*request) for request in requests_])
+    return latencies, errors, time.perf_counter() - inicio
+
+
+def http_benchmarks(peticiones, concurrencia, rng):
+    """
+    Carga HTTP en proceso contra main.app, endpoint por endpoint.
+    """
+    import httpx
+
+    inicio = time.perf_counter()
+    import main
+    results = {'arranque_api': {'segundos': time.perf_counter() - inicio, 'rss_max_mb': peak_rss_mb()}}
+
+    model = main.registry.model
+    arguments = sample_arguments(main.funciones.aggregates, peticiones, rng)
+    item_ids = model.df_item['item_id'].tolist()
+    user_ids = list(model.user_neighbors.user_index)
+    endpoints = {
+        'GET /playtime-genre': [('GET', f'/playtime-genre/{quote(g)}', None) for g in arguments['genre']],
+        'GET /user-for-genre': [('GET', f'/user-for-genre/{quote(g)}', None) for g in arguments['genre']],
+        'GET /users-recommend': [('GET', f'/users-recommend/{y}', None) for y in arguments['year']],
+        'GET /users-worst-developer': [('GET', f'/users-worst-developer/{y}', None) for y in arguments['year']],
+        'GET /sentiment-analysis': [('GET', f'/sentiment-analysis/{quote(d)}', None)
+                                    for d in arguments['developer']],
+        'GET /recomendacion-item': [('GET', f'/recomendacion-item/{rng.choice(item_ids)}', None)
+                                    for _ in range(peticiones)],
+        'GET /recomendacion-usuario': [('GET', f'/recomendacion-usuario/{quote(rng.choice(user_ids))}', None)
+                                       for _ in range(peticiones)],
+        'POST /recomendacion-usuario/batch': [
+            ('POST', '/recomendacion-usuario/batch', {'user_ids': rng.sample(user_ids, min(100, len(user_ids)))})
+            for _ in range(max(1, peticiones // 20))],
+    }
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://api', timeout=None) as client:
+            for name, requests_ in endpoints.items():
+                await client.request(*requests_[0][:2], json=requests_[0][2])
+                reset_peak_rss()
+                latencies, errors, seconds = await load_endpoint(client, requests_, concurrencia)
+                results[name] = dict(summary(latencies), errores=errors, peticiones_s=len(requests_) / seconds,
+                                     rss_max_mb=peak_rss_mb())
+
+    asyncio.run(run())
+    return results
+
+
+def run_worker(args):
+    """
+    Modo interno: mide una escala en este proceso e imprime el resultado como JSON en la última línea.
+    """
+    rng = random.Random(0)
+    result = {'micro': micro_benchmarks(args.consultas, rng)}
+    result['http'] = http_benchmarks(args.peticiones, args.concurrencia, rng)
+    result['rss_max_mb'] = peak_rss_mb()
+    print(json.dumps(result))
+
+
+def run_scale(escala, args, work_dir):
+    """
+    Prepara el dataset de una escala y lo mide en un proceso nuevo. Devuelve el resultado o el error.
+    """
+    result = {}
+    file_path = args.file_path
+    if escala > 1:
+        file_path = os.path.join(work_dir, f'dataset_x{escala}.csv')
+        if not os.path.exists(file_path):
+            inicio = time.perf_counter()
+            result['datos'] = scale_dataset(args.file_path, escala, file_path)
+            result['datos']['segundos'] = time.perf_counter() - inicio
+    result['dataset_mb'] = os.path.getsize(file_path) / 2**20
+
+    env = dict(os.environ, DATASET_PATH=file_path, MODELS_DIR=os.path.join(work_dir, f'models_x{escala}'))
+    if not args.con_cache:
+        env['RESPONSE_CACHE_MB'] = '0'
+    command = [sys.executable, __file__, '--worker', '--consultas', str(args.consultas),
+               '--peticiones', str(args.peticiones), '--concurrencia', str(args.concurrencia)]
+    inicio = time.perf_counter()
+    try:
+        process = subprocess.run(command, env=env, capture_output=True, text=True, timeout=args.timeout)
+    except subprocess.TimeoutExpired:
+        result['error'] = f'tiempo agotado ({args.timeout} s)'
+        return result
+    result['segundos'] = time.perf_counter() - inicio
+    if process.returncode != 0:
+        result['error'] = f'código {process.returncode}: ' + process.stderr.strip()[-2000:]
+        return result
+    result.update(json.loads(process.stdout.strip().splitlines()[-1]))
+    return result
+
+
+def metadata():
+    """
+    Datos de la ejecución para comparar resultados entre máquinas y versiones.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    import pandas as pd
+    return {'fecha': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'commit': commit, 'cpus': os.cpu_count(),
+            'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__,
+            'plataforma': platform.platform()}
+
+
+def print_results(results):
+    for escala, result in results['escalas'].items():
+        print(f"\nEscala {escala}x ({result.get('dataset_mb', 0):.0f} MB)")
+        if 'error' in result:
+            print(f"  error: {result['error'].splitlines()[-1] if result['error'] else ''}")
+            continue
+        print(f"  {'micro':<34} {'n':>5} " + ' '.join(f"{'p%d ms' % q:>9}" for q in PERCENTILES))
+        for name, stats in result['micro'].items():
+            print(f"  {name:<34} {stats['n']:>5} " + ' '.join(f"{stats['p%d_ms' % q]:>9.2f}" for q in PERCENTILES))
+        print(f"  {'http':<34} {'pet/s':>8} " + ' '.join(f"{'p%d ms' % q:>9}" for q in PERCENTILES)
+              + f" {'errores':>8} {'RSS MB':>8}")
+        for name, stats in result['http'].items():
+            if name == 'arranque_api':
+                print(f"  {'arranque de la API':<34} {stats['segundos']:>7.1f}s {'':>29} {'':>8} "
+                      f"{stats['rss_max_mb']:>8.0f}")
+                continue
+            print(f"  {name:<34} {stats['peticiones_s']:>8.0f} "
+                  + ' '.join(f"{stats['p%d_ms' % q]:>9.2f}" for q in PERCENTILES)
+                  + f" {stats['errores']:>8} {stats['rss_max_mb']:>8.0f}")
+
+
+def compare(results, previous, tolerance, min_ms=0.1):
+    """
+    Imprime la razón de p95 (y de peticiones/s) frente a una ejecución anterior. Devuelve True si hay regresiones.
+
+    Un p95 solo cuenta como regresión si además aumenta más de min_ms milisegundos, para ignorar el ruido de las
+    funciones que tardan microsegundos.
+    """
+    regression = False
+    print(f"\nComparación con {previous['meta'].get('commit')} ({previous['meta'].get('fecha')})")
+    for escala, result in results['escalas'].items():
+        before = previous['escalas'].get(escala)
+        if not before or 'error' in result or 'error' in before:
+            continue
+        for section in ('micro', 'http'):
+            for name, stats in result[section].items():
+                old = before[section].get(name)
+                if not old or 'p95_ms' not in stats or 'p95_ms' not in old:
+                    continue
+                ratio = stats['p95_ms'] / old['p95_ms'] if old['p95_ms'] else float('nan')
+                worse = ratio > 1 + tolerance and stats['p95_ms'] - old['p95_ms'] > min_ms
+                if 'peticiones_s' in stats and old.get('peticiones_s'):
+                    worse |= stats['peticiones_s'] < old['peticiones_s'] / (1 + tolerance)
+                regression |= worse
+                print(f"  {escala:>5}x {name:<34} p95 {old['p95_ms']:>9.2f} -> {stats['p95_ms']:>9.2f} ms "
+                      f"({ratio:>5.2f}x){'  REGRESIÓN' if worse else ''}")
+    return regression
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--file-path', default='./src/data/dataset_full.csv')
+    parser.add_argument('--escalas', type=int, nargs='+', default=[1, 10])
+    parser.add_argument('--consultas', type=int, default=200, help='llamadas por micro-benchmark')
+    parser.add_argument('--peticiones', type=int, default=500, help='peticiones por endpoint')
+    parser.add_argument('--concurrencia', type=int, default=16)
+    parser.add_argument('--timeout', type=float, default=1800, help='segundos máximos por escala')
+    parser.add_argument('--con-cache', action='store_true', help='mantiene la caché de respuestas activa')
+    parser.add_argument('--dir-trabajo', default=os.path.join(tempfile.gettempdir(), 'bench_suite'))
+    parser.add_argument('--salida', default=None, help='archivo JSON de resultados')
+    parser.add_argument('--comparar', default=None, help='JSON de una ejecución anterior')
+    parser.add_argument('--tolerancia', type=float, default=0.2, help='aumento relativo permitido')
+    parser.add_argument('--min-ms', type=float, default=0.1, help='aumento mínimo de p95 para contar una regresión')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    os.makedirs(args.dir_trabajo, exist_ok=True)
+    results = {'meta': dict(metadata(), parametros={k: v for k, v in vars(args).items() if k != 'worker'}),
+               'escalas': {}}
+    for escala in args.escalas:
+        results['escalas'][str(escala)] = run_scale(escala, args, args.dir_trabajo)
+    print_results(results)
+
+    if args.salida:
+        os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+        with open(args.salida, 'w', encoding='utf-8') as file:
+            json.dump(results, file, ensure_ascii=False, indent=2)
+        print(f"\nResultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as file:
+            previous = json.load(file)
+        if compare(results, previous, args.tolerancia, args.min_ms):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
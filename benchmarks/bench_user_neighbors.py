@@ -0,0 +1,93 @@
+"""
+Reporte de recall y latencia de la búsqueda de usuarios similares: modo exacto contra modo aproximado (LSH).
+
+Para una muestra de usuarios calcula los k vecinos exactos y los aproximados y reporta el recall@k. Como muchos
+usuarios comparten exactamente el mismo perfil de géneros, el recall se mide por puntuación: un vecino aproximado
+cuenta como acierto si su similitud es al menos la k-ésima similitud exacta (es igual de bueno que el vecino
+exacto con el que empata). También reporta la memoria del motor frente a la matriz densa usuarios x usuarios
+que se usaba antes.
+
+Con --usuarios-sinteticos se agregan perfiles aleatorios (mezclas Dirichlet de pocos géneros) para ver el
+comportamiento con poblaciones más grandes que la del dataset.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_user_neighbors.py --k 50 --muestra 300 --usuarios-sinteticos 200000
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Añadir el directorio de los módulos a sys.path
+sys.path.append("./src/features")
+
+from neighbors import UserNeighbors, build_user_lsh, build_user_profiles, similar_users
+
+
+def perfiles_sinteticos(n_usuarios, n_generos, rng):
+    """
+    Genera perfiles normalizados a partir de mezclas Dirichlet de uno a tres géneros.
+    """
+    profiles = np.zeros((n_usuarios, n_generos), dtype=np.float32)
+    n_activos = rng.integers(1, 4, size=n_usuarios)
+    for n in (1, 2, 3):
+        filas = np.flatnonzero(n_activos == n)
+        generos = np.argsort(rng.random((len(filas), n_generos)), axis=1)[:, :n]
+        pesos = rng.dirichlet(np.ones(n), size=len(filas)).astype(np.float32)
+        profiles[filas[:, None], generos] = pesos
+    return profiles / np.linalg.norm(profiles, axis=1, keepdims=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--file-path', default='./src/data/dataset_full.csv')
+    parser.add_argument('--k', type=int, default=50)
+    parser.add_argument('--muestra', type=int, default=300)
+    parser.add_argument('--usuarios-sinteticos', type=int, default=0)
+    parser.add_argument('--tablas', type=int, default=8)
+    parser.add_argument('--bits', type=int, default=12)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    user_index, genres, profiles = build_user_profiles(pd.read_csv(args.file_path))
+    if args.usuarios_sinteticos:
+        extra = perfiles_sinteticos(args.usuarios_sinteticos, len(genres), rng)
+        profiles = np.vstack([profiles, extra])
+        user_index = user_index.append(pd.Index([f'sintetico_{i}' for i in range(len(extra))]))
+
+    inicio = time.perf_counter()
+    lsh = build_user_lsh(profiles, n_tables=args.tablas, n_bits=args.bits)
+    construccion = time.perf_counter() - inicio
+    engine = UserNeighbors(user_index, genres, profiles, lsh, 'exact')
+
+    muestra = rng.choice(len(profiles), size=min(args.muestra, len(profiles)), replace=False)
+    latencias = {'exact': [], 'approx': []}
+    recalls = []
+    for position in muestra:
+        resultados = {}
+        for mode in ('exact', 'approx'):
+            inicio = time.perf_counter()
+            resultados[mode] = similar_users(engine, position, k=args.k, mode=mode)
+            latencias[mode].append(time.perf_counter() - inicio)
+
+        exact_scores = resultados['exact'][1]
+        approx_scores = resultados['approx'][1]
+        umbral = exact_scores[-1] - 1e-6
+        recalls.append(np.sum(approx_scores >= umbral) / len(exact_scores))
+
+    n_usuarios = len(profiles)
+    motor = profiles.nbytes + lsh.planes.nbytes + lsh.codes.nbytes + lsh.order.nbytes
+    print(f"usuarios: {n_usuarios}  géneros: {len(genres)}  k: {args.k}  tablas: {args.tablas}  bits: {args.bits}")
+    print(f"construcción del índice LSH: {construccion:.2f} s")
+    print(f"memoria del motor: {motor / 2**20:.1f} MB  (matriz densa float64: {n_usuarios ** 2 * 8 / 2**20:.1f} MB)")
+    for mode in ('exact', 'approx'):
+        lat = np.array(latencias[mode]) * 1000
+        print(f"{mode:>7}: latencia media {lat.mean():.3f} ms  p95 {np.percentile(lat, 95):.3f} ms")
+    print(f"recall@{args.k} aproximado vs exacto: media {np.mean(recalls):.3f}  mínimo {np.min(recalls):.3f}")
+
+
+if __name__ == '__main__':
+    main()
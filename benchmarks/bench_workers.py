@@ -0,0 +1,210 @@
+"""
+Benchmark y comprobación de la API con varios workers: rendimiento y páginas compartidas de los modelos.
+
+Para cada número de workers se inicia serve.py, se generan peticiones concurrentes a los endpoints de
+recomendación durante unos segundos y, con las páginas ya cargadas, se lee /proc/<pid>/smaps de cada worker:
+
+- peticiones por segundo;
+- memoria residente (RSS), proporcional (PSS) y privada (USS) de cada worker;
+- para los arreglos .npy de la versión servida: RSS, PSS y páginas anónimas (Anonymous).
+
+La comprobación falla (código de salida 1) si algún worker no tiene los arreglos del modelo mapeados desde el
+archivo como mapeo compartido, si alguno de esos mapeos tiene páginas anónimas (es decir, copias propias del
+worker) o si, con dos o más workers, los perfiles de usuario no aparecen compartidos (PSS menor que RSS).
+Private_Dirty no sirve para esto: cuenta también las páginas del caché de archivos que aún no se escribieron a
+disco, por ejemplo justo después de construir el modelo.
+
+Uso (desde la raíz del repositorio, en Linux):
+    python benchmarks/bench_workers.py --workers 1 2 4
+"""
+
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+
+# Añadir el directorio de los módulos a sys.path
+sys.path.append("./src/data")
+sys.path.append("./src/models")
+sys.path.append("./src/features")
+sys.path.append(".")
+
+from artifacts import load_model
+from serve import prepare
+
+
+def children(pid):
+    """
+    Devuelve los pid de los procesos hijos de pid.
+    """
+    result = []
+    for name in os.listdir('/proc'):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f'/proc/{name}/stat') as stat:
+                ppid = int(stat.read().rsplit(')', 1)[1].split()[1])
+            with open(f'/proc/{name}/cmdline', 'rb') as cmdline:
+                command = cmdline.read()
+        except OSError:
+            continue
+        if ppid == pid and b'resource_tracker' not in command:
+            result.append(int(name))
+    return result
+
+
+def smaps(pid, prefix):
+    """
+    Resume /proc/<pid>/smaps: totales del proceso y, por archivo bajo 'prefix', RSS, PSS, Anonymous (bytes) y si
+    todos sus mapeos son compartidos.
+    """
+    totals = {'Rss': 0, 'Pss': 0, 'Private_Clean': 0, 'Private_Dirty': 0}
+    files = {}
+    current = None
+    with open(f'/proc/{pid}/smaps') as file:
+        for line in file:
+            fields = line.split()
+            if not fields[0].endswith(':'):
+                # Cabecera de un mapeo: rango, permisos, desplazamiento, dispositivo, inodo y ruta opcional
+                path = fields[5] if len(fields) > 5 else ''
+                current = None
+                if path.startswith(prefix):
+                    current = files.setdefault(os.path.basename(path),
+                                               {'Rss': 0, 'Pss': 0, 'Anonymous': 0, 'shared': True})
+                    current['shared'] &= fields[1].endswith('s')
+                continue
+            key = fields[0][:-1]
+            if key in totals:
+                totals[key] += int(fields[1]) * 1024
+            if current is not None and key in current:
+                current[key] += int(fields[1]) * 1024
+    totals['Uss'] = totals.pop('Private_Clean') + totals.pop('Private_Dirty')
+    return totals, files
+
+
+def wait_ready(port, timeout):
+    """
+    Espera a que la API responda en el puerto indicado.
+    """
+    limite = time.time() + timeout
+    while time.time() < limite:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/')
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise TimeoutError(f"La API no respondió en {timeout} s")
+
+
+def load_test(port, paths, segundos, concurrencia):
+    """
+    Hace peticiones GET a 'paths' desde 'concurrencia' hilos durante 'segundos'. Devuelve las peticiones por segundo.
+    """
+    counts = [0] * concurrencia
+    errors = [0] * concurrencia
+    fin = time.perf_counter() + segundos
+
+    def run(worker):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+        i = worker
+        while time.perf_counter() < fin:
+            connection.request('GET', paths[i % len(paths)])
+            response = connection.getresponse()
+            response.read()
+            counts[worker] += 1
+            errors[worker] += response.status != 200
+            i += concurrencia
+
+    threads = [threading.Thread(target=run, args=(worker,)) for worker in range(concurrencia)]
+    inicio = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if sum(errors):
+        raise RuntimeError(f"{sum(errors)} respuestas con error")
+    return sum(counts) / (time.perf_counter() - inicio)
+
+
+def check(workers, files, expected):
+    """
+    Devuelve la lista de problemas encontrados en los mapeos de los arreglos del modelo.
+    """
+    problems = []
+    for pid, worker_files in files.items():
+        missing = expected - set(worker_files)
+        if missing:
+            problems.append(f"worker {pid}: arreglos no mapeados desde el archivo: {sorted(missing)}")
+        private = sorted(name for name, stats in worker_files.items() if not stats['shared'])
+        if private:
+            problems.append(f"worker {pid}: arreglos mapeados como privados: {private}")
+        copied = {name: stats['Anonymous'] for name, stats in worker_files.items() if stats['Anonymous']}
+        if copied:
+            problems.append(f"worker {pid}: páginas copiadas en {copied}")
+        profiles = worker_files.get('user_profiles.npy')
+        if workers > 1 and profiles and profiles['Rss'] and profiles['Pss'] >= profiles['Rss']:
+            problems.append(f"worker {pid}: user_profiles.npy no está compartido")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--file-path', default='./src/data/dataset_full.csv')
+    parser.add_argument('--models-dir', default='./models')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--segundos', type=float, default=10)
+    parser.add_argument('--concurrencia', type=int, default=16)
+    parser.add_argument('--timeout', type=float, default=600)
+    args = parser.parse_args()
+
+    # Prepara los artefactos una vez y elige identificadores para las peticiones
+    version = prepare(args.file_path, args.models_dir)
+    model = load_model(args.models_dir, version)
+    paths = [f'/recomendacion-item/{item_id}' for item_id in model.df_item['item_id'][:200]]
+    paths += [f'/recomendacion-usuario/{user_id}' for user_id in list(model.user_neighbors.user_index)[:200]]
+    prefix = os.path.abspath(os.path.join(args.models_dir, version)) + os.sep
+    expected = {name + '.npy' for name in json.load(open(os.path.join(prefix, 'manifest.json')))['arrays']}
+    del model
+
+    problems = []
+    print(f"Versión {version}: {len(expected)} arreglos")
+    print(f"{'workers':>8} {'pet/s':>10} {'RSS MB':>10} {'PSS MB':>10} {'USS MB':>10} "
+          f"{'modelo RSS MB':>14} {'modelo PSS MB':>14}")
+    for workers in args.workers:
+        env = dict(os.environ, MODELS_DIR=args.models_dir)
+        server = subprocess.Popen([sys.executable, 'serve.py', '--workers', str(workers), '--port', str(args.port),
+                                   '--models-dir', args.models_dir, '--vigilar', '0'],
+                                  env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_ready(args.port, args.timeout)
+            throughput = load_test(args.port, paths, args.segundos, args.concurrencia)
+            # Con un solo worker uvicorn atiende en el propio proceso principal
+            pids = children(server.pid) if workers > 1 else [server.pid]
+            stats = {pid: smaps(pid, prefix) for pid in pids}
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+        files = {pid: worker_files for pid, (_, worker_files) in stats.items()}
+        problems += check(workers, files, expected)
+        for pid, (totals, worker_files) in stats.items():
+            model_rss = sum(f['Rss'] for f in worker_files.values())
+            model_pss = sum(f['Pss'] for f in worker_files.values())
+            print(f"{workers:>8} {throughput:>10.0f} {totals['Rss'] / 2**20:>10.1f} {totals['Pss'] / 2**20:>10.1f} "
+                  f"{totals['Uss'] / 2**20:>10.1f} {model_rss / 2**20:>14.2f} {model_pss / 2**20:>14.2f}")
+
+    if problems:
+        print('\n'.join(problems))
+        sys.exit(1)
+    print("OK: los arreglos del modelo están mapeados desde el archivo y no se duplican entre workers")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+"""
+Generador de datos sintéticos: escala dataset_full.csv por un factor (10x a 1000x) con el mismo esquema.
+
+Cada copia k del dataset original tiene usuarios nuevos (user_id con el sufijo '_s<k>') y, para que el catálogo
+también crezca, sus juegos se asignan a una de ceil(sqrt(factor)) copias del catálogo (item_id desplazado y
+app_name con el número de copia); los géneros, desarrolladores, años y precios se conservan. El tiempo de juego se
+multiplica por un ruido log-normal y una parte de los sentimientos se vuelve a sortear, para que los perfiles de
+las copias no sean idénticos. La copia 0 es el dataset original.
+
+El archivo se escribe copia por copia, por lo que la memoria no depende del factor.
+
+En dataset_full.csv cada usuario tiene un solo juego, por lo que la evaluación offline (src/models/evaluation.py)
+no tiene juegos que separar. --juegos-por-usuario N (regroup_users) agrupa a los usuarios de a N, ordenados por el
+primer género de su juego, en usuarios nuevos con varios juegos de géneros parecidos; los pares (usuario, juego)
+repetidos dentro de un grupo se cuentan una vez y items_count se recalcula.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/synthetic.py --factor 10 --output /tmp/dataset_x10.csv
+    python benchmarks/synthetic.py --juegos-por-usuario 5 --output /tmp/dataset_grupos.csv
+"""
+
+import argparse
+import math
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Desplazamiento de los item_id de cada copia del catálogo
+ITEM_OFFSET = 10_000_000
+
+
+def scale_dataset(file_path, factor, output_path, seed=0):
+    """
+    Escribe en output_path el dataset de file_path escalado 'factor' veces.
+
+    Args:
+        file_path (str): Ruta al CSV original.
+        factor (int): Número de copias (filas = factor x filas originales).
+        output_path (str): Ruta del CSV escalado.
+        seed (int, opcional): Semilla del ruido. Por defecto es 0.
+
+    Returns:
+        dict: Filas, usuarios y juegos del dataset escalado.
+    """
+    df = pd.read_csv(file_path, dtype={'user_id': str})
+    rng = np.random.default_rng(seed)
+    catalog_copies = math.ceil(math.sqrt(factor))
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+    for k in range(factor):
+        copy = df.copy()
+        if k:
+            c = k % catalog_copies
+            copy['user_id'] = copy['user_id'] + f'_s{k}'
+            if c:
+                copy['item_id'] = copy['item_id'] + c * ITEM_OFFSET
+                copy['app_name'] = copy['app_name'].astype(str) + f' ({c})'
+            noise = rng.lognormal(0, 0.5, len(copy))
+            copy['playtime_forever'] = np.round(copy['playtime_forever'] * noise)
+            resample = rng.random(len(copy)) < 0.2
+            copy.loc[resample, 'sentiment'] = rng.integers(0, 3, resample.sum())
+        copy.to_csv(output_path, mode='w' if k == 0 else 'a', header=k == 0, index=False)
+
+    return {'filas': len(df) * factor, 'usuarios': df['user_id'].nunique() * factor,
+            'juegos': df['item_id'].nunique() * min(catalog_copies, factor)}
+
+
+def regroup_users(file_path, output_path, games_per_user, seed=0):
+    """
+    Escribe en output_path el dataset de file_path con los usuarios agrupados de a 'games_per_user'.
+
+    Los usuarios se ordenan por el primer género de su primera fila (al azar dentro de cada género) y cada grupo de
+    games_per_user usuarios consecutivos pasa a ser un usuario 'g<n>' con todos sus juegos. Las filas conservan su
+    orden dentro de cada grupo, de modo que las de un mismo par (usuario, juego) siguen contiguas.
+
+    Args:
+        file_path (str): Ruta al CSV original.
+        output_path (str): Ruta del CSV reagrupado.
+        games_per_user (int): Usuarios originales por usuario nuevo.
+        seed (int, opcional): Semilla del orden dentro de cada género. Por defecto es 0.
+
+    Returns:
+        dict: Filas, usuarios y juegos del dataset reagrupado.
+    """
+    df = pd.read_csv(file_path, dtype={'user_id': str}).dropna(subset=['user_id'])
+    rng = np.random.default_rng(seed)
+
+    users = df.drop_duplicates('user_id')[['user_id', 'genres']]
+    users = users.assign(azar=rng.random(len(users))).sort_values(['genres', 'azar'], kind='stable')
+    groups = pd.Series(np.arange(len(users)) // games_per_user, index=users['user_id'].to_numpy())
+
+    original = df['user_id']
+    group = original.map(groups)
+    df = df.assign(user_id='g' + group.astype(str)).iloc[np.argsort(group.to_numpy(), kind='stable')]
+    original = original.loc[df.index]
+
+    # Un juego que jugaron dos usuarios del mismo grupo conserva las filas del primero
+    first = original.groupby([df['user_id'], df['item_id']], sort=False).transform('first')
+    df = df[original == first]
+    df = df.assign(items_count=df.groupby('user_id')['item_id'].transform('nunique'))
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    df.to_csv(output_path, index=False)
+    return {'filas': len(df), 'usuarios': df['user_id'].nunique(), 'juegos': df['item_id'].nunique()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--file-path', default='./src/data/dataset_full.csv')
+    parser.add_argument('--factor', type=int, default=1)
+    parser.add_argument('--juegos-por-usuario', type=int, default=0,
+                        help='agrupa a los usuarios de a N en usuarios con varios juegos (después de escalar)')
+    parser.add_argument('--output', required=True)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if os.path.abspath(args.output) == os.path.abspath(args.file_path):
+        sys.exit("La salida no puede ser el dataset original")
+    if args.factor == 1 and not args.juegos_por_usuario:
+        sys.exit("Indique --factor mayor que 1, --juegos-por-usuario o ambos")
+    file_path = args.file_path
+    if args.factor > 1:
+        print(scale_dataset(file_path, args.factor, args.output, args.seed))
+        file_path = args.output
+    if args.juegos_por_usuario:
+        print(regroup_users(file_path, args.output, args.juegos_por_usuario, args.seed))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,79 @@
+import os
+import sys
+import threading
 import pandas as pd
 import numpy as np
 
+# Añadir el directorio de los módulos a sys.path
+sys.path.append("./src/data")
+sys.path.append("./src/features")
 
-# Carga el dataset para los endpoints
+from columnar import file_checksum, load_dataset
+from normalized import load_normalized
+from aggregates import load_or_build_aggregates
+from query_index import QueryIndex
+
+
+# Dataset de los endpoints, leído desde el artefacto columnar mapeado en memoria (DATASET_PATH permite usar otro,
+# por ejemplo uno sintético escalado para los benchmarks)
 file_path = './data/processed/processed_dataset_full.csv'
-file_path = './src/data/dataset_full.csv'
-dataset = pd.read_csv(file_path)
+file_path = os.environ.get('DATASET_PATH', './src/data/dataset_full.csv')
+
+# Agregados precalculados para los endpoints; se reutilizan del disco si el dataset no cambió. El dataset solo se
+# carga si hay que recalcularlos, así cada worker de la API arranca sin abrirlo
+aggregates = None
+
+# Versión de los datos de los agregados (suma de verificación del dataset), que invalida la caché de respuestas
+dataset_version = None
+
+def load_data():
+    """
+    Carga los agregados de los endpoints y la versión del dataset.
+    """
+    global aggregates, dataset_version
+    checksum = file_checksum(file_path)
+    aggregates = load_or_build_aggregates(file_path, lambda: load_normalized(file_path))
+    dataset_version = checksum
+
+# Índices de las consultas de agregación (/consulta) sobre el artefacto columnar; se construyen con la primera
+# consulta, así los procesos que no la usan no abren el dataset
+query_index = None
+_query_index_lock = threading.Lock()
+
+def get_query_index():
+    """
+    Devuelve los índices de las consultas de agregación, construyéndolos si todavía no existen.
+    """
+    global query_index
+    index = query_index
+    if index is None:
+        with _query_index_lock:
+            if query_index is None:
+                query_index = QueryIndex(load_dataset(file_path))
+            index = query_index
+    return index
+
+# Con STARTUP_MODE=background los agregados se cargan en el arranque en segundo plano de main.py
+if os.environ.get('STARTUP_MODE', 'eager') != 'background':
+    load_data()
+
+def reload_if_changed():
+    """
+    Vuelve a cargar los agregados si el dataset cambió (por ejemplo, después de src.models.ingest).
+
+    Returns:
+    bool: True si se recargaron los agregados.
+    """
+    global aggregates, dataset_version, query_index
+    checksum = file_checksum(file_path)
+    if checksum == dataset_version:
+        return False
+    # Se asigna primero el diccionario nuevo y después la versión, para que la caché no guarde datos anteriores
+    # con la versión nueva
+    aggregates = load_or_build_aggregates(file_path, lambda: load_normalized(file_path))
+    query_index = None
+    dataset_version = checksum
+    return True
 
 def PlayTimeGenre_func(genre: str):
     """
@@ -18,15 +86,14 @@ def PlayTimeGenre_func(genre: str):
     int: El año con más horas jugadas para el género dado.
     float: El total de horas jugadas en ese año para el género dado.
     """
-    # Filter data by the given genre
-    filtered_data = dataset[dataset['genres'] == genre]
+    # Playtime by release_year for the given genre, precomputed
+    playtime_by_year = aggregates['genre_year_playtime'].get(genre)
+    if not playtime_by_year:
+        raise ValueError(f"El género {genre} no se encuentra en el dataset.")
 
-    # Group by release_year and sum playtime_forever
-    playtime_by_year = filtered_data.groupby('release_year')['playtime_forever'].sum()
-
-    # Find the year with the maximum playtime
-    max_playtime_year = playtime_by_year.idxmax()
-    max_playtime = playtime_by_year.max()
+    # Find the year with the maximum playtime (the first one in year order, like idxmax)
+    max_playtime_year = max(playtime_by_year, key=playtime_by_year.get)
+    max_playtime = playtime_by_year[max_playtime_year]
 
     # Construir y retornar el diccionario con el año y las horas de juego
     return {f"Año de lanzamiento con más horas jugadas para {genre}": max_playtime_year}
@@ -43,61 +110,58 @@ def UserForGenre_func(genre: str):
     str: El ID del usuario con el mayor número de horas para el género dado.
     dict: Las horas de juego acumuladas por año para el género dado.
     """
-    # Filter data by the given genre
-    filtered_data = dataset[dataset['genres'] == genre]
+    # Users of the given genre sorted by playtime, precomputed
+    if genre not in aggregates['genre_user_playtime']:
+        raise ValueError(f"El género {genre} no se encuentra en el dataset.")
 
     # Find the user with the most playtime
-    user_playtime = filtered_data.groupby('user_id')['playtime_forever'].sum()
-    top_user = user_playtime.idxmax()
+    users, _ = aggregates['genre_user_playtime'][genre]
+    top_user = users[0]
 
     # Accumulate playtime by year
-    playtime_by_year = filtered_data.groupby('release_year')['playtime_forever'].sum().to_dict()
+    playtime_by_year = dict(aggregates['genre_year_playtime'][genre])
 
     return {f"Usuario con más horas jugadas para Género {genre}": top_user, "Horas jugadas": playtime_by_year}
 
-def usersRecommend_func(year: int):
+def usersRecommend_func(year: int, k: int = 3):
     """
     Función para retornar el top 3 de los juegos más recomendados para un año dado.
     Un juego es considerado recomendado si tiene la columna sentiment con 1 (neutral) o 2 (positivo)
 
     Parameters:
     year (int): El año a analizar.
+    k (int): Número de juegos del top. Por defecto es 3.
 
     Returns:
     list: Una lista de diccionarios con el top 3 de los juegos recomendados.
     """
-    # Filter data by the given year and recommended sentiment (1 for neutral, 2 for positive)
-    filtered_data = dataset[(dataset['release_year'] == year) & (dataset['sentiment'].isin([1, 2]))]
-
-    # Count recommendations for each game
-    recommended_games = filtered_data['app_name'].value_counts().head(3)
+    # Games ranked by recommendations (1 for neutral, 2 for positive) for the given year, precomputed
+    recommended_games, _ = aggregates['year_app_positive'].get(year, ([], []))
 
     # Preparing the result in the desired format
-    top_3_games = [{"Puesto " + str(i + 1): game} for i, game in enumerate(recommended_games.index)]
+    top_games = [{"Puesto " + str(i + 1): game} for i, game in enumerate(recommended_games[:k])]
 
-    return top_3_games
+    return top_games
 
-def UsersWorstDeveloper_func(year: int):
+def UsersWorstDeveloper_func(year: int, k: int = 3):
     """
     Función para retornar el top 3 de los desarrolladores con menos juegos recomendados para un año dado
     Un juego es considerado no recomendado si la columna sentiment es cero (negativ0).
 
     Parameters:
     year (int): El año a analizar.
+    k (int): Número de desarrolladores del top. Por defecto es 3.
 
     Returns:
     list: Una lista de diccionarios con el top 3 de los desarrolladores con menos juegos recomendados.
     """
-    # Filter data by the given year and not recommended sentiment (0 for negative)
-    filtered_data = dataset[(dataset['release_year'] == year) & (dataset['sentiment'] == 0)]
-
-    # Count not recommended games for each developer
-    worst_developers = filtered_data['developer'].value_counts().head(3)
+    # Developers ranked by not recommended reviews (0 for negative) for the given year, precomputed
+    worst_developers, _ = aggregates['year_developer_negative'].get(year, ([], []))
 
     # Preparing the result in the desired format
-    top_3_developers = [{"Puesto " + str(i + 1): developer} for i, developer in enumerate(worst_developers.index)]
+    top_developers = [{"Puesto " + str(i + 1): developer} for i, developer in enumerate(worst_developers[:k])]
 
-    return top_3_developers
+    return top_developers
 
 def SentimentAnalysis_func(developer: str):
     """
@@ -111,20 +175,79 @@ def SentimentAnalysis_func(developer: str):
     Returns:
     dict: A dictionary with sentiment counts.
     """
-    # Filter data by the given developer
-    filtered_data = dataset[dataset['developer'] == developer]
+    # Sentiment counts for the given developer, precomputed with NaN values treated as 1 (Neutral)
+    sentiment_results = dict(aggregates['developer_sentiment'].get(developer, {}))
+
+    return {developer: sentiment_results}
+
+
+    
+
+def Consulta_func(filtros: dict, agrupar: list, metrica: str = 'filas', limite: int = None):
+    """
+    Consulta de agregación sobre el dataset: filtra por valores o rangos de 'genres', 'release_year', 'developer',
+    'sentiment' y 'price', agrupa por esas dimensiones y mide cada grupo.
 
-    # Replace NaN values in sentiment with 1 (Neutral)
-    filtered_data['sentiment'] = filtered_data['sentiment'].fillna(1)
+    Parameters:
+    filtros (dict): Dimensión -> lista de valores o {'min': ..., 'max': ...} (solo dimensiones numéricas).
+    agrupar (list): Dimensiones de agrupación; el precio se agrupa por rangos.
+    metrica (str): 'filas', 'horas' o 'usuarios'.
+    limite (int): Número máximo de grupos, de mayor a menor métrica.
 
-    # Count reviews in each sentiment category
-    sentiment_counts = filtered_data['sentiment'].value_counts()
+    Returns:
+    QueryResult: Número total de grupos y un iterador con los diccionarios de los grupos devueltos.
+    """
+    return get_query_index().query(filtros, agrupar, metrica, limite)
 
-    # Mapping sentiment codes to their meanings
-    sentiment_mapping = {0: 'Negative', 1: 'Neutral', 2: 'Positive'}
-    sentiment_results = {sentiment_mapping.get(k, k): v for k, v in sentiment_counts.items()}
+# Rankings completos de los agregados que se pueden paginar (/ranking) y exportar (/export/ranking): nombre ->
+# (cubo, tipo de la clave, nombre de los elementos y de sus valores)
+RANKINGS = {
+    'usuarios-por-genero': ('genre_user_playtime', str, 'user_id', 'horas'),
+    'juegos-recomendados': ('year_app_positive', int, 'app_name', 'reseñas'),
+    'desarrolladores-no-recomendados': ('year_developer_negative', int, 'developer', 'reseñas'),
+}
 
-    return {developer: sentiment_results}
+def Ranking_func(ranking: str, valor: str, offset: int = 0, limit: int = 100):
+    """
+    Función para retornar una página de un ranking completo: los usuarios de un género por horas jugadas, o los
+    juegos más recomendados o los desarrolladores con más reseñas negativas de un año. Los rankings ya están
+    ordenados, por lo que una página se toma directamente de su posición.
 
+    Parameters:
+    ranking (str): Nombre del ranking (RANKINGS).
+    valor (str): Género o año del ranking.
+    offset (int): Posición del primer elemento de la página.
+    limit (int): Número de elementos de la página.
+
+    Returns:
+    int: El número total de elementos del ranking.
+    list: Una lista de diccionarios con la posición, el elemento y su valor.
+    """
+    cube, key_type, name, value_name = RANKINGS[ranking]
+    try:
+        key = key_type(valor)
+    except ValueError:
+        raise ValueError(f"El valor {valor} no es válido para el ranking {ranking}.") from None
+    if key not in aggregates[cube]:
+        raise ValueError(f"El valor {valor} no se encuentra en el ranking {ranking}.")
+
+    labels, values = aggregates[cube][key]
+    page = range(offset, min(offset + limit, len(labels)))
+    return len(labels), [{"posicion": i + 1, name: labels[i], value_name: values[i].item()} for i in page]
+
+def ranking_rows(ranking: str):
+    """
+    Genera todas las filas de un ranking, clave por clave y en orden, para exportarlas sin armar la lista completa.
 
-    
\ No newline at end of file
+    Parameters:
+    ranking (str): Nombre del ranking (RANKINGS).
+
+    Returns:
+    generator: Diccionarios con la clave (género o año), la posición, el elemento y su valor.
+    """
+    cube, key_type, name, value_name = RANKINGS[ranking]
+    cubes = aggregates[cube]
+    for key in sorted(cubes):
+        labels, values = cubes[key]
+        for i in range(len(labels)):
+            yield {"valor": key, "posicion": i + 1, name: labels[i], value_name: values[i].item()}
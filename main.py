@@ -1,17 +1,125 @@
+import json
+import os
 import sys
-from fastapi import FastAPI
+import threading
+from functools import partial
+from typing import Dict, List, Literal, Optional, Union
+from fastapi import FastAPI, Header, HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
+import funciones
 from funciones import *
+import numpy as np
 import pandas as pd
 
 # Añadir el directorio de los módulos a sys.path
+sys.path.append("./src/data")
 sys.path.append("./src/models")
 sys.path.append("./src/features")
 
-from preprocessing import load_and_preprocess_data
-from modelos import recomendacion_juego, recomendacion_usuario
+from modelos import (recomendacion_hibrida, recomendacion_hibrida_batch, recomendacion_juego, recomendacion_juego_batch,
+                     recomendacion_usuario, recomendacion_usuario_batch)
+from batching import MicroBatcher
+from executor import BoundedExecutor, Overloaded
+from cache import MISS, ResponseCache
+from build import build_and_save
+from registry import ModelRegistry
+from artifacts import model_nbytes
+from metrics import CONTENT_TYPE, HttpMetrics, MetricsMiddleware, MetricsRegistry, register_process_metrics
+from profiler import SlowRequestProfiler
+from startup import ReadinessMiddleware, Startup
+from pagination import decode_cursor, next_cursor, version_tag
+from timing import phases, sizes
 
 app = FastAPI()
 
+# Métricas en formato Prometheus (GET /metrics): latencia, peticiones en curso y CPU del pool por ruta, tiempos de
+# las fases de carga de los modelos y tamaño de sus estructuras. Con PROFILE_SLOW_MS=<ms> se guardan en PROFILE_DIR
+# las pilas muestreadas (cada PROFILE_INTERVAL_MS) de las peticiones que tardan más de ese umbral
+metricas = MetricsRegistry()
+register_process_metrics(metricas)
+http_metrics = HttpMetrics(metricas)
+
+profiler = None
+if os.environ.get('PROFILE_SLOW_MS'):
+    profiler = SlowRequestProfiler(float(os.environ['PROFILE_SLOW_MS']) / 1000,
+                                   float(os.environ.get('PROFILE_INTERVAL_MS', '10')) / 1000,
+                                   os.environ.get('PROFILE_DIR', './reports/profiles')).start()
+
+# Caché de respuestas de los endpoints, de hasta RESPONSE_CACHE_MB megabytes (0 la desactiva). Con
+# RESPONSE_CACHE_JSON=1 guarda las respuestas ya serializadas. Las claves incluyen la versión del dataset y del
+# modelo, y la caché se vacía cuando alguna cambia
+def serializar(value):
+    return JSONResponse(jsonable_encoder(value)).body
+
+cache_mb = float(os.environ.get('RESPONSE_CACHE_MB', '64'))
+response_cache = None
+if cache_mb > 0:
+    response_cache = ResponseCache(int(cache_mb * 2**20),
+                                   serializar if os.environ.get('RESPONSE_CACHE_JSON') == '1' else None)
+
+def version_datos():
+    """
+    Versión del dataset y del modelo, que invalida la caché de respuestas y los cursores de paginación.
+    """
+    return (funciones.dataset_version, registry.version)
+
+def clave(endpoint, *params):
+    """
+    Clave de caché de una petición: versión del dataset y del modelo, endpoint y parámetros ya validados.
+    """
+    return (version_datos(), endpoint) + params
+
+def desde_cache(key):
+    if response_cache is None:
+        return MISS
+    response_cache.check_version(key[0])
+    return response_cache.get(key)
+
+def como_respuesta(value):
+    if isinstance(value, bytes):
+        return Response(content=value, media_type='application/json')
+    return value
+
+def guardar(key, value):
+    """
+    Guarda la respuesta en la caché y la devuelve; si la caché guarda JSON, como una respuesta con esos bytes. Si
+    los datos o el modelo se recargaron mientras se calculaba, la respuesta se devuelve sin guardarla.
+    """
+    if response_cache is not None:
+        value = response_cache.put(key, value, key[0])
+    return como_respuesta(value)
+
+def cacheado(key, calcular):
+    """
+    Devuelve la respuesta de 'key' desde la caché, o la calcula con calcular() y la guarda.
+    """
+    value = desde_cache(key)
+    if value is not MISS:
+        return como_respuesta(value)
+    return guardar(key, calcular())
+
+# Paginación por cursor y listas largas: número máximo de elementos por página (PAGE_MAX_ITEMS) y posición máxima
+# de las recomendaciones (REC_MAX_K): la última página se recorta en esa posición y no tiene cursor siguiente
+max_pagina = int(os.environ.get('PAGE_MAX_ITEMS', '1000'))
+max_k_recomendaciones = int(os.environ.get('REC_MAX_K', '1000'))
+
+def posicion_cursor(cursor, version):
+    """
+    Posición de la página de un cursor. Responde 400 si el cursor no es válido y 410 si se emitió para otra
+    versión de los datos o del modelo.
+    """
+    try:
+        offset, tag = decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if tag is not None and tag != version_tag(version):
+        raise HTTPException(status_code=410, detail="El cursor corresponde a otra versión de los datos; "
+                                                    "vuelva a pedir la primera página")
+    return offset
+
 @app.get('/')
 def Presentacion():
     return {'Proyecto de MLOPS usando datos de la plataforma STEAM, las funciones implementdas se acceden en /docs'}
@@ -29,10 +137,13 @@ def PlayTimeGenre(genre: str):
     float: El total de horas jugadas en ese año para el género dado.
     """
     
-    try:
-        return PlayTimeGenre_func(genre)
-    except Exception as e:
-        return {"Error":str(e)}
+    def calcular():
+        try:
+            return PlayTimeGenre_func(genre)
+        except Exception as e:
+            return {"Error":str(e)}
+
+    return cacheado(clave('playtime-genre', genre), calcular)
 
 @app.get("/user-for-genre/{genre}")
 def UserForGenre(genre: str):
@@ -47,44 +158,57 @@ def UserForGenre(genre: str):
     str: el ID del usuario con el mayor número de horas para el género dado.
     dict: Las horas de juego acumuladas por año para el género dado.
     """
-    try:
-        return UserForGenre_func(genre)
-    except Exception as e:
-        return {"Error":str(e)}
+    def calcular():
+        try:
+            return UserForGenre_func(genre)
+        except Exception as e:
+            return {"Error":str(e)}
+
+    return cacheado(clave('user-for-genre', genre), calcular)
 
 @app.get("/users-recommend/{year}")
-def usersRecommend(year: int):
+def usersRecommend(year: int, k: int = Query(3, ge=1, le=max_pagina)):
     """"
     Función para retornar el top 3 de los juegos más recomendados para un año dado.
     Un juego es considerado recomendado si tiene la columna sentiment con 1 (neutral) o 2 (positivo)
 
     Parameters:
     year (int): el año a analizar.
+    k (int, opcional): número de juegos del top. Por defecto es 3; el ranking completo se pagina en
+        /ranking/juegos-recomendados/{year}.
 
     Returns:
     list: una lista de diccionarios con el top 3 de los juegos recomendados.
     """
-    try:
-        return usersRecommend_func(year)
-    except Exception as e:
-        return {"Error":int(e)}
+    def calcular():
+        try:
+            return usersRecommend_func(year, k)
+        except Exception as e:
+            return {"Error":int(e)}
+
+    return cacheado(clave('users-recommend', year, k), calcular)
 
 @app.get("/users-worst-developer/{year}")
-def UsersWorstDeveloper(year: int):
+def UsersWorstDeveloper(year: int, k: int = Query(3, ge=1, le=max_pagina)):
     """
     Función para retornar el top 3 de los desarrolladores con menos juegos recomendados para un año dado
     Un juego es considerado no recomendado si la columna sentiment es cero (negativ0).
 
     Parameters:
     year (int): el año a analizar.
+    k (int, opcional): número de desarrolladores del top. Por defecto es 3; el ranking completo se pagina en
+        /ranking/desarrolladores-no-recomendados/{year}.
 
     Returns:
     list: una lista de diccionarios con el top 3 de los desarrolladores con menos juegos recomendados.
     """
-    try:
-        return UsersWorstDeveloper_func(year)
-    except Exception as e:
-        return {"Error":int(e)}
+    def calcular():
+        try:
+            return UsersWorstDeveloper_func(year, k)
+        except Exception as e:
+            return {"Error":int(e)}
+
+    return cacheado(clave('users-worst-developer', year, k), calcular)
     
 
 @app.get("/sentiment-analysis/{developer}")
@@ -100,18 +224,169 @@ def SentimentAnalysis(developer: str):
     Returns:
     dict: un diccionario con el conteo de valores para el análisis de sentimiento.
     """
+    def calcular():
+        try:
+            return SentimentAnalysis_func(developer)
+        except Exception as e:
+            return {"Error":str(e)}
+
+    return cacheado(clave('sentiment-analysis', developer), calcular)
+
+# Rankings completos de los agregados, paginados (ver funciones.RANKINGS)
+NombreRanking = Literal['usuarios-por-genero', 'juegos-recomendados', 'desarrolladores-no-recomendados']
+
+@app.get("/ranking/{ranking}/{valor}")
+def ranking_paginado(ranking: NombreRanking, valor: str, limite: int = Query(100, ge=1, le=max_pagina),
+                     cursor: Optional[str] = None):
+    """
+    Devuelve una página de un ranking completo: los usuarios de un género por horas jugadas
+    ('usuarios-por-genero'), o los juegos con más reseñas positivas o neutrales ('juegos-recomendados') o los
+    desarrolladores con más reseñas negativas ('desarrolladores-no-recomendados') de un año.
+
+    Parameters:
+        ranking (str): el nombre del ranking.
+        valor (str): el género o el año.
+        limite (int, opcional): elementos por página, hasta PAGE_MAX_ITEMS. Por defecto es 100.
+        cursor (str, opcional): el cursor 'siguiente' de la página anterior. Sin cursor, la primera página.
+
+    Returns:
+        dict: 'total' de elementos del ranking, 'resultados' con la posición, el elemento y su valor, y
+        'siguiente', el cursor de la página siguiente (None en la última). Responde 404 si el valor no está en el
+        ranking, 400 si el cursor no es válido y 410 si es de otra versión de los datos.
+    """
+    version = version_datos()
+    offset = posicion_cursor(cursor, version)
+
+    def calcular():
+        total, resultados = Ranking_func(ranking, valor, offset, limite)
+        return {"ranking": ranking, "valor": valor, "total": total, "resultados": resultados,
+                "siguiente": next_cursor(offset, limite, total, version)}
+
     try:
-        return SentimentAnalysis_func(developer)
-    except Exception as e:
-        return {"Error":str(e)}
+        return cacheado(clave('ranking', ranking, valor, limite, offset), calcular)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     
-# Cargar y preprocesar los datos
-file_path = './src/data/dataset_full.csv'
-df, df_item, cosine_sim_item, user_similarity_df = load_and_preprocess_data(file_path)
+# Cargar los modelos, construidos a partir del mismo dataset de los endpoints de consultas (DATASET_PATH)
+file_path = funciones.file_path
+
+# Directorio de los artefactos versionados que genera `python -m src.models.build`
+models_dir = os.environ.get('MODELS_DIR', './models')
+
+# Modo de búsqueda de usuarios similares: 'exact' (por defecto) o 'approx' (índice LSH)
+modo_usuarios = os.environ.get('USER_NEIGHBORS_MODE', 'exact')
+
+# Se carga la versión más reciente de los modelos; si todavía no hay ninguna, se construye y se guarda una
+# Al activar cada versión se recargan también los agregados si el dataset cambió (ingesta incremental)
+registry = ModelRegistry(models_dir, mode=modo_usuarios, on_load=lambda model: funciones.reload_if_changed())
+
+def cargar_modelos():
+    registry.load_or_build(lambda: build_and_save(file_path, models_dir, modo_usuarios=modo_usuarios))
+
+    # Con varios workers (serve.py), cada uno sigue LATEST para cambiar de versión sin depender de qué worker
+    # recibió POST /admin/reload
+    if os.environ.get('MODEL_WATCH_INTERVAL'):
+        registry.watch_latest(float(os.environ['MODEL_WATCH_INTERVAL']))
+
+# Modo de arranque: con STARTUP_MODE=eager (por defecto) los agregados y los modelos se cargan al importar main.py;
+# con STARTUP_MODE=background se cargan en un hilo, el puerto se abre de inmediato y, hasta que terminan,
+# /health/ready y los endpoints de datos responden 503 con Retry-After
+pasos = [('modelos', cargar_modelos)]
+if funciones.aggregates is None:
+    pasos.insert(0, ('agregados', funciones.load_data))
+arranque = Startup(pasos)
+if os.environ.get('STARTUP_MODE', 'eager') == 'background':
+    arranque.start()
+else:
+    arranque.run()
+
+app.add_middleware(ReadinessMiddleware, startup=arranque)
+app.add_middleware(MetricsMiddleware, metrics=http_metrics, routes=app.routes, profiler=profiler)
+
+# Pool acotado de hilos para el trabajo de CPU de las recomendaciones: CPU_WORKERS hilos y hasta CPU_QUEUE tareas
+# en espera; con el pool lleno los endpoints responden 503 en lugar de acumular latencia
+cpu_executor = BoundedExecutor(int(os.environ.get('CPU_WORKERS', '0')) or None,
+                               int(os.environ.get('CPU_QUEUE', '16')), on_task=http_metrics.add_cpu_time)
+
+async def con_limite(tarea):
+    """
+    Espera una tarea del pool de CPU y responde 503 con Retry-After si el pool está saturado.
+    """
+    try:
+        return await tarea
+    except Overloaded:
+        raise HTTPException(status_code=503, detail="Servidor saturado, intente de nuevo",
+                            headers={"Retry-After": "1"})
+
+# Número máximo de IDs por petición en los endpoints por lotes
+max_ids_lote = int(os.environ.get('BATCH_MAX_IDS', '50000'))
+
+# Número de recomendaciones por defecto de los endpoints GET
+k_por_defecto = 5
+
+# Micro-batching opcional de los endpoints GET: las peticiones que llegan dentro de MICRO_BATCH_MS milisegundos
+# se resuelven juntas con las funciones por lotes. Se atienden así las de la primera página con el k por defecto;
+# se calcula una recomendación más para saber si hay página siguiente
+def juegos_por_lote(item_ids):
+    model = registry.model
+    return recomendacion_juego_batch(item_ids, model.df_item, model.item_neighbors, k_por_defecto + 1)
+
+def usuarios_por_lote(user_ids, scoring='first'):
+    model = registry.model
+    return recomendacion_usuario_batch(user_ids, model.user_items, model.user_neighbors, k_por_defecto + 1,
+                                       scoring=scoring)
+
+micro_batch_ms = float(os.environ.get('MICRO_BATCH_MS', '0'))
+micro_batch_max = int(os.environ.get('MICRO_BATCH_MAX', '256'))
+item_batcher = None
+user_batchers = {}
+if micro_batch_ms > 0:
+    item_batcher = MicroBatcher(juegos_por_lote, micro_batch_ms / 1000, micro_batch_max, cpu_executor)
+    user_batchers = {scoring: MicroBatcher(partial(usuarios_por_lote, scoring=scoring), micro_batch_ms / 1000,
+                                           micro_batch_max, cpu_executor)
+                     for scoring in ('first', 'weighted')}
+
+class LoteJuegos(BaseModel):
+    item_ids: List[int]
+    num_recommendations: int = 5
+
+class LoteUsuarios(BaseModel):
+    user_ids: List[str]
+    num_recommendations: int = 5
+    scoring: Literal['first', 'weighted'] = 'first'
+
+def pagina_recomendaciones(cursor, k):
+    """
+    Versión de los datos, posición y tamaño de la página pedida, recortada para no pasar de REC_MAX_K; responde
+    400 si la página empieza en REC_MAX_K o más allá.
+    """
+    version = version_datos()
+    offset = posicion_cursor(cursor, version)
+    if offset >= max_k_recomendaciones:
+        raise HTTPException(status_code=400, detail=f"La página empieza en la recomendación {offset}; "
+                                                    f"el máximo es {max_k_recomendaciones}")
+    return version, offset, min(k, max_k_recomendaciones - offset)
+
+def paginar(recomendaciones, offset, k, version):
+    """
+    Página [offset, offset + k) de una lista calculada hasta offset + k + 1 recomendaciones y el cursor de la
+    siguiente, que no existe más allá de REC_MAX_K. Los mensajes de error se devuelven tal cual.
+    """
+    if not isinstance(recomendaciones, list):
+        return recomendaciones, None
+    total = min(len(recomendaciones), max_k_recomendaciones)
+    return recomendaciones[offset:offset + k], next_cursor(offset, k, total, version)
+
+def verificar_lote(ids):
+    """
+    Rechaza los lotes con más IDs de los permitidos (BATCH_MAX_IDS).
+    """
+    if len(ids) > max_ids_lote:
+        raise HTTPException(status_code=413, detail=f"El lote tiene {len(ids)} IDs; el máximo es {max_ids_lote}")
 
 # Endpoints de la API
 @app.get("/recomendacion-item/{item_id}")
-async def recomendacion_por_item(item_id: int):
+async def recomendacion_por_item(item_id: int, k: int = Query(k_por_defecto, ge=1), cursor: Optional[str] = None):
     """
     Genera una lista de juegos recomendados similares a un juego específico.
 
@@ -121,42 +396,467 @@ async def recomendacion_por_item(item_id: int):
 
     Parameters:
         item_id (int): el ID del juego para el cual se harán las recomendaciones.
-        df (pd.DataFrame): El DataFrame que contiene los datos de los juegos, incluyendo 'item_id', 'genres', y 'developer'.
-        cosine_sim (numpy.ndarray): Matriz de similitud del coseno precalculada para los juegos.
+        k (int, opcional): número de recomendaciones por página. Por defecto es 5. Más allá de los vecinos
+            guardados en el índice se calculan desde los vectores TF-IDF con selección parcial.
+        cursor (str, opcional): el cursor 'siguiente' de la página anterior. Sin cursor, la primera página.
 
     Returns:
         list of dict: una lista de diccionarios, donde cada diccionario contiene 'item_id' y 'app_name' 
         de los juegos recomendados. Devuelve una lista vacía si el juego no se encuentra en el dataset.
+        'siguiente' es el cursor de la página siguiente (None en la última, que se recorta en REC_MAX_K);
+        responde 400 si el cursor no es válido y 410 si el cursor es de otra versión del modelo.
     
     Ejemplo:
-        recomendaciones = recomendacion_juego(123, df, cosine_sim)
+        recomendaciones = recomendacion_juego(123, df_item, item_neighbors)
         # Esto podría devolver juegos similares al juego con ID 123.
     """
-    recomendaciones = recomendacion_juego(item_id, df_item, cosine_sim_item)
-    return {"item_id": item_id, "recomendaciones": recomendaciones}
+    version, offset, k = pagina_recomendaciones(cursor, k)
+    key = clave('recomendacion-item', item_id, k, offset)
+    cached = desde_cache(key)
+    if cached is not MISS:
+        return como_respuesta(cached)
+    if item_batcher is not None and k == k_por_defecto and offset == 0:
+        recomendaciones = await con_limite(item_batcher.submit(item_id))
+    else:
+        model = registry.model
+        recomendaciones = await con_limite(cpu_executor.run(recomendacion_juego, item_id, model.df_item,
+                                                            model.item_neighbors, offset + k + 1,
+                                                            model.item_similarity))
+    recomendaciones, siguiente = paginar(recomendaciones, offset, k, version)
+    return guardar(key, {"item_id": item_id, "recomendaciones": recomendaciones, "siguiente": siguiente})
 
 @app.get("/recomendacion-usuario/{user_id}")
-async def recomendacion_por_usuario(user_id: str):
+async def recomendacion_por_usuario(user_id: str, scoring: Literal['first', 'weighted'] = 'first',
+                                    k: int = Query(k_por_defecto, ge=1), cursor: Optional[str] = None):
     """
     Genera recomendaciones de juegos para un usuario específico basándose en usuarios similares.
 
     Esta función busca usuarios con patrones de juego similares al usuario dado y recomienda juegos que 
-    estos usuarios similares han jugado, pero que el usuario en cuestión aún no ha probado. Utiliza la 
-    matriz de similitud del coseno entre usuarios para determinar qué usuarios son similares.
+    estos usuarios similares han jugado, pero que el usuario en cuestión aún no ha probado. Los usuarios similares
+    se calculan bajo demanda con la similitud del coseno entre los perfiles de géneros de los usuarios.
 
     Parameters:
         user_id (int): el ID del usuario para el cual se realizará la recomendación.
-        df (pd.DataFrame): El DataFrame que contiene los datos de los juegos y usuarios.
-        user_similarity_df (pd.DataFrame): DataFrame que representa la matriz de similitud del coseno entre usuarios.
-        num_recommendations (int, opcional): Número de recomendaciones a generar. Por defecto es 5.
+        scoring (str, opcional): 'first' toma los primeros juegos no jugados de los usuarios más similares;
+            'weighted' los puntúa por la similitud de cada vecino y sus horas jugadas. Por defecto es 'first'.
+        k (int, opcional): número de recomendaciones por página. Por defecto es 5.
+        cursor (str, opcional): el cursor 'siguiente' de la página anterior. Sin cursor, la primera página.
 
     Returns:
         list of dict: una lista de diccionarios, donde cada diccionario contiene 'item_id' y 'app_name' 
                       de los juegos recomendados. Devuelve una lista vacía si el usuario no se encuentra en el dataset.
+                      'siguiente' es el cursor de la página siguiente (None en la última).
 
     Ejemplo:
-        recomendaciones_usuario = recomendacion_usuario_mod(456, df, user_similarity_df)
+        recomendaciones_usuario = recomendacion_usuario(456, user_items, user_neighbors)
         # Esto podría devolver juegos recomendados para el usuario con ID 456.
     """
-    recomendaciones = recomendacion_usuario(user_id, df, user_similarity_df)
-    return {"user_id": user_id, "recomendaciones": recomendaciones}
+    version, offset, k = pagina_recomendaciones(cursor, k)
+    key = clave('recomendacion-usuario', user_id, scoring, k, offset)
+    cached = desde_cache(key)
+    if cached is not MISS:
+        return como_respuesta(cached)
+    if user_batchers and k == k_por_defecto and offset == 0:
+        recomendaciones = await con_limite(user_batchers[scoring].submit(user_id))
+    else:
+        model = registry.model
+        recomendaciones = await con_limite(cpu_executor.run(recomendacion_usuario, user_id, model.user_items,
+                                                            model.user_neighbors, offset + k + 1, scoring=scoring))
+    recomendaciones, siguiente = paginar(recomendaciones, offset, k, version)
+    return guardar(key, {"user_id": user_id, "recomendaciones": recomendaciones, "siguiente": siguiente})
+
+@app.get("/recomendacion-hibrida/{user_id}")
+async def recomendacion_hibrida_por_usuario(user_id: str, alpha: float = Query(0.5, ge=0, le=1),
+                                            k: int = Query(k_por_defecto, ge=1), cursor: Optional[str] = None):
+    """
+    Genera recomendaciones de juegos para un usuario combinando la similitud de contenido (géneros y
+    desarrolladores, TF-IDF) con todos los juegos de su biblioteca, ponderados por sus horas jugadas, y los juegos
+    de los usuarios similares.
+
+    Parameters:
+        user_id (str): el ID del usuario para el cual se realizará la recomendación.
+        alpha (float, opcional): peso de la puntuación de contenido, entre 0 y 1; el resto corresponde a los
+            usuarios similares. Por defecto es 0.5.
+        k (int, opcional): número de recomendaciones por página, elegidas con selección parcial. Por defecto es 5.
+        cursor (str, opcional): el cursor 'siguiente' de la página anterior. Sin cursor, la primera página.
+
+    Returns:
+        list of dict: una lista de diccionarios con 'item_id' y 'app_name' de los juegos recomendados, sin los que
+                      el usuario ya jugó, o el mensaje de error si el usuario no se encuentra en el dataset.
+                      'siguiente' es el cursor de la página siguiente (None en la última).
+    """
+    version, offset, k = pagina_recomendaciones(cursor, k)
+    key = clave('recomendacion-hibrida', user_id, alpha, k, offset)
+    cached = desde_cache(key)
+    if cached is not MISS:
+        return como_respuesta(cached)
+    model = registry.model
+    recomendaciones = await con_limite(cpu_executor.run(recomendacion_hibrida, user_id, model.user_items,
+                                                        model.user_neighbors, model.item_tfidf, offset + k + 1,
+                                                        alpha=alpha))
+    recomendaciones, siguiente = paginar(recomendaciones, offset, k, version)
+    return guardar(key, {"user_id": user_id, "alpha": alpha, "recomendaciones": recomendaciones,
+                         "siguiente": siguiente})
+
+@app.post("/recomendacion-item/batch")
+async def recomendacion_por_item_lote(lote: LoteJuegos):
+    """
+    Genera las recomendaciones ítem-ítem de una lista de juegos en una sola llamada.
+
+    Parameters:
+        item_ids (list of int): los IDs de los juegos.
+        num_recommendations (int, opcional): número de recomendaciones por juego. Por defecto es 5.
+
+    Returns:
+        dict: 'resultados', una lista con el item_id y las recomendaciones de cada juego, en el mismo orden
+        de la petición. Responde 413 si el lote supera BATCH_MAX_IDS y 503 si el servidor está saturado.
+    """
+    verificar_lote(lote.item_ids)
+    model = registry.model
+    resultados = await con_limite(cpu_executor.run(recomendacion_juego_batch, lote.item_ids, model.df_item,
+                                                   model.item_neighbors, lote.num_recommendations,
+                                                   model.item_similarity))
+    return {"resultados": [{"item_id": item_id, "recomendaciones": recomendaciones}
+                           for item_id, recomendaciones in zip(lote.item_ids, resultados)]}
+
+@app.post("/recomendacion-usuario/batch")
+async def recomendacion_por_usuario_lote(lote: LoteUsuarios):
+    """
+    Genera las recomendaciones usuario-ítem de una lista de usuarios en una sola llamada. Los usuarios similares
+    de todo el lote se calculan con una multiplicación de matrices sobre los perfiles de géneros.
+
+    Parameters:
+        user_ids (list of str): los IDs de los usuarios.
+        num_recommendations (int, opcional): número de recomendaciones por usuario. Por defecto es 5.
+        scoring (str, opcional): 'first' o 'weighted', como en /recomendacion-usuario. Por defecto es 'first'.
+
+    Returns:
+        dict: 'resultados', una lista con el user_id y las recomendaciones de cada usuario, en el mismo orden
+        de la petición. Responde 413 si el lote supera BATCH_MAX_IDS y 503 si el servidor está saturado.
+    """
+    verificar_lote(lote.user_ids)
+    model = registry.model
+    resultados = await con_limite(cpu_executor.run(recomendacion_usuario_batch, lote.user_ids, model.user_items,
+                                                   model.user_neighbors, lote.num_recommendations,
+                                                   scoring=lote.scoring))
+    return {"resultados": [{"user_id": user_id, "recomendaciones": recomendaciones}
+                           for user_id, recomendaciones in zip(lote.user_ids, resultados)]}
+
+
+# Consultas de agregación: número máximo de grupos por respuesta y grupos por fragmento del JSON transmitido
+max_grupos_consulta = int(os.environ.get('QUERY_MAX_GROUPS', '100000'))
+grupos_por_fragmento = 1000
+
+class Rango(BaseModel):
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+class Consulta(BaseModel):
+    filtros: Dict[str, Union[Rango, List[Union[int, float, str]]]] = {}
+    agrupar: List[str] = []
+    metrica: Literal['filas', 'horas', 'usuarios'] = 'filas'
+    limite: int = Field(1000, ge=1)
+
+def json_por_fragmentos(encabezado, grupos):
+    """
+    Serializa la respuesta de una consulta por fragmentos: el encabezado y después los grupos de a
+    'grupos_por_fragmento', sin armar el JSON completo en memoria.
+    """
+    yield json.dumps(encabezado, ensure_ascii=False)[:-1] + ', "grupos": ['
+    fragmento = []
+    separador = ''
+    for grupo in grupos:
+        fragmento.append(json.dumps(grupo, ensure_ascii=False))
+        if len(fragmento) == grupos_por_fragmento:
+            yield separador + ', '.join(fragmento)
+            fragmento, separador = [], ', '
+    if fragmento:
+        yield separador + ', '.join(fragmento)
+    yield ']}'
+
+@app.post("/consulta")
+async def consulta(peticion: Consulta):
+    """
+    Consulta de agregación sobre el dataset de los endpoints de consultas. Los filtros se resuelven con índices
+    invertidos por dimensión (las filas de cada valor), intersecando desde el filtro más selectivo, en lugar de
+    recorrer el dataset.
+
+    Parameters:
+        filtros (dict, opcional): dimensión ('genres', 'release_year', 'developer', 'sentiment' o 'price') -> lista
+            de valores, o {'min': ..., 'max': ...} para 'release_year', 'sentiment' y 'price'.
+        agrupar (list of str, opcional): dimensiones de agrupación; el precio se agrupa por rangos. Sin dimensiones
+            se devuelve un solo grupo con el total.
+        metrica (str, opcional): 'filas', 'horas' (suma de playtime_forever) o 'usuarios' (usuarios distintos).
+            Por defecto es 'filas'.
+        limite (int, opcional): número máximo de grupos, de mayor a menor métrica. Por defecto es 1000.
+
+    Returns:
+        dict: 'agrupar', 'metrica', 'grupos_total', 'truncado' (si había más grupos que 'limite') y 'grupos', una
+        lista de diccionarios con las dimensiones y la métrica, transmitida por fragmentos. Responde 400 si una
+        dimensión o un filtro no es válido, 413 si 'limite' supera QUERY_MAX_GROUPS y 503 si el servidor está
+        saturado.
+    """
+    if peticion.limite > max_grupos_consulta:
+        raise HTTPException(status_code=413,
+                            detail=f"El límite es de {peticion.limite} grupos; el máximo es {max_grupos_consulta}")
+    filtros = {dimension: condicion.model_dump() if isinstance(condicion, Rango) else condicion
+               for dimension, condicion in peticion.filtros.items()}
+    try:
+        resultado = await con_limite(cpu_executor.run(Consulta_func, filtros, peticion.agrupar, peticion.metrica,
+                                                      peticion.limite))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    encabezado = {"agrupar": peticion.agrupar, "metrica": peticion.metrica, "grupos_total": resultado.total,
+                  "truncado": resultado.total > peticion.limite}
+    return StreamingResponse(json_por_fragmentos(encabezado, resultado.rows), media_type="application/json")
+
+
+# Exportaciones NDJSON: una línea JSON por elemento, escrita a medida que se calcula cada bloque, sin armar la lista
+# completa. Se atienden hasta EXPORT_MAX_CONCURRENT a la vez (las demás responden 503) y usan la versión del
+# modelo activa al empezar aunque se recargue otra durante la exportación
+max_exportaciones = int(os.environ.get('EXPORT_MAX_CONCURRENT', '2'))
+exportaciones = threading.BoundedSemaphore(max_exportaciones)
+bloque_exportacion = 256
+
+def exportar(filas):
+    """
+    Respuesta NDJSON con las filas de un generador. Toma un cupo de exportación, que se libera al terminar, o
+    responde 503 si no hay cupo.
+    """
+    if not exportaciones.acquire(blocking=False):
+        raise HTTPException(status_code=503, detail="Hay demasiadas exportaciones en curso, intente más tarde",
+                            headers={"Retry-After": "5"})
+    liberado = threading.Lock()
+
+    def liberar():
+        # Se llama al terminar el generador y como tarea de fondo de la respuesta (por si el generador no llega a
+        # empezar); solo la primera llamada libera el cupo
+        if liberado.acquire(blocking=False):
+            exportaciones.release()
+
+    def lineas():
+        try:
+            for fila in filas:
+                yield json.dumps(fila, ensure_ascii=False) + '\n'
+        finally:
+            liberar()
+
+    return StreamingResponse(lineas(), media_type='application/x-ndjson', background=BackgroundTask(liberar))
+
+def verificar_k_exportacion(k):
+    """
+    Rechaza las exportaciones con más recomendaciones por elemento que REC_MAX_K.
+    """
+    if k > max_k_recomendaciones:
+        raise HTTPException(status_code=400, detail=f"k es {k}; el máximo es {max_k_recomendaciones}")
+
+def recomendaciones_por_bloques(n, ids_de, recomendar, nombre_id):
+    """
+    Genera {nombre_id: id, 'recomendaciones': [...]} para los n IDs, calculando bloques de bloque_exportacion
+    con la función por lotes 'recomendar'; ids_de(inicio, fin) devuelve los IDs de un bloque.
+    """
+    for start in range(0, n, bloque_exportacion):
+        ids = list(ids_de(start, min(start + bloque_exportacion, n)))
+        for id_, recomendaciones in zip(ids, recomendar(ids)):
+            yield {nombre_id: id_, "recomendaciones": recomendaciones}
+
+@app.get("/export/recomendacion-item")
+def exportar_recomendaciones_item(k: int = Query(k_por_defecto, ge=1)):
+    """
+    Exporta como NDJSON las k recomendaciones ítem-ítem de cada juego, en el orden del catálogo.
+
+    Parameters:
+        k (int, opcional): número de recomendaciones por juego, hasta REC_MAX_K. Por defecto es 5.
+    """
+    verificar_k_exportacion(k)
+    model = registry.model
+    item_ids = model.df_item['item_id'].to_numpy()
+    filas = recomendaciones_por_bloques(
+        len(item_ids), lambda start, stop: item_ids[start:stop].tolist(),
+        lambda ids: recomendacion_juego_batch(ids, model.df_item, model.item_neighbors, k, model.item_similarity),
+        'item_id')
+    return exportar(filas)
+
+@app.get("/export/recomendacion-usuario")
+def exportar_recomendaciones_usuario(k: int = Query(k_por_defecto, ge=1),
+                                     scoring: Literal['first', 'weighted'] = 'first'):
+    """
+    Exporta como NDJSON las k recomendaciones usuario-ítem de cada usuario del modelo.
+
+    Parameters:
+        k (int, opcional): número de recomendaciones por usuario, hasta REC_MAX_K. Por defecto es 5.
+        scoring (str, opcional): 'first' o 'weighted', como en /recomendacion-usuario. Por defecto es 'first'.
+    """
+    verificar_k_exportacion(k)
+    model = registry.model
+    user_index = model.user_neighbors.user_index
+    filas = recomendaciones_por_bloques(
+        len(user_index), lambda start, stop: user_index[np.arange(start, stop)],
+        lambda ids: recomendacion_usuario_batch(ids, model.user_items, model.user_neighbors, k, scoring=scoring),
+        'user_id')
+    return exportar(filas)
+
+@app.get("/export/recomendacion-hibrida")
+def exportar_recomendaciones_hibridas(k: int = Query(k_por_defecto, ge=1), alpha: float = Query(0.5, ge=0, le=1)):
+    """
+    Exporta como NDJSON las k recomendaciones híbridas de cada usuario del modelo.
+
+    Parameters:
+        k (int, opcional): número de recomendaciones por usuario, hasta REC_MAX_K. Por defecto es 5.
+        alpha (float, opcional): peso de la puntuación de contenido, como en /recomendacion-hibrida.
+    """
+    verificar_k_exportacion(k)
+    model = registry.model
+    user_index = model.user_neighbors.user_index
+    filas = recomendaciones_por_bloques(
+        len(user_index), lambda start, stop: user_index[np.arange(start, stop)],
+        lambda ids: recomendacion_hibrida_batch(ids, model.user_items, model.user_neighbors, model.item_tfidf, k,
+                                                alpha=alpha),
+        'user_id')
+    return exportar(filas)
+
+@app.get("/export/ranking/{ranking}")
+def exportar_ranking(ranking: NombreRanking):
+    """
+    Exporta como NDJSON un ranking completo (ver /ranking): una línea por elemento con el género o el año
+    ('valor'), la posición, el elemento y su valor.
+    """
+    return exportar(ranking_rows(ranking))
+
+
+# Endpoints de salud
+@app.get("/health/live")
+async def salud_vivo():
+    """
+    Liveness: responde 200 mientras el proceso atiende peticiones, aunque los datos todavía se estén cargando, y
+    500 si el arranque falló (el orquestador debe reiniciar el proceso).
+    """
+    if arranque.error is not None:
+        return JSONResponse(status_code=500, content={"estado": "error", "error": arranque.error})
+    return {"estado": "vivo"}
+
+@app.get("/health/ready")
+async def salud_listo():
+    """
+    Readiness: responde 200 cuando los agregados y los modelos están cargados y 503 con Retry-After mientras no.
+    """
+    status = arranque.status()
+    if not status['listo']:
+        estado = "error" if status['error'] is not None else "cargando"
+        return JSONResponse(status_code=503, content={"estado": estado, **status},
+                            headers={"Retry-After": str(arranque.retry_after)})
+    return {"estado": "listo", "version": registry.version, **status}
+
+
+# Endpoints de administración
+def verificar_token(token):
+    """
+    Verifica el token de administración si la variable de entorno ADMIN_TOKEN está definida.
+    """
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    if admin_token and token != admin_token:
+        raise HTTPException(status_code=401, detail="Token de administración inválido")
+
+@app.get("/admin/model")
+def estado_modelo(x_admin_token: Optional[str] = Header(None)):
+    """
+    Devuelve la versión activa de los modelos, la versión en carga (si hay una) y el último error de recarga.
+    """
+    verificar_token(x_admin_token)
+    status = registry.status()
+    status['arranque'] = arranque.status()
+    status['pool_cpu'] = cpu_executor.stats()
+    if profiler is not None:
+        status['perfilador'] = profiler.stats()
+    if item_batcher is not None:
+        status['micro_batching'] = {'item': item_batcher.stats(),
+                                    **{f'usuario_{scoring}': b.stats() for scoring, b in user_batchers.items()}}
+    return status
+
+@app.get("/admin/cache")
+def estado_cache(x_admin_token: Optional[str] = Header(None)):
+    """
+    Devuelve los contadores de la caché de respuestas: entradas, bytes, aciertos, fallos, desalojos e
+    invalidaciones.
+    """
+    verificar_token(x_admin_token)
+    return response_cache.stats() if response_cache is not None else {"activa": False}
+
+@app.delete("/admin/cache")
+def vaciar_cache(x_admin_token: Optional[str] = Header(None)):
+    """
+    Vacía la caché de respuestas.
+    """
+    verificar_token(x_admin_token)
+    if response_cache is not None:
+        response_cache.clear()
+    return {"vaciada": response_cache is not None}
+
+@app.post("/admin/reload")
+def recargar_modelo(version: Optional[str] = None, x_admin_token: Optional[str] = Header(None)):
+    """
+    Carga una versión de los modelos en segundo plano y la activa al terminar, sin detener la API.
+    Las peticiones en curso terminan con la versión anterior.
+
+    Parameters:
+        version (str, opcional): versión a cargar. Por defecto la más reciente (LATEST).
+
+    Returns:
+        dict: la versión que se está cargando. Responde 409 si ya hay una recarga en curso
+        y 404 si la versión no existe.
+    """
+    verificar_token(x_admin_token)
+    try:
+        objetivo = registry.reload_in_background(version)
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    if objetivo is None:
+        raise HTTPException(status_code=409, detail="Ya hay una recarga en curso")
+    return JSONResponse(status_code=202, content={"recargando": objetivo, "version_activa": registry.version})
+
+
+# Métricas de los modelos, de la caché y del pool, que se leen al consultar /metrics
+_bytes_modelo = {}
+
+def bytes_estructuras():
+    """
+    Bytes de cada estructura: el dataset y los agregados (si se cargaron en este proceso), las del modelo activo y
+    la caché de respuestas.
+    """
+    model = registry.model
+    if model is not None and _bytes_modelo.get('modelo') is not model:
+        _bytes_modelo.update(modelo=model, bytes=model_nbytes(model))
+    tamanos = {**sizes(), **_bytes_modelo.get('bytes', {})}
+    if response_cache is not None:
+        tamanos['response_cache'] = response_cache.size
+    return tamanos
+
+metricas.gauge('recsys_model_info', 'Versión activa de los modelos.', ('version',),
+               function=lambda: {registry.version: 1} if registry.model is not None else {})
+metricas.gauge('api_ready', 'Si los datos y los modelos ya están cargados (1) o no (0).',
+               function=lambda: float(arranque.ready))
+metricas.gauge('recsys_structure_bytes', 'Tamaño en bytes de las estructuras de datos y de los modelos.',
+               ('structure',), function=bytes_estructuras)
+metricas.gauge('recsys_phase_last_seconds', 'Duración de la última ejecución de cada fase.', ('phase',),
+               function=lambda: {name: last for name, (last, runs, total) in phases().items()})
+metricas.counter('recsys_phase_seconds_total', 'Segundos acumulados de cada fase.', ('phase',),
+                 function=lambda: {name: total for name, (last, runs, total) in phases().items()})
+metricas.counter('recsys_phase_runs_total', 'Ejecuciones de cada fase.', ('phase',),
+                 function=lambda: {name: runs for name, (last, runs, total) in phases().items()})
+metricas.gauge('api_cpu_pool_tasks', 'Tareas del pool de CPU en ejecución y en espera.', ('state',),
+               function=lambda: {'running': cpu_executor.stats()['en_curso'],
+                                 'queued': cpu_executor.stats()['en_cola']})
+metricas.counter('api_cpu_pool_rejected_total', 'Tareas rechazadas con 503 por el pool de CPU saturado.',
+                 function=lambda: cpu_executor.rejected)
+if response_cache is not None:
+    metricas.counter('api_response_cache_requests_total', 'Consultas a la caché de respuestas por resultado.',
+                     ('result',), function=lambda: {'hit': response_cache.hits, 'miss': response_cache.misses})
+    metricas.gauge('api_response_cache_entries', 'Entradas en la caché de respuestas.',
+                   function=lambda: response_cache.stats()['entradas'])
+
+@app.get("/metrics", include_in_schema=False)
+def metricas_prometheus():
+    """
+    Devuelve las métricas del proceso en el formato de texto de Prometheus.
+    """
+    return Response(content=metricas.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,72 @@
+"""
+Lanzador de la API con varios workers que comparten la memoria de los modelos.
+
+Antes de iniciar los workers, el proceso principal prepara una sola vez todo lo que es costoso de calcular:
+
+- el artefacto columnar del dataset y los agregados de los endpoints de consultas;
+- la versión más reciente de los modelos (se construye y se guarda si todavía no hay ninguna).
+
+Cada worker importa main.py, que abre los agregados ya calculados y carga los modelos con np.load(mmap_mode='r').
+Los arreglos pesados (perfiles de usuario, vecinos, índice usuario -> juegos, TF-IDF, user_id) son así páginas de
+solo lectura del caché de archivos del sistema operativo, compartidas por todos los workers en lugar de copiarse en
+cada uno. benchmarks/bench_workers.py comprueba que esas páginas no se duplican.
+
+Uso (desde la raíz del repositorio):
+    python serve.py --workers 4 --port 8000
+"""
+
+import argparse
+import os
+import sys
+
+# Añadir el directorio de los módulos a sys.path
+sys.path.append("./src/data")
+sys.path.append("./src/models")
+sys.path.append("./src/features")
+
+import uvicorn
+
+from normalized import load_normalized
+from aggregates import load_or_build_aggregates
+from artifacts import latest_version
+from build import build_and_save
+
+
+def prepare(file_path, models_dir, modo_usuarios='exact'):
+    """
+    Prepara los agregados y los modelos que cargan los workers. Devuelve la versión de los modelos a servir.
+    """
+    load_or_build_aggregates(file_path, lambda: load_normalized(file_path))
+    if latest_version(models_dir) is None:
+        build_and_save(file_path, models_dir, modo_usuarios=modo_usuarios)
+    return latest_version(models_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--file-path', default=os.environ.get('DATASET_PATH', './src/data/dataset_full.csv'))
+    parser.add_argument('--models-dir', default=os.environ.get('MODELS_DIR', './models'))
+    parser.add_argument('--modo-usuarios', choices=['exact', 'approx'],
+                        default=os.environ.get('USER_NEIGHBORS_MODE', 'exact'))
+    parser.add_argument('--vigilar', type=float, default=30,
+                        help='segundos entre revisiones de LATEST en cada worker (0 para desactivar)')
+    args = parser.parse_args()
+
+    version = prepare(args.file_path, args.models_dir, args.modo_usuarios)
+    print(f"Sirviendo la versión {version} con {args.workers} workers")
+
+    # Los workers heredan la configuración por variables de entorno
+    os.environ['DATASET_PATH'] = args.file_path
+    os.environ['MODELS_DIR'] = args.models_dir
+    os.environ['USER_NEIGHBORS_MODE'] = args.modo_usuarios
+    if args.vigilar and args.workers > 1:
+        os.environ['MODEL_WATCH_INTERVAL'] = str(args.vigilar)
+
+    uvicorn.run('main:app', host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == '__main__':
+    main()
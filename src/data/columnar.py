@@ -0,0 +1,335 @@
+"""
+Artefacto columnar del dataset, tipado y mapeable en memoria.
+
+El CSV del dataset se convierte una sola vez a un directorio con un archivo .npy por columna:
+
+- genres, developer, app_name y user_id se codifican como diccionario: un arreglo de códigos enteros del menor
+  tamaño posible y la lista de categorías en meta.json. Los nulos se guardan con el código -1 y se cargan como
+  NaN, de modo que groupby y value_counts los descartan igual que con el CSV.
+- item_id, release_year e items_count como int32, sentiment como int8. Los nulos de sentiment se guardan como 1
+  (neutral, como los trata el resto del proyecto) y los de release_year como MISSING_YEAR, que las agregaciones y
+  QueryIndex descartan igual que groupby descarta los nulos.
+- playtime_forever y price como float32.
+
+Al cargarlo, los arreglos se abren con np.load(mmap_mode='r'), por lo que el sistema operativo trae las páginas
+bajo demanda y varios procesos que abren el mismo artefacto comparten la misma memoria física. El DataFrame se
+construye sin copiar los arreglos y se guarda en un caché del módulo, para que los endpoints de consultas y los
+sistemas de recomendación usen una sola copia en el proceso.
+
+Uso (desde la raíz del repositorio):
+    python src/data/columnar.py ./src/data/dataset_full.csv
+"""
+
+# Importamos las librerías a usar
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import pandas as pd
+
+# Versión del formato del artefacto; si cambia, los artefactos existentes se regeneran
+COLUMNAR_VERSION = 3
+
+# Columnas codificadas como diccionario y tipos de las columnas numéricas
+CATEGORICAL_COLUMNS = ['user_id', 'genres', 'app_name', 'developer']
+NUMERIC_COLUMNS = {
+    'item_id': np.int32,
+    'sentiment': np.int8,
+    'items_count': np.int32,
+    'playtime_forever': np.float32,
+    'price': np.float32,
+    'release_year': np.int32,
+}
+
+# Año de lanzamiento de las filas sin año
+MISSING_YEAR = -1
+
+# Valor con el que se guardan los nulos de las columnas enteras (0 para las que no aparecen)
+MISSING_VALUES = {'sentiment': 1, 'release_year': MISSING_YEAR}
+
+# Caché de DataFrames cargados y de sumas de verificación, compartido por todos los módulos del proceso
+_datasets = {}
+_checksums = {}
+
+
+def file_checksum(file_path, chunk_size=1 << 20):
+    """
+    Calcula la suma de verificación SHA-256 de un archivo leyéndolo por bloques.
+
+    El resultado se guarda en caché mientras el tamaño y la fecha de modificación del archivo no cambien.
+    """
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    if key not in _checksums:
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as file:
+            for chunk in iter(lambda: file.read(chunk_size), b''):
+                digest.update(chunk)
+        _checksums[key] = digest.hexdigest()
+    return _checksums[key]
+
+
+def columnar_path(file_path):
+    """
+    Ruta del directorio del artefacto columnar que acompaña a un CSV.
+    """
+    return os.path.splitext(file_path)[0] + '.columnar'
+
+
+def _codes_dtype(n_categories):
+    """
+    Tipo entero más pequeño que puede representar n_categories códigos (y -1 para los nulos).
+    """
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories < np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _write_columnar(df, output_path, meta, previous=None):
+    """
+    Escribe las columnas de un DataFrame leído del CSV en un directorio temporal y lo renombra a output_path.
+
+    Args:
+        df (pd.DataFrame): Filas leídas del CSV con pd.read_csv.
+        output_path (str): Directorio del artefacto.
+        meta (dict): Metadatos a guardar en meta.json (se completan las categorías).
+        previous (dict, opcional): Contenido previo del artefacto al que se añaden las filas de df: por columna,
+            (códigos, categorías) para las categóricas y el arreglo de valores para las numéricas. Por defecto el
+            artefacto contiene solo df.
+    """
+    tmp_path = output_path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    previous = previous or {}
+    meta['categories'] = {}
+
+    for column in CATEGORICAL_COLUMNS:
+        values = df[column].astype(str).where(df[column].notna())
+        if column in previous:
+            # Las categorías se mantienen ordenadas, igual que pd.factorize(sort=True) sobre el CSV completo
+            old_codes, old_categories = previous[column]
+            categories_index = pd.Index(sorted(set(old_categories).union(values.dropna())))
+            # El -1 añadido al final conserva los nulos (código -1)
+            old_codes = np.append(categories_index.get_indexer(old_categories), -1)[old_codes]
+            codes = np.concatenate([old_codes, categories_index.get_indexer(values)])
+        else:
+            codes, categories_index = pd.factorize(values, sort=True)
+        np.save(os.path.join(tmp_path, f'{column}.npy'), codes.astype(_codes_dtype(len(categories_index))))
+        meta['categories'][column] = categories_index.tolist()
+
+    for column, dtype in NUMERIC_COLUMNS.items():
+        values = df[column]
+        if np.issubdtype(dtype, np.integer):
+            values = values.fillna(MISSING_VALUES.get(column, 0))
+        values = values.to_numpy().astype(dtype)
+        if column in previous:
+            values = np.concatenate([previous[column], values])
+        np.save(os.path.join(tmp_path, f'{column}.npy'), values)
+
+    with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as file:
+        json.dump(meta, file, ensure_ascii=False)
+
+    shutil.rmtree(output_path, ignore_errors=True)
+    os.replace(tmp_path, output_path)
+
+
+def convert_csv_to_columnar(file_path, output_path=None):
+    """
+    Convierte el CSV del dataset en el artefacto columnar.
+
+    El artefacto se escribe en un directorio temporal y se renombra al final, para que un proceso que lo esté
+    cargando nunca vea un artefacto a medias.
+
+    Args:
+        file_path (str): Ruta al archivo CSV del dataset.
+        output_path (str, opcional): Directorio de salida. Por defecto es columnar_path(file_path).
+
+    Returns:
+        str: Ruta del directorio del artefacto.
+    """
+    output_path = output_path or columnar_path(file_path)
+    df = pd.read_csv(file_path, dtype={'user_id': str})
+    meta = {
+        'version': COLUMNAR_VERSION,
+        'checksum': file_checksum(file_path),
+        'rows': len(df),
+        'columns': list(df.columns),
+    }
+    _write_columnar(df, output_path, meta)
+    return output_path
+
+
+def append_rows(file_path, rows):
+    """
+    Añade filas al final del CSV y al artefacto columnar, sin volver a leer ni convertir el CSV completo.
+
+    Las filas se escriben como texto CSV y se vuelven a leer con pd.read_csv, de modo que el artefacto resultante
+    es idéntico al que produciría convert_csv_to_columnar sobre el CSV ampliado.
+
+    Args:
+        file_path (str): Ruta al archivo CSV del dataset.
+        rows (pd.DataFrame): Filas a añadir, con las mismas columnas del CSV.
+
+    Returns:
+        pd.DataFrame: Las filas añadidas, tal como se leen del CSV.
+    """
+    load_dataset(file_path)
+    path = columnar_path(file_path)
+    with open(os.path.join(path, 'meta.json'), encoding='utf-8') as file:
+        meta = json.load(file)
+    columns = meta['columns']
+
+    text = rows[columns].to_csv(header=False, index=False, lineterminator='\n')
+    with open(file_path, 'rb') as file:
+        file.seek(-1, os.SEEK_END)
+        if file.read(1) != b'\n':
+            text = '\n' + text
+    with open(file_path, 'a', encoding='utf-8', newline='') as file:
+        file.write(text)
+    new_rows = pd.read_csv(io.StringIO(','.join(columns) + '\n' + text.lstrip('\n')), dtype={'user_id': str})
+
+    previous = {column: np.load(os.path.join(path, f'{column}.npy')) for column in NUMERIC_COLUMNS}
+    for column in CATEGORICAL_COLUMNS:
+        previous[column] = (np.load(os.path.join(path, f'{column}.npy')), meta['categories'][column])
+    meta.update({'checksum': file_checksum(file_path), 'rows': meta['rows'] + len(new_rows)})
+    _write_columnar(new_rows, path, meta, previous)
+
+    _datasets[os.path.abspath(file_path)] = (meta['checksum'], load_columnar(path))
+    return new_rows
+
+
+def load_columnar(path):
+    """
+    Carga el artefacto columnar como un DataFrame cuyos arreglos están mapeados en memoria (solo lectura).
+
+    Args:
+        path (str): Directorio del artefacto.
+
+    Returns:
+        pd.DataFrame: Dataset con columnas categóricas para los textos y numéricas compactas para el resto.
+    """
+    with open(os.path.join(path, 'meta.json'), encoding='utf-8') as file:
+        meta = json.load(file)
+
+    columns = {}
+    for column in meta['columns']:
+        values = np.load(os.path.join(path, f'{column}.npy'), mmap_mode='r')
+        if column in meta['categories']:
+            values = pd.Categorical.from_codes(values, categories=meta['categories'][column])
+        columns[column] = values
+
+    return pd.DataFrame(columns, copy=False)
+
+
+def load_dataset(file_path):
+    """
+    Devuelve el dataset de un CSV usando su artefacto columnar, convirtiéndolo primero si no existe o está desactualizado.
+
+    El DataFrame se guarda en caché por ruta, de modo que todas las llamadas del proceso comparten la misma copia.
+    El DataFrame es de solo lectura: las transformaciones deben crear nuevas columnas o copias.
+
+    Args:
+        file_path (str): Ruta al archivo CSV del dataset.
+
+    Returns:
+        pd.DataFrame: Dataset con el esquema del artefacto columnar.
+    """
+    key = os.path.abspath(file_path)
+    checksum = file_checksum(file_path)
+    cached = _datasets.get(key)
+    if cached is not None and cached[0] == checksum:
+        return cached[1]
+
+    path = columnar_path(file_path)
+    meta_path = os.path.join(path, 'meta.json')
+    up_to_date = False
+    if os.path.exists(meta_path):
+        with open(meta_path, encoding='utf-8') as file:
+            meta = json.load(file)
+        up_to_date = meta.get('version') == COLUMNAR_VERSION and meta.get('checksum') == checksum
+    if not up_to_date:
+        convert_csv_to_columnar(file_path, path)
+
+    dataset = load_columnar(path)
+    _datasets[key] = (checksum, dataset)
+    return dataset
+
+
+class SortedStringIndex:
+    """
+    Índice de cadenas guardado como un arreglo de bytes de ancho fijo, compatible con np.load(mmap_mode='r').
+
+    Reemplaza a pd.Index para los identificadores de usuario de los modelos guardados: en lugar de un objeto de
+    Python por identificador y una tabla hash por proceso, las búsquedas se hacen con np.searchsorted sobre el
+    arreglo, que varios procesos pueden compartir mapeado en memoria. Implementa la parte de la interfaz de pd.Index
+    que usan los modelos (get_indexer, len, indexación e iteración).
+
+    Args:
+        values (numpy.ndarray): Arreglo de bytes ('S') con los identificadores codificados en UTF-8, en el orden de
+            las filas del modelo.
+        sorter (numpy.ndarray, opcional): Permutación que ordena 'values'; None si 'values' ya está ordenado.
+    """
+
+    def __init__(self, values, sorter=None):
+        self.values = values
+        self.sorter = sorter
+
+    @classmethod
+    def encode(cls, labels):
+        """
+        Codifica una secuencia de cadenas. Devuelve el arreglo de bytes y la permutación que lo ordena (o None).
+        """
+        values = np.array([str(label).encode('utf-8') for label in labels], dtype=bytes)
+        if len(values) and not np.all(values[:-1] <= values[1:]):
+            return values, np.argsort(values, kind='stable').astype(np.int64)
+        return values, None
+
+    def get_indexer(self, labels):
+        """
+        Devuelve la fila de cada etiqueta, o -1 si no está en el índice.
+        """
+        targets = np.array([str(label).encode('utf-8') for label in labels], dtype=bytes)
+        if len(self.values) == 0:
+            return np.full(len(targets), -1, dtype=np.int64)
+        positions = np.searchsorted(self.values, targets, sorter=self.sorter)
+        positions = np.minimum(positions, len(self.values) - 1)
+        if self.sorter is not None:
+            positions = self.sorter[positions]
+        found = self.values[positions] == targets
+        return np.where(found, positions, -1)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, positions):
+        values = self.values[positions]
+        if isinstance(values, bytes):
+            return values.decode('utf-8')
+        return np.array([value.decode('utf-8') for value in values], dtype=object)
+
+    def __iter__(self):
+        return (value.decode('utf-8') for value in self.values)
+
+
+def decoded(dataset, columns=None):
+    """
+    Devuelve una copia de las columnas indicadas con los categóricos decodificados a texto.
+
+    Es útil para las operaciones de pandas cuyo resultado depende del tipo categórico (por ejemplo, value_counts
+    incluye las categorías sin registros y ordena los empates de otra forma).
+    """
+    columns = columns or list(dataset.columns)
+    return pd.DataFrame({
+        column: dataset[column].astype(object) if isinstance(dataset[column].dtype, pd.CategoricalDtype)
+        else dataset[column]
+        for column in columns
+    })
+
+
+if __name__ == '__main__':
+    print(convert_csv_to_columnar(sys.argv[1] if len(sys.argv) > 1 else './src/data/dataset_full.csv'))
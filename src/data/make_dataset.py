@@ -0,0 +1,559 @@
+"""
+Pipeline ETL que construye dataset_full.csv a partir de los archivos originales de STEAM, con memoria acotada.
+
+Reemplaza a los notebooks '1.0-cleaning data' y '2.0-dataset-api', que cargaban los tres archivos completos en
+memoria. Aquí cada archivo se lee línea por línea con generadores, los registros se limpian y se expanden por
+bloques y cada salida se escribe por bloques a medida que se produce:
+
+1. juegos: steam_games.json -> processed_steam_games.csv. Se guarda además la tabla item_id -> filas de juego
+   (el catálogo, el lado pequeño de la unión con los juegos).
+2. reseñas: user_reviews.json -> processed_users_reviews.csv, con el sentimiento de cada reseña (calculado en
+   paralelo y con caché en disco, ver src/features/sentiment.py). Cada reseña se escribe además, con su posición,
+   en una de varias particiones en disco según el hash de su user_id.
+3. items: users_items.json -> processed_users_items.csv. Sus filas se reparten en particiones con el mismo hash.
+4. dataset: para cada partición se unen sus reseñas con sus items y sus juegos mediante tablas hash de la
+   partición; las filas resultantes se limpian, se eliminan las duplicadas y se intercalan por la posición de la
+   reseña para escribir dataset_full.csv.
+
+La memoria máxima depende del catálogo de juegos y del tamaño de una partición (--particion-mb MB de
+user_reviews.json; el número de particiones crece con el archivo), no del tamaño de los archivos ni del número
+de reseñas. Cada etapa reporta los registros leídos, las filas escritas, el rendimiento y la memoria residente
+máxima.
+
+El resultado es el mismo que el de los notebooks: las uniones conservan el orden de pd.merge (reseñas, luego
+items y luego juegos), el año de lanzamiento se interpreta con el formato que pandas infiere de la primera fecha
+del archivo y se eliminan las filas duplicadas. Los precios no numéricos ('Free to Play', 'Third-party', ...) se
+guardan como 0.
+
+Uso (desde la raíz del repositorio):
+    python -m src.data.make_dataset --raw-dir ./data/raw --processed-dir ./data/processed \
+        --output ./src/data/dataset_full.csv
+"""
+
+# Importamos las librerías a usar
+import argparse
+import ast
+import csv
+import heapq
+import json
+import math
+import os
+import re
+import sys
+import tempfile
+import time
+import zlib
+
+import pandas as pd
+
+# Añadir el directorio de los módulos a sys.path
+sys.path.append("./src/features")
+
+from sentiment import SentimentScorer
+
+# Columnas de cada salida, en el orden de los notebooks
+GAMES_COLUMNS = ['genres', 'app_name', 'price', 'id', 'developer', 'release_year']
+REVIEWS_COLUMNS = ['user_id', 'item_id', 'sentiment']
+ITEMS_COLUMNS = ['user_id', 'items_count', 'item_id', 'playtime_forever']
+DATASET_COLUMNS = ['user_id', 'item_id', 'sentiment', 'items_count', 'playtime_forever', 'genres', 'app_name',
+                   'price', 'developer', 'release_year']
+
+# Cadenas que pandas no usa para inferir el formato de las fechas
+NAT_STRINGS = {'', 'NaT', 'nat', 'NAT', 'nan', 'NaN', 'NAN'}
+
+# Patrones de los campos de las reseñas (ver review_records)
+USER_ID_PATTERN = re.compile(r'"user_id":\s*"([^"]+?)"(?=\s*,|\s*})')
+USER_URL_PATTERN = re.compile(r'"user_url":\s*"([^"]+?)"(?=\s*,|\s*})')
+ITEM_ID_PATTERN = re.compile(r'"item_id":\s*"([^"]+?)"(?=\s*,|\s*})')
+POSTED_PATTERN = re.compile(r'"posted":\s*"([^"]+?)"(?=\s*,|\s*})')
+REVIEW_PATTERN = re.compile(r'"review":\s*"([^"]+?)"(?=\s*,|\s*})')
+INTERNAL_QUOTE_PATTERN = re.compile(r'(?<!\\)"(?=[^"]*"[^"]*":)')
+
+
+class Progress:
+    """
+    Cuenta los registros leídos y las filas escritas de una etapa e imprime su avance y rendimiento.
+
+    Args:
+        stage (str): Nombre de la etapa.
+        every (int, opcional): Cada cuántos registros leídos se imprime el avance. Por defecto es 100000.
+        out (file, opcional): Dónde se imprime el reporte. Por defecto es sys.stderr.
+    """
+
+    def __init__(self, stage, every=100000, out=None):
+        self.stage = stage
+        self.every = every
+        self.out = out or sys.stderr
+        self.read = 0
+        self.written = 0
+        self.start = time.perf_counter()
+
+    def count(self, records):
+        """
+        Recorre un iterable de registros leídos, contándolos e imprimiendo el avance.
+        """
+        for record in records:
+            self.read += 1
+            if self.every and self.read % self.every == 0:
+                self.report('avance')
+            yield record
+
+    def report(self, label='fin'):
+        seconds = time.perf_counter() - self.start
+        print(f"[{self.stage}] {label}: {self.read} registros leídos, {self.written} filas escritas, "
+              f"{seconds:.1f} s, {self.read / seconds if seconds else 0:.0f} registros/s, "
+              f"memoria máxima {peak_rss_mb():.0f} MB", file=self.out, flush=True)
+
+
+def peak_rss_mb():
+    """
+    Memoria residente máxima del proceso en MB (0 si la plataforma no la reporta).
+    """
+    # En Linux se lee VmHWM: ru_maxrss conserva el máximo del proceso padre si este se lanzó con fork y exec
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 2**10
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux la reporta en KB y macOS en bytes
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def chunked(records, chunk_size):
+    """
+    Agrupa un iterable en listas de hasta chunk_size elementos.
+    """
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) == chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_chunk(rows, path, columns, first, progress):
+    """
+    Escribe un bloque de filas al final de un CSV (con encabezado si es el primero).
+    """
+    pd.DataFrame(rows, columns=columns).to_csv(path, mode='w' if first else 'a', header=first, index=False)
+    progress.written += len(rows)
+
+
+def normalize_item_id(value):
+    """
+    Convierte un item_id ('1250', 1250.0) en entero, como lo hace pd.read_csv, para usarlo como clave de unión.
+    """
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else value
+    if isinstance(value, str) and value.strip().lstrip('-').isdigit():
+        return int(value)
+    return value
+
+
+def is_missing(value):
+    """
+    Indica si un valor es nulo (None o NaN).
+    """
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def parse_price(value):
+    """
+    Convierte el precio en número; los nulos y los textos ('Free to Play', 'Free', ...) se guardan como 0.
+    """
+    try:
+        price = float(value)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if math.isnan(price) else price
+
+
+def game_records(path):
+    """
+    Lee steam_games.json línea por línea y devuelve los registros que tienen al menos un valor no nulo.
+    """
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not all(is_missing(value) for value in record.values()):
+                yield record
+
+
+def release_years(dates, anchor):
+    """
+    Año de lanzamiento de un bloque de fechas, con 0 si la fecha no se puede interpretar.
+
+    pd.to_datetime infiere el formato a partir de la primera fecha no nula, por lo que se antepone 'anchor' (la
+    primera fecha del archivo) a cada bloque para que todos se interpreten como la columna completa del notebook.
+    """
+    values = pd.Series([anchor] + list(dates), dtype=object)
+    parsed = pd.to_datetime(values, errors='coerce')
+    return parsed.dt.year.fillna(0).astype(int).to_numpy()[1:]
+
+
+def clean_games(records, chunk_size=10000):
+    """
+    Limpia los juegos por bloques y los expande a una fila por género.
+
+    Se descartan las filas sin género (juegos sin lista de géneros) o sin desarrollador.
+
+    Args:
+        records (iterable): Registros de steam_games.json.
+        chunk_size (int, opcional): Número de juegos por bloque. Por defecto es 10000.
+
+    Yields:
+        list: Bloques de filas [genres, app_name, price, id, developer, release_year].
+    """
+    anchor = None
+    for chunk in chunked(records, chunk_size):
+        dates = [record.get('release_date') for record in chunk]
+        if anchor is None:
+            anchor = next((date for date in dates if not is_missing(date) and not (
+                isinstance(date, str) and date in NAT_STRINGS)), None)
+        years = release_years(dates, anchor)
+
+        rows = []
+        for record, year in zip(chunk, years):
+            genres = record.get('genres')
+            developer = record.get('developer')
+            if not isinstance(genres, list) or is_missing(developer):
+                continue
+            for genre in genres:
+                if not is_missing(genre):
+                    rows.append([genre, record.get('app_name'), record.get('price'), record.get('id'), developer,
+                                 year])
+        yield rows
+
+
+def review_records(path):
+    """
+    Lee user_reviews.json línea por línea y extrae user_id, user_url, item_id, posted y review de cada usuario.
+
+    El archivo no es JSON válido (usa la representación de diccionarios de Python), así que, como en el notebook,
+    cada línea se convierte a un formato similar a JSON (comillas dobles y booleanos en minúsculas), se escapan
+    las comillas internas de los textos y los campos se extraen con expresiones regulares. Se toma la primera
+    reseña de cada línea y los campos que falten se conservan de la línea anterior.
+    """
+    current = {}
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            line = line.replace("'", '"').replace(' True', ' true').replace(' False', ' false')
+            line = INTERNAL_QUOTE_PATTERN.sub('\\"', line)
+            for field, pattern in (('user_id', USER_ID_PATTERN), ('user_url', USER_URL_PATTERN),
+                                   ('item_id', ITEM_ID_PATTERN), ('posted', POSTED_PATTERN),
+                                   ('review', REVIEW_PATTERN)):
+                match = pattern.search(line)
+                if match:
+                    current[field] = match.group(1).rstrip('\\')
+            if 'review' in current:
+                yield current.copy()
+                current.clear()
+
+
+def clean_reviews(records, scorer, chunk_size=10000):
+    """
+    Calcula el sentimiento de las reseñas por bloques con un SentimentScorer (textos repetidos una sola vez,
+    caché en disco y pool de procesos).
+
+    Yields:
+        list: Bloques de filas [user_id, item_id, sentiment].
+    """
+    for chunk in chunked(records, chunk_size):
+        labels = scorer.score([record.get('review') for record in chunk])
+        yield [[record.get('user_id'), record.get('item_id'), label] for record, label in zip(chunk, labels)]
+
+
+def user_item_records(path):
+    """
+    Lee users_items.json línea por línea (un diccionario de Python por usuario).
+    """
+    with open(path, encoding='utf-8') as file:
+        for line in file:
+            if line.strip():
+                yield ast.literal_eval(line)
+
+
+def explode_user_items(records, chunk_size=10000):
+    """
+    Expande los juegos de cada usuario a una fila por juego, en bloques de hasta chunk_size filas (más los juegos
+    de un usuario). Los usuarios sin juegos quedan con una fila sin item_id, como en el notebook.
+
+    Yields:
+        list: Bloques de filas [user_id, items_count, item_id, playtime_forever].
+    """
+    rows = []
+    for record in records:
+        for item in record.get('items') or [{}]:
+            rows.append([record.get('user_id'), record.get('items_count'), item.get('item_id'),
+                         item.get('playtime_forever')])
+        if len(rows) >= chunk_size:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+
+def run_games(path, output_path, chunk_size=10000, progress_every=100000):
+    """
+    Etapa 1: limpia los juegos, escribe processed_steam_games.csv y devuelve la tabla item_id -> filas de juego.
+    """
+    progress = Progress('juegos', progress_every)
+    games = {}
+    first = True
+    for rows in clean_games(progress.count(game_records(path)), chunk_size):
+        write_chunk(rows, output_path, GAMES_COLUMNS, first, progress)
+        first = False
+        for genre, app_name, price, item_id, developer, year in rows:
+            if not is_missing(item_id):
+                games.setdefault(normalize_item_id(item_id), []).append((genre, app_name, price, developer, year))
+    if first:
+        write_chunk([], output_path, GAMES_COLUMNS, first, progress)
+    progress.report()
+    return games
+
+
+class Partitions:
+    """
+    Filas repartidas en archivos CSV en disco según el hash de su user_id, para procesar una partición a la vez.
+
+    Todas las filas de un mismo usuario (sus reseñas y sus items) quedan en la misma partición, por lo que las
+    uniones y la eliminación de duplicados se pueden hacer partición por partición.
+
+    Args:
+        directory (str): Directorio de los archivos.
+        name (str): Prefijo de los archivos.
+        n_partitions (int): Número de particiones.
+        user_column (int): Posición del user_id en las filas.
+    """
+
+    def __init__(self, directory, name, n_partitions, user_column):
+        self.paths = [os.path.join(directory, f'{name}_{i}.csv') for i in range(n_partitions)]
+        self.user_column = user_column
+        self._files = [open(path, 'w', encoding='utf-8', newline='') for path in self.paths]
+        self._writers = [csv.writer(file) for file in self._files]
+
+    def write(self, rows):
+        n_partitions = len(self._writers)
+        for row in rows:
+            self._writers[partition_of(row[self.user_column], n_partitions)].writerow(row)
+
+    def close(self):
+        for file in self._files:
+            file.close()
+
+    def read(self, partition):
+        """
+        Filas de una partición, con los campos vacíos como None.
+        """
+        with open(self.paths[partition], encoding='utf-8', newline='') as file:
+            for row in csv.reader(file):
+                yield [value if value != '' else None for value in row]
+
+
+def partition_of(user_id, n_partitions):
+    """
+    Partición de un user_id (estable entre ejecuciones, a diferencia de hash()).
+    """
+    return zlib.crc32(str(user_id).encode('utf-8')) % n_partitions
+
+
+def count_partitions(path, partition_mb):
+    """
+    Número de particiones para que cada una tenga alrededor de partition_mb MB de reseñas del archivo original.
+    """
+    return max(1, math.ceil(os.path.getsize(path) / (partition_mb * 2**20)))
+
+
+def run_reviews(path, output_path, scorer, partitions, chunk_size=10000, progress_every=100000):
+    """
+    Etapa 2: calcula el sentimiento, escribe processed_users_reviews.csv y reparte las reseñas por usuario como
+    (posición, user_id, item_id, sentiment), donde la posición es el orden de la reseña en el archivo.
+    """
+    progress = Progress('reseñas', progress_every)
+    first = True
+    position = 0
+    for rows in clean_reviews(progress.count(review_records(path)), scorer, chunk_size):
+        write_chunk(rows, output_path, REVIEWS_COLUMNS, first, progress)
+        first = False
+        partitions.write([position + i, *row] for i, row in enumerate(rows))
+        position += len(rows)
+    if first:
+        write_chunk([], output_path, REVIEWS_COLUMNS, first, progress)
+    progress.report()
+    print(f"[reseñas] sentimiento: {scorer.stats()}", file=progress.out, flush=True)
+
+
+def run_items(path, output_path, partitions, chunk_size=10000, progress_every=100000):
+    """
+    Etapa 3: escribe processed_users_items.csv y reparte las filas por usuario, igual que las reseñas.
+    """
+    progress = Progress('items', progress_every)
+    first = True
+    for rows in explode_user_items(progress.count(user_item_records(path)), chunk_size):
+        write_chunk(rows, output_path, ITEMS_COLUMNS, first, progress)
+        first = False
+        partitions.write(rows)
+    if first:
+        write_chunk([], output_path, ITEMS_COLUMNS, first, progress)
+    progress.report()
+
+
+def join_partition(reviews, items, games):
+    """
+    Une las reseñas de una partición con sus items (unión interna) y sus juegos (unión por la izquierda).
+
+    Las filas de una reseña se obtienen siempre de las mismas tablas, por lo que dos reseñas con el mismo
+    (user_id, item_id, sentiment) producen las mismas filas y las de reseñas distintas nunca coinciden. Como las
+    reseñas repetidas son del mismo usuario, están en la misma partición: basta con descartar las claves ya vistas
+    en ella (conservando la primera, como drop_duplicates) y las filas repetidas dentro de cada reseña.
+
+    Args:
+        reviews (iterable): Reseñas de la partición (posición, user_id, item_id, sentiment), en orden.
+        items (iterable): Filas de items de la partición (user_id, items_count, item_id, playtime_forever).
+        games (dict): Tabla item_id -> filas de juego (run_games).
+
+    Yields:
+        tuple: Filas (posición de la reseña, columnas de DATASET_COLUMNS...).
+    """
+    reviews = [(int(position), user_id, normalize_item_id(item_id), 1 if is_missing(sentiment) else sentiment)
+               for position, user_id, item_id, sentiment in reviews]
+    keys = {(user_id, item_id) for _, user_id, item_id, _ in reviews}
+    played = {}
+    for user_id, items_count, item_id, playtime in items:
+        key = (user_id, normalize_item_id(item_id))
+        if key in keys:
+            played.setdefault(key, []).append((items_count, playtime))
+    del keys
+
+    seen = set()
+    for position, user_id, item_id, sentiment in reviews:
+        review = (user_id, item_id, sentiment)
+        if review in seen:
+            continue
+        seen.add(review)
+        review_rows = set()
+        for items_count, playtime in played.get((user_id, item_id), ()):
+            if is_missing(playtime):
+                continue
+            for genre, app_name, price, developer, year in games.get(item_id, ()):
+                row = review + (items_count, playtime, genre, app_name, parse_price(price), developer, year)
+                if row not in review_rows:
+                    review_rows.add(row)
+                    yield (position,) + row
+
+
+def run_dataset(reviews, items, output_path, games, progress_every=100000):
+    """
+    Etapa 4: une las reseñas con sus items y sus juegos partición por partición (join_partition), descarta las
+    filas sin género, año o tiempo de juego y las duplicadas, y escribe el dataset final.
+
+    La memoria depende del tamaño de una partición y no del total de reseñas. Las filas de cada partición se
+    escriben en disco en el orden de las reseñas, y al final se intercalan por la posición de la reseña
+    (heapq.merge, leyendo un archivo por partición a la vez) para escribir el dataset en el orden del archivo de
+    reseñas, como pd.merge.
+
+    Args:
+        reviews (Partitions): Reseñas repartidas por run_reviews.
+        items (Partitions): Items repartidos por run_items.
+        output_path (str): Ruta del dataset final.
+        games (dict): Tabla item_id -> filas de juego (run_games).
+        progress_every (int, opcional): Cada cuántas reseñas se imprime el avance. Por defecto es 100000.
+    """
+    progress = Progress('dataset', progress_every)
+    joined = []
+    for partition in range(len(reviews.paths)):
+        path = reviews.paths[partition][:-len('.csv')] + '_dataset.csv'
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            csv.writer(file).writerows(join_partition(progress.count(reviews.read(partition)),
+                                                      items.read(partition), games))
+        joined.append(path)
+
+    files = [open(path, encoding='utf-8', newline='') for path in joined]
+    try:
+        rows = heapq.merge(*(csv.reader(file) for file in files), key=lambda row: int(row[0]))
+        with open(output_path, 'w', encoding='utf-8', newline='') as output:
+            writer = csv.writer(output, lineterminator='\n')
+            writer.writerow(DATASET_COLUMNS)
+            for row in rows:
+                writer.writerow(row[1:])
+                progress.written += 1
+    finally:
+        for file in files:
+            file.close()
+    progress.report()
+
+
+def make_dataset(raw_dir, processed_dir, output_path, chunk_size=10000, progress_every=100000,
+                 sentiment_cache=None, sentiment_workers=None, partition_mb=64):
+    """
+    Ejecuta las cuatro etapas del pipeline.
+
+    Args:
+        raw_dir (str): Directorio con steam_games.json, user_reviews.json y users_items.json.
+        processed_dir (str): Directorio donde se escriben los CSV procesados de cada archivo.
+        output_path (str): Ruta del dataset final.
+        chunk_size (int, opcional): Número de registros por bloque. Por defecto es 10000.
+        progress_every (int, opcional): Cada cuántos registros se imprime el avance. Por defecto es 100000.
+        sentiment_cache (str, opcional): Archivo de la caché de sentimiento. Por defecto no se usa caché.
+        sentiment_workers (int, opcional): Procesos para el sentimiento. Por defecto, el número de CPUs.
+        partition_mb (float, opcional): MB de user_reviews.json por partición de la unión. Por defecto es 64.
+
+    Returns:
+        str: Ruta del dataset final.
+    """
+    os.makedirs(processed_dir, exist_ok=True)
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    reviews_path = os.path.join(raw_dir, 'user_reviews.json')
+    n_partitions = count_partitions(reviews_path, partition_mb)
+
+    games = run_games(os.path.join(raw_dir, 'steam_games.json'),
+                      os.path.join(processed_dir, 'processed_steam_games.csv'), chunk_size, progress_every)
+    with tempfile.TemporaryDirectory(dir=processed_dir) as partitions_dir:
+        reviews = Partitions(partitions_dir, 'reviews', n_partitions, user_column=1)
+        with SentimentScorer(sentiment_cache, sentiment_workers) as scorer:
+            run_reviews(reviews_path, os.path.join(processed_dir, 'processed_users_reviews.csv'), scorer, reviews,
+                        chunk_size, progress_every)
+        reviews.close()
+        items = Partitions(partitions_dir, 'items', n_partitions, user_column=0)
+        run_items(os.path.join(raw_dir, 'users_items.json'),
+                  os.path.join(processed_dir, 'processed_users_items.csv'), items, chunk_size, progress_every)
+        items.close()
+        print(f"[dataset] {n_partitions} particiones", file=sys.stderr, flush=True)
+        run_dataset(reviews, items, output_path, games, progress_every)
+    return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--raw-dir', default='./data/raw')
+    parser.add_argument('--processed-dir', default='./data/processed')
+    parser.add_argument('--output', default='./src/data/dataset_full.csv')
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--progreso', type=int, default=100000, help='cada cuántos registros se imprime el avance')
+    parser.add_argument('--sentiment-cache', default='./data/interim/sentiment_cache.sqlite',
+                        help="caché de sentimiento en disco ('' para no usarla)")
+    parser.add_argument('--sentiment-workers', type=int, default=None, help='procesos para el sentimiento')
+    parser.add_argument('--particion-mb', type=float, default=64,
+                        help='MB de user_reviews.json por partición de la unión final')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    output_path = make_dataset(args.raw_dir, args.processed_dir, args.output, args.chunk_size, args.progreso,
+                               args.sentiment_cache or None, args.sentiment_workers, args.particion_mb)
+    print(f"Dataset guardado en {output_path} ({time.perf_counter() - inicio:.1f} s, "
+          f"memoria máxima {peak_rss_mb():.0f} MB)")
+
+
+if __name__ == '__main__':
+    main()
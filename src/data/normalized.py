@@ -0,0 +1,266 @@
+"""
+Modelo de datos normalizado del dataset, con identificadores codificados y columnas compactas.
+
+El dataset (el CSV y su artefacto columnar) tiene una fila por (usuario, juego, género): el nombre, el
+desarrollador, el precio y el año de cada juego se repiten en todas sus filas, y el tiempo de juego y el sentimiento
+de cada par (usuario, juego) se repiten en cada uno de sus géneros. normalize() lo separa en tablas:
+
+- items: una fila por juego, en el orden de primera aparición en el dataset (el mismo de df_item en build_model),
+  con el item_id, los códigos de nombre y de desarrollador, el precio y el año.
+- app_names, developers y genres: diccionarios código -> texto, ordenados, de modo que ordenar por código es
+  ordenar por texto.
+- item_genres: vínculo juego-género como índice CSR; los géneros del juego i son
+  genre_codes[indptr[i]:indptr[i + 1]], en el orden en que aparecen en el dataset.
+- users: una fila por usuario, ordenada por user_id (guardado como bytes de ancho fijo), con su items_count.
+- user_items: tabla de hechos con una fila por par (usuario, juego), en el orden del dataset: códigos de usuario y
+  de juego, tiempo de juego y sentimiento.
+
+Las filas del dataset son exactamente las de user_items combinadas con los géneros de cada juego, en ese orden
+(wide_rows). normalize() lo comprueba y lanza ValueError si el dataset no tiene esa forma (un atributo del juego o
+del usuario que cambia entre filas, o filas de un mismo par que no son contiguas, como las que deja la ingesta de
+eventos de un par que ya existía); en ese caso se sigue usando el DataFrame. Así, los agregados y el modelo que se
+calculan sobre las tablas son idénticos a los que se calculan sobre el dataset.
+
+Uso (desde la raíz del repositorio), para ver los bytes de cada tabla frente a los DataFrames:
+    python src/data/normalized.py ./src/data/dataset_full.csv
+"""
+
+# Importamos las librerías a usar
+import os
+import sys
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from columnar import SortedStringIndex, _codes_dtype, file_checksum, load_dataset
+
+# Tabla de juegos (una fila por código de juego):
+# - item_id (np.ndarray int32), app_name y developer (códigos en app_names y developers),
+#   price (np.ndarray float32) y release_year (np.ndarray int32).
+Items = namedtuple('Items', ['item_id', 'app_name', 'developer', 'price', 'release_year'])
+
+# Vínculo juego-género (CSR): indptr (np.ndarray int64, juegos + 1) y genre_codes (códigos en genres).
+ItemGenres = namedtuple('ItemGenres', ['indptr', 'genre_codes'])
+
+# Tabla de usuarios (una fila por código de usuario): user_id (SortedStringIndex, bytes de ancho fijo en lugar de
+# un objeto de Python por usuario) e items_count (np.ndarray int32).
+Users = namedtuple('Users', ['user_id', 'items_count'])
+
+# Tabla de hechos (una fila por par usuario-juego): user_codes, item_codes, playtime (np.ndarray float32) y
+# sentiment (np.ndarray int8).
+UserItemFacts = namedtuple('UserItemFacts', ['user_codes', 'item_codes', 'playtime', 'sentiment'])
+
+# Modelo completo; app_names, developers y genres son arreglos object con el texto de cada código
+NormalizedDataset = namedtuple('NormalizedDataset', ['items', 'app_names', 'developers', 'genres', 'item_genres',
+                                                     'users', 'user_items'])
+
+# Caché de tablas por ruta, junto a la suma de verificación del dataset del que se obtuvieron
+_tables = {}
+
+
+def _dictionary(column):
+    """
+    Codifica una columna como diccionario ordenado. Devuelve los códigos y el arreglo object de textos.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        # Se reutilizan los códigos del artefacto columnar, descartando las categorías sin filas
+        codes = column.cat.codes.to_numpy()
+        used = np.bincount(codes, minlength=len(column.cat.categories)) > 0
+        codes = (np.cumsum(used) - 1)[codes]
+        categories = np.asarray(column.cat.categories.astype(str), dtype=object)[used]
+    else:
+        codes, categories = pd.factorize(column.astype(str), sort=True)
+        categories = np.asarray(categories, dtype=object)
+    return codes.astype(_codes_dtype(len(categories))), categories
+
+
+def _first_positions(codes):
+    """
+    Posición de la primera aparición de cada código, para códigos asignados en orden de primera aparición.
+    """
+    running_max = np.maximum.accumulate(codes)
+    return np.flatnonzero(np.concatenate([[True], codes[1:] > running_max[:-1]]))
+
+
+def _ranges(starts, lengths):
+    """
+    Posiciones de los rangos [starts[i], starts[i] + lengths[i]) concatenados en orden.
+    """
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return np.repeat(starts, lengths) + offsets
+
+
+def wide_rows(tables):
+    """
+    Filas del dataset a partir de las tablas: user_items combinada con los géneros de cada juego.
+
+    Returns:
+        tuple: Dos arreglos con una posición por fila del dataset, en su orden:
+            - Fila de user_items de la que proviene.
+            - Código del género.
+    """
+    item_codes = tables.user_items.item_codes
+    indptr = tables.item_genres.indptr
+    lengths = indptr[item_codes + 1] - indptr[item_codes]
+    facts = np.repeat(np.arange(len(item_codes)), lengths)
+    return facts, tables.item_genres.genre_codes[_ranges(indptr[item_codes], lengths)]
+
+
+def normalize(dataset):
+    """
+    Separa el dataset en las tablas del modelo normalizado.
+
+    Args:
+        dataset (pd.DataFrame): Dataset con las columnas de dataset_full.csv, por ejemplo el de load_dataset.
+
+    Returns:
+        NormalizedDataset: Tablas del dataset.
+
+    Raises:
+        ValueError: Si las filas del dataset no son las de user_items combinadas con los géneros de cada juego, o
+            si user_id, genres, app_name o developer tienen nulos (los diccionarios no los representan; con el
+            DataFrame, groupby los descarta).
+    """
+    nulls = [column for column in ('user_id', 'genres', 'app_name', 'developer') if dataset[column].isna().any()]
+    if nulls:
+        raise ValueError(f"El dataset no se puede normalizar: hay nulos en {nulls}.")
+    user_codes, user_ids = _dictionary(dataset['user_id'])
+    genre_codes, genres = _dictionary(dataset['genres'])
+    app_codes, app_names = _dictionary(dataset['app_name'])
+    developer_codes, developers = _dictionary(dataset['developer'])
+    item_codes, item_ids = pd.factorize(dataset['item_id'].to_numpy())
+    item_codes = item_codes.astype(_codes_dtype(len(item_ids)))
+
+    # Primera fila de cada par (usuario, juego): las filas de un par son las de sus géneros, contiguas
+    keys = user_codes.astype(np.int64) * len(item_ids) + item_codes
+    starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    lengths = np.diff(np.append(starts, len(keys)))
+    facts = UserItemFacts(user_codes[starts], item_codes[starts],
+                          dataset['playtime_forever'].to_numpy(dtype=np.float32)[starts],
+                          dataset['sentiment'].to_numpy(dtype=np.int8)[starts])
+
+    # Atributos de cada juego, tomados de su primera fila, y de cada usuario, tomados de cualquiera de sus filas
+    # (_check comprueba que son los mismos en todas)
+    first_item_row = _first_positions(item_codes)
+    items = Items(np.asarray(item_ids, dtype=np.int32), app_codes[first_item_row], developer_codes[first_item_row],
+                  dataset['price'].to_numpy(dtype=np.float32)[first_item_row],
+                  dataset['release_year'].to_numpy(dtype=np.int32)[first_item_row])
+    items_count = np.zeros(len(user_ids), dtype=np.int32)
+    items_count[user_codes] = dataset['items_count'].to_numpy(dtype=np.int32)
+    users = Users(SortedStringIndex(*SortedStringIndex.encode(user_ids)), items_count)
+
+    # Géneros de cada juego: los del primer par en el que aparece
+    first_fact = _first_positions(facts.item_codes)
+    indptr = np.zeros(len(item_ids) + 1, dtype=np.int64)
+    np.cumsum(lengths[first_fact], out=indptr[1:])
+    item_genres = ItemGenres(indptr, genre_codes[_ranges(starts[first_fact], lengths[first_fact])])
+
+    tables = NormalizedDataset(items, app_names, developers, genres, item_genres, users, facts)
+    _check(tables, dataset, user_codes, item_codes, genre_codes, app_codes, developer_codes)
+    return tables
+
+
+def _check(tables, dataset, user_codes, item_codes, genre_codes, app_codes, developer_codes):
+    """
+    Comprueba que las filas que reconstruye wide_rows son las del dataset, columna por columna.
+    """
+    facts, genres = wide_rows(tables)
+    if len(facts) != len(dataset):
+        raise ValueError("El dataset no se puede normalizar: las filas de un par (usuario, juego) no son contiguas "
+                         "o sus géneros cambian entre usuarios.")
+    fact_items = tables.user_items.item_codes[facts]
+    items = tables.items
+    expected = {
+        'user_id': (user_codes, tables.user_items.user_codes[facts]),
+        'item_id': (item_codes, fact_items),
+        'genres': (genre_codes, genres),
+        'playtime_forever': (dataset['playtime_forever'].to_numpy(dtype=np.float32),
+                             tables.user_items.playtime[facts]),
+        'sentiment': (dataset['sentiment'].to_numpy(dtype=np.int8), tables.user_items.sentiment[facts]),
+        'items_count': (dataset['items_count'].to_numpy(dtype=np.int32),
+                        tables.users.items_count[tables.user_items.user_codes[facts]]),
+        'app_name': (app_codes, items.app_name[fact_items]),
+        'developer': (developer_codes, items.developer[fact_items]),
+        'price': (dataset['price'].to_numpy(dtype=np.float32), items.price[fact_items]),
+        'release_year': (dataset['release_year'].to_numpy(dtype=np.int32), items.release_year[fact_items]),
+    }
+    for column, (actual, rebuilt) in expected.items():
+        if not np.array_equal(actual, rebuilt, equal_nan=actual.dtype.kind == 'f'):
+            raise ValueError(f"El dataset no se puede normalizar: la columna '{column}' no depende solo del "
+                             "usuario, del juego o del par (usuario, juego).")
+
+
+def load_tables(file_path):
+    """
+    Devuelve las tablas normalizadas del dataset de un CSV, en caché mientras el archivo no cambie.
+
+    Raises:
+        ValueError: Si el dataset no se puede normalizar (ver normalize).
+    """
+    key = os.path.abspath(file_path)
+    checksum = file_checksum(file_path)
+    cached = _tables.get(key)
+    if cached is None or cached[0] != checksum:
+        cached = _tables[key] = (checksum, normalize(load_dataset(file_path)))
+    return cached[1]
+
+
+def load_normalized(file_path):
+    """
+    Devuelve las tablas normalizadas del dataset de un CSV o, si no se puede normalizar, el DataFrame de
+    load_dataset. build_aggregates y build_model aceptan cualquiera de los dos.
+    """
+    try:
+        return load_tables(file_path)
+    except ValueError:
+        return load_dataset(file_path)
+
+
+def _array_nbytes(values):
+    """
+    Bytes de un arreglo, incluidos los textos si es de objetos (como memory_usage(deep=True) de pandas).
+    """
+    if values.dtype == object:
+        return int(pd.Series(values, copy=False).memory_usage(index=False, deep=True))
+    return int(values.nbytes)
+
+
+def table_nbytes(tables):
+    """
+    Bytes de cada tabla del modelo normalizado: nombre -> bytes.
+    """
+    sizes = {}
+    for name, table in tables._asdict().items():
+        columns = table if isinstance(table, tuple) else (table,)
+        sizes[name] = sum(_array_nbytes(column.values if isinstance(column, SortedStringIndex) else column)
+                          for column in columns)
+    return sizes
+
+
+def report(file_path):
+    """
+    Bytes de cada tabla frente al DataFrame de pd.read_csv y al del artefacto columnar, como texto.
+    """
+    frame = pd.read_csv(file_path, dtype={'user_id': str})
+    dataset = load_dataset(file_path)
+    tables = normalize(dataset)
+    sizes = table_nbytes(tables)
+
+    lines = [f"{'tabla':<24}{'filas':>10}{'bytes':>14}"]
+    for name, table in tables._asdict().items():
+        if name == 'item_genres':
+            rows = len(table.genre_codes)
+        else:
+            rows = len(table[0]) if isinstance(table, tuple) else len(table)
+        lines.append(f"{name:<24}{rows:>10}{sizes[name]:>14,}")
+    total = sum(sizes.values())
+    lines.append(f"{'total':<24}{'':>10}{total:>14,}")
+    for name, df in (('DataFrame (CSV)', frame), ('DataFrame (columnar)', dataset)):
+        nbytes = int(df.memory_usage(index=True, deep=True).sum())
+        lines.append(f"{name:<24}{len(df):>10}{nbytes:>14,}  ({nbytes / total:.1f}x)")
+    return '\n'.join(lines)
+
+
+if __name__ == '__main__':
+    print(report(sys.argv[1] if len(sys.argv) > 1 else './src/data/dataset_full.csv'))
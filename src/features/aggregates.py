@@ -0,0 +1,262 @@
+"""
+Agregados precalculados para los endpoints de consultas de funciones.py.
+
+Cada endpoint de consultas filtraba y agrupaba todo el dataset en cada llamada. Aquí se materializan una sola vez
+los cubos que necesitan, de modo que cada consulta queda reducida a una búsqueda en un diccionario:
+
+- genre_year_playtime: género -> {año: horas jugadas}.
+- genre_user_playtime: género -> (usuarios, horas jugadas), ordenados de mayor a menor tiempo de juego.
+- year_app_positive: año -> (juegos, reseñas positivas o neutrales), ordenados como value_counts.
+- year_developer_negative: año -> (desarrolladores, reseñas negativas), ordenados como value_counts.
+- developer_sentiment: desarrollador -> {'Negative'/'Neutral'/'Positive': conteo}.
+
+Se calculan sobre el modelo normalizado (normalized.py) cuando el dataset se puede normalizar, agrupando códigos
+enteros en lugar de texto, o sobre el DataFrame en caso contrario; el resultado es el mismo.
+
+Los agregados se guardan junto al dataset con la suma de verificación (SHA-256) del archivo del que se
+calcularon; al reiniciar se reutilizan si el dataset no cambió y se recalculan si cambió.
+
+Los cubos por año no incluyen las filas sin año de lanzamiento (MISSING_YEAR en el artefacto columnar), como
+groupby no incluía los años nulos del CSV.
+"""
+
+# Importamos las librerías a usar
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from columnar import MISSING_YEAR, decoded, file_checksum
+from normalized import NormalizedDataset, wide_rows
+from timing import phase, record_size
+
+# Versión del formato de los agregados; si cambia, los archivos guardados se recalculan
+AGGREGATES_VERSION = 2
+
+# Mapeo de los códigos de sentimiento a su significado
+SENTIMENT_MAPPING = {0: 'Negative', 1: 'Neutral', 2: 'Positive'}
+
+
+def aggregates_path(file_path):
+    """
+    Ruta del archivo de agregados que acompaña a un dataset.
+    """
+    return os.path.splitext(file_path)[0] + '.aggregates.pkl'
+
+
+def _ranking(counts):
+    """
+    Convierte un conteo de pandas en una tupla (etiquetas, valores) de arreglos de NumPy.
+    """
+    return counts.index.to_numpy(), counts.to_numpy()
+
+
+def _decoded_ranking(counts, labels):
+    """
+    Como _ranking, para un conteo indexado por códigos: las etiquetas se decodifican con el arreglo 'labels'.
+    """
+    return labels[counts.index.to_numpy()], counts.to_numpy()
+
+
+def build_aggregates(dataset):
+    """
+    Calcula los cubos de agregados para los endpoints de consultas.
+
+    Si recibe el modelo normalizado, delega en build_aggregates_from_tables.
+
+    Los rankings se calculan con value_counts sobre cada grupo, igual que lo hacían los endpoints, para conservar
+    el mismo orden en los empates. Las columnas categóricas se decodifican a texto y las horas jugadas se suman en
+    float64 para que los resultados no dependan del tipo compacto con el que se guardó el dataset.
+
+    Args:
+        dataset (pd.DataFrame o NormalizedDataset): Dataset completo con las columnas 'user_id', 'genres',
+            'release_year', 'playtime_forever', 'sentiment', 'app_name' y 'developer', o sus tablas normalizadas.
+
+    Returns:
+        dict: Diccionario con los cinco cubos descritos en el módulo.
+    """
+    if isinstance(dataset, NormalizedDataset):
+        return build_aggregates_from_tables(dataset)
+
+    dataset = decoded(dataset, ['user_id', 'genres', 'release_year', 'playtime_forever', 'sentiment', 'app_name',
+                                'developer'])
+    dataset['playtime_forever'] = dataset['playtime_forever'].astype('float64')
+    by_genre = dataset.groupby('genres')
+
+    # Horas jugadas por género y año
+    dated = dataset[dataset['release_year'] != MISSING_YEAR]
+    genre_year = dated.groupby(['genres', 'release_year'])['playtime_forever'].sum()
+    genre_year_playtime = {genre: playtime.droplevel(0).to_dict() for genre, playtime in genre_year.groupby(level=0)}
+
+    # Horas jugadas por género y usuario, de mayor a menor (el orden estable conserva el primer máximo de idxmax)
+    genre_user_playtime = {
+        genre: _ranking(group.groupby('user_id')['playtime_forever'].sum().sort_values(ascending=False, kind='stable'))
+        for genre, group in by_genre
+    }
+
+    # Juegos con más reseñas positivas o neutrales por año
+    positives = dated[dated['sentiment'].isin([1, 2])]
+    year_app_positive = {year: _ranking(apps.value_counts()) for year, apps in positives.groupby('release_year')['app_name']}
+
+    # Desarrolladores con más reseñas negativas por año
+    negatives = dated[dated['sentiment'] == 0]
+    year_developer_negative = {
+        year: _ranking(developers.value_counts()) for year, developers in negatives.groupby('release_year')['developer']
+    }
+
+    # Conteo de reseñas por sentimiento para cada desarrollador (los nulos se tratan como neutrales)
+    sentiment = dataset['sentiment'].fillna(1)
+    developer_sentiment = {
+        developer: {SENTIMENT_MAPPING.get(k, k): int(v) for k, v in counts.value_counts().items()}
+        for developer, counts in sentiment.groupby(dataset['developer'])
+    }
+
+    return {
+        'genre_year_playtime': genre_year_playtime,
+        'genre_user_playtime': genre_user_playtime,
+        'year_app_positive': year_app_positive,
+        'year_developer_negative': year_developer_negative,
+        'developer_sentiment': developer_sentiment,
+    }
+
+
+def build_aggregates_from_tables(tables):
+    """
+    Calcula los mismos cubos que build_aggregates a partir del modelo normalizado.
+
+    Las filas del dataset se reconstruyen como códigos enteros (wide_rows) y se agrupan por código. Como los
+    diccionarios están ordenados y las filas conservan el orden del dataset, los grupos, las sumas y el orden de los
+    empates son los mismos que al agrupar el texto; solo se decodifican las etiquetas de los resultados.
+
+    Args:
+        tables (NormalizedDataset): Tablas del dataset.
+
+    Returns:
+        dict: Diccionario con los cinco cubos descritos en el módulo.
+    """
+    facts, genre_codes = wide_rows(tables)
+    user_items, items = tables.user_items, tables.items
+    item_codes = user_items.item_codes[facts]
+    rows = pd.DataFrame({
+        'user': user_items.user_codes[facts],
+        'genre': genre_codes,
+        'release_year': items.release_year[item_codes],
+        'playtime': user_items.playtime[facts].astype('float64'),
+        'sentiment': user_items.sentiment[facts],
+        'app': items.app_name[item_codes],
+        'developer': items.developer[item_codes],
+    })
+    genres, user_ids = tables.genres, tables.users.user_id[np.arange(len(tables.users.user_id))]
+
+    # Horas jugadas por género y año
+    dated = rows[rows['release_year'] != MISSING_YEAR]
+    genre_year = dated.groupby(['genre', 'release_year'])['playtime'].sum()
+    genre_year_playtime = {genres[genre]: playtime.droplevel(0).to_dict()
+                           for genre, playtime in genre_year.groupby(level=0)}
+
+    # Horas jugadas por género y usuario, de mayor a menor
+    genre_user_playtime = {
+        genres[genre]: _decoded_ranking(
+            group.groupby('user')['playtime'].sum().sort_values(ascending=False, kind='stable'), user_ids)
+        for genre, group in rows.groupby('genre')
+    }
+
+    # Juegos con más reseñas positivas o neutrales y desarrolladores con más reseñas negativas por año
+    positives = dated[dated['sentiment'].isin([1, 2])]
+    year_app_positive = {year: _decoded_ranking(apps.value_counts(), tables.app_names)
+                         for year, apps in positives.groupby('release_year')['app']}
+    negatives = dated[dated['sentiment'] == 0]
+    year_developer_negative = {year: _decoded_ranking(developers.value_counts(), tables.developers)
+                               for year, developers in negatives.groupby('release_year')['developer']}
+
+    # Conteo de reseñas por sentimiento para cada desarrollador
+    developer_sentiment = {
+        tables.developers[developer]: {SENTIMENT_MAPPING.get(k, k): int(v) for k, v in counts.value_counts().items()}
+        for developer, counts in rows['sentiment'].groupby(rows['developer'])
+    }
+
+    return {
+        'genre_year_playtime': genre_year_playtime,
+        'genre_user_playtime': genre_user_playtime,
+        'year_app_positive': year_app_positive,
+        'year_developer_negative': year_developer_negative,
+        'developer_sentiment': developer_sentiment,
+    }
+
+
+def load_or_build_aggregates(file_path, load_dataset):
+    """
+    Carga los agregados guardados junto al dataset, o los calcula y guarda si no existen o el dataset cambió.
+
+    Args:
+        file_path (str): Ruta al archivo del dataset.
+        load_dataset (callable): Función sin argumentos que devuelve el dataset o sus tablas normalizadas (por
+            ejemplo, load_normalized); solo se llama si hay que recalcular los agregados.
+
+    Returns:
+        dict: Diccionario con los cinco cubos de agregados.
+    """
+    with phase('aggregates'):
+        checksum = file_checksum(file_path)
+        path = aggregates_path(file_path)
+
+        cubes = None
+        if os.path.exists(path):
+            with open(path, 'rb') as file:
+                stored = pickle.load(file)
+            if stored.get('version') == AGGREGATES_VERSION and stored.get('checksum') == checksum:
+                cubes = stored['cubes']
+
+        if cubes is None:
+            cubes = build_aggregates(load_dataset())
+            save_aggregates(file_path, cubes, checksum)
+
+    # Tamaño aproximado de los cubos en memoria: el de su archivo serializado
+    record_size('aggregates', os.path.getsize(path))
+    return cubes
+
+
+def save_aggregates(file_path, cubes, checksum=None):
+    """
+    Guarda los agregados junto al dataset con la suma de verificación del archivo (por defecto, la actual).
+    """
+    checksum = checksum or file_checksum(file_path)
+    path = aggregates_path(file_path)
+
+    # Se escribe en un archivo temporal y se renombra, para no dejar un archivo a medias si el proceso se detiene
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as file:
+        pickle.dump({'version': AGGREGATES_VERSION, 'checksum': checksum, 'cubes': cubes}, file,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def update_aggregates(cubes, dataset, rows):
+    """
+    Actualiza los agregados después de añadir filas al dataset, recalculando solo los grupos afectados.
+
+    Cada cubo depende de un solo criterio de agrupación (género, año o desarrollador), así que basta con recalcular
+    los géneros, años y desarrolladores que aparecen en las filas nuevas a partir de las filas del dataset de esos
+    grupos. Como el filtrado conserva el orden de las filas, el resultado (incluido el orden de los empates) es el
+    mismo que el de build_aggregates sobre el dataset completo.
+
+    Args:
+        cubes (dict): Agregados actuales; se modifican en el lugar.
+        dataset (pd.DataFrame): Dataset completo, que ya incluye las filas nuevas.
+        rows (pd.DataFrame): Filas añadidas, tomadas del propio dataset (por ejemplo, dataset.iloc[n_anteriores:]).
+
+    Returns:
+        dict: Los agregados actualizados.
+    """
+    groups = {
+        'genres': ['genre_year_playtime', 'genre_user_playtime'],
+        'release_year': ['year_app_positive', 'year_developer_negative'],
+        'developer': ['developer_sentiment'],
+    }
+    for column, names in groups.items():
+        values = np.asarray(rows[column].unique())
+        partial = build_aggregates(dataset[dataset[column].isin(values)])
+        for name in names:
+            cubes[name].update(partial[name])
+    return cubes
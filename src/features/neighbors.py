@@ -0,0 +1,402 @@
+"""
+Índices de vecinos más cercanos para los sistemas de recomendación ítem-ítem y usuario-ítem.
+
+En lugar de materializar la matriz de similitud del coseno completa (N x N), que crece de forma cuadrática
+con el catálogo, se guardan solamente los K vecinos más similares de cada juego y su puntuación. La matriz se
+calcula por bloques de filas a partir de la matriz TF-IDF dispersa y en cada bloque se hace una selección
+parcial (np.partition), por lo que nunca existe en memoria más que un bloque de tamaño chunk_size x N.
+
+Para usuario-ítem tampoco se guarda la matriz de similitud usuarios x usuarios: se guarda el perfil de géneros de
+cada usuario como una matriz float32 (usuarios x géneros) normalizada, y los vecinos de un usuario se calculan
+bajo demanda, ya sea de forma exacta (producto contra todos los perfiles) o aproximada con un índice de
+proyecciones aleatorias (LSH), de modo que todos los usuarios quedan cubiertos con memoria lineal.
+"""
+
+# Importamos las librerías a usar
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Estructura del índice:
+# - item_index (pd.Index): item_id de cada fila, permite ubicar la fila de un juego sin recorrer el DataFrame.
+# - indices (np.ndarray int32, N x K): posiciones de los K vecinos de cada juego, ordenados de mayor a menor similitud.
+# - scores (np.ndarray float32, N x K): similitud del coseno de cada vecino.
+ItemNeighbors = namedtuple('ItemNeighbors', ['item_index', 'indices', 'scores'])
+
+# Estructura del motor de similitud entre usuarios:
+# - user_index (pd.Index): user_id de cada fila de la matriz de perfiles.
+# - genres (pd.Index): género de cada columna de la matriz de perfiles.
+# - profiles (np.ndarray float32, usuarios x géneros): proporción de tiempo por género normalizada a norma 1,
+#   de modo que el producto punto entre dos filas es su similitud del coseno.
+# - lsh (UserLSH o None): índice de proyecciones aleatorias para el modo aproximado.
+# - mode (str): modo de búsqueda por defecto, 'exact' o 'approx'.
+UserNeighbors = namedtuple('UserNeighbors', ['user_index', 'genres', 'profiles', 'lsh', 'mode'])
+
+# Índice LSH con n_tables tablas de n_bits hiperplanos aleatorios cada una:
+# - planes (np.ndarray float32, n_tables x n_bits x géneros): normales de los hiperplanos.
+# - codes (np.ndarray int32, n_tables x usuarios): código de cubeta de cada usuario ordenado de menor a mayor.
+# - order (np.ndarray int32, n_tables x usuarios): fila del usuario correspondiente a cada código ordenado.
+UserLSH = namedtuple('UserLSH', ['planes', 'codes', 'order'])
+
+# Matrices para calcular vecinos ítem-ítem bajo demanda (similar_items):
+# - tfidf (scipy.sparse.csr_matrix float32): vectores TF-IDF de los juegos (N x términos).
+# - tfidf_transposed (scipy.sparse.csr_matrix float32): su transpuesta en CSR.
+ItemSimilarity = namedtuple('ItemSimilarity', ['tfidf', 'tfidf_transposed'])
+
+
+def top_k_rows(block, k):
+    """
+    Selecciona las k columnas con mayor puntuación en cada fila de un bloque denso.
+
+    Utiliza una selección parcial en lugar de ordenar toda la fila. Los empates se resuelven a favor de la
+    columna con menor índice, igual que un ordenamiento estable, para que el resultado sea determinista.
+
+    Args:
+        block (numpy.ndarray): Matriz de puntuaciones de tamaño (filas x columnas).
+        k (int): Número de columnas a seleccionar por fila, como máximo el número de columnas.
+
+    Returns:
+        tuple: Dos matrices de tamaño (filas x k):
+            - Índices de las columnas seleccionadas, ordenados de mayor a menor puntuación.
+            - Puntuaciones correspondientes.
+    """
+    n_rows = block.shape[0]
+
+    # Umbral por fila: la k-ésima mayor puntuación
+    threshold = -np.partition(-block, k - 1, axis=1)[:, k - 1]
+
+    # Todo lo que supera el umbral entra; de los empates con el umbral se toman los de menor índice
+    above = block > threshold[:, None]
+    ties = block == threshold[:, None]
+    missing = k - above.sum(axis=1)
+    selected = above | (ties & (np.cumsum(ties, axis=1, dtype=np.int32) <= missing[:, None]))
+
+    # np.nonzero recorre por filas y en orden creciente de columna, por lo que cada fila aporta exactamente k índices
+    columns = np.nonzero(selected)[1].reshape(n_rows, k)
+    scores = np.take_along_axis(block, columns, axis=1)
+
+    # Orden estable por puntuación descendente, conservando el menor índice en los empates
+    order = np.argsort(-scores, axis=1, kind='stable')
+    return np.take_along_axis(columns, order, axis=1), np.take_along_axis(scores, order, axis=1)
+
+
+def build_item_similarity(tfidf_matrix):
+    """
+    Convierte la matriz TF-IDF de los juegos a float32 y calcula su transpuesta, una sola vez por modelo.
+    """
+    tfidf = tfidf_matrix.tocsr().astype(np.float32)
+    return ItemSimilarity(tfidf, tfidf.T.tocsr())
+
+
+def build_item_neighbors(tfidf_matrix, item_ids, k=50, chunk_size=256, item_similarity=None):
+    """
+    Construye el índice de los K vecinos más similares de cada juego a partir de su matriz TF-IDF.
+
+    La similitud del coseno se calcula por bloques de chunk_size filas (los vectores TF-IDF ya están
+    normalizados, por lo que el producto punto es la similitud del coseno). De cada bloque se conservan solamente
+    los K vecinos de cada fila, excluyendo al propio juego.
+
+    Args:
+        tfidf_matrix (scipy.sparse.csr_matrix): Matriz TF-IDF dispersa de los juegos (N x términos).
+        item_ids (array-like): item_id de cada fila de la matriz.
+        k (int, opcional): Número de vecinos a guardar por juego. Por defecto es 50.
+        chunk_size (int, opcional): Número de filas por bloque. Por defecto es 256.
+        item_similarity (ItemSimilarity, opcional): build_item_similarity(tfidf_matrix), si ya se calculó.
+
+    Returns:
+        ItemNeighbors: Índice con el item_id de cada fila, los vecinos y sus puntuaciones.
+    """
+    tfidf_matrix, tfidf_transposed = item_similarity or build_item_similarity(tfidf_matrix)
+    n_items = tfidf_matrix.shape[0]
+    k = max(min(k, n_items - 1), 0)
+
+    indices = np.empty((n_items, k), dtype=np.int32)
+    scores = np.empty((n_items, k), dtype=np.float32)
+
+    if k:
+        for start in range(0, n_items, chunk_size):
+            stop = min(start + chunk_size, n_items)
+            indices[start:stop], scores[start:stop] = similar_items(tfidf_matrix, np.arange(start, stop), k,
+                                                                    tfidf_transposed)
+
+    return ItemNeighbors(pd.Index(item_ids), indices, scores)
+
+
+def similar_items(tfidf_matrix, rows, k, tfidf_transposed=None):
+    """
+    Los k juegos más similares a cada juego de 'rows', sin el propio juego, con la similitud del coseno entre sus
+    vectores TF-IDF y selección parcial (top_k_rows). Con la matriz en float32 el resultado coincide con las filas
+    de build_item_neighbors, por lo que sirve para pedir más vecinos de los que guarda el índice.
+
+    Args:
+        tfidf_matrix (scipy.sparse.csr_matrix): Matriz TF-IDF de los juegos (N x términos).
+        rows (numpy.ndarray): Filas de los juegos consultados.
+        k (int): Número de vecinos por juego, como máximo N - 1.
+        tfidf_transposed (scipy.sparse.csr_matrix, opcional): tfidf_matrix.T en CSR, si ya se calculó.
+
+    Returns:
+        tuple: Índices y puntuaciones de los vecinos (len(rows) x k), de mayor a menor similitud.
+    """
+    if tfidf_transposed is None:
+        tfidf_transposed = tfidf_matrix.T.tocsr()
+    block = (tfidf_matrix[rows] @ tfidf_transposed).toarray()
+
+    # El propio juego no puede ser su vecino
+    block[np.arange(len(rows)), rows] = -np.inf
+    return top_k_rows(block, k)
+
+
+def build_user_profiles(df):
+    """
+    Construye el perfil de géneros de cada usuario como una matriz float32 normalizada.
+
+    Agrupa el tiempo de juego por usuario y género, calcula la proporción del tiempo dedicado a cada género y
+    normaliza cada fila a norma 1. Los usuarios sin tiempo de juego quedan con un perfil de ceros.
+
+    Args:
+        df (pd.DataFrame): DataFrame con las columnas 'user_id', 'genres' y 'playtime_forever'.
+
+    Returns:
+        tuple: Contiene tres elementos en el siguiente orden:
+            - pd.Index con el user_id de cada fila.
+            - pd.Index con el género de cada columna.
+            - Matriz float32 (usuarios x géneros) con los perfiles normalizados.
+    """
+    user_codes, user_index = pd.factorize(df['user_id'], sort=True)
+    genre_codes, genres = pd.factorize(df['genres'], sort=True)
+    profiles = _genre_profiles(df['playtime_forever'], user_codes, genre_codes, len(user_index), len(genres))
+    return pd.Index(np.asarray(user_index)), pd.Index(np.asarray(genres)), profiles
+
+
+def build_user_profiles_from_codes(user_ids, genres, user_codes, genre_codes, playtime):
+    """
+    Construye los perfiles de géneros con el mismo cálculo que build_user_profiles, a partir de códigos enteros.
+
+    Sirve para el modelo normalizado: las filas son las del dataset (en su orden) con el usuario y el género como
+    códigos en diccionarios ordenados, de modo que el resultado es idéntico al de build_user_profiles. Los usuarios y
+    géneros sin filas no se incluyen.
+
+    Args:
+        user_ids (numpy.ndarray): user_id de cada código de usuario, ordenados.
+        genres (numpy.ndarray): Género de cada código de género, ordenados.
+        user_codes (numpy.ndarray): Código de usuario de cada fila.
+        genre_codes (numpy.ndarray): Código de género de cada fila.
+        playtime (numpy.ndarray): Tiempo de juego de cada fila.
+
+    Returns:
+        tuple: Los mismos tres elementos que build_user_profiles.
+    """
+    user_used = np.bincount(user_codes, minlength=len(user_ids)) > 0
+    genre_used = np.bincount(genre_codes, minlength=len(genres)) > 0
+    user_codes = (np.cumsum(user_used) - 1)[user_codes]
+    genre_codes = (np.cumsum(genre_used) - 1)[genre_codes]
+    user_index, genres = np.asarray(user_ids)[user_used], np.asarray(genres)[genre_used]
+    profiles = _genre_profiles(playtime, user_codes, genre_codes, len(user_index), len(genres))
+    return pd.Index(user_index), pd.Index(genres), profiles
+
+
+def build_user_profiles_for(df, user_index, genres):
+    """
+    Construye los perfiles de géneros de usuarios y géneros dados, con el mismo cálculo que build_user_profiles.
+
+    Sirve para recalcular solo algunos usuarios: con las filas de esos usuarios (en el orden del dataset), cada
+    perfil es idéntico al que se obtiene con build_user_profiles sobre el dataset completo.
+
+    Args:
+        df (pd.DataFrame): Filas de los usuarios con las columnas 'user_id', 'genres' y 'playtime_forever'.
+        user_index (pd.Index): user_id de cada fila del resultado.
+        genres (pd.Index): Género de cada columna del resultado.
+
+    Returns:
+        numpy.ndarray: Matriz float32 (len(user_index) x len(genres)) con los perfiles normalizados.
+
+    Raises:
+        ValueError: Si las filas tienen usuarios o géneros que no están en user_index o genres.
+    """
+    user_codes = user_index.get_indexer(np.asarray(df['user_id']))
+    genre_codes = genres.get_indexer(np.asarray(df['genres']))
+    if (user_codes < 0).any() or (genre_codes < 0).any():
+        raise ValueError("Las filas tienen usuarios o géneros que no están en el índice.")
+    return _genre_profiles(df['playtime_forever'], user_codes, genre_codes, len(user_index), len(genres))
+
+
+def _genre_profiles(playtime, user_codes, genre_codes, n_users, n_genres):
+    """
+    Suma el tiempo de juego por (usuario, género), lo convierte en proporciones y normaliza cada fila a norma 1.
+    """
+    # Suma del tiempo de juego por (usuario, género) sin crear la tabla dinámica de pandas
+    profiles = np.zeros((n_users, n_genres), dtype=np.float32)
+    np.add.at(profiles, (user_codes, genre_codes), np.asarray(playtime, dtype=np.float32))
+
+    # Proporción del tiempo por género (cada fila suma 1) y luego norma 1 para usar el producto punto como coseno
+    totals = profiles.sum(axis=1, keepdims=True)
+    np.divide(profiles, totals, out=profiles, where=totals > 0)
+    norms = np.linalg.norm(profiles, axis=1, keepdims=True)
+    np.divide(profiles, norms, out=profiles, where=norms > 0)
+    return profiles
+
+
+def _lsh_codes(planes, vectors):
+    """
+    Calcula el código de cubeta de cada vector en cada tabla a partir del signo de sus proyecciones.
+    """
+    bits = (np.einsum('tbg,ug->tub', planes, vectors) > 0).astype(np.int32)
+    weights = np.left_shift(1, np.arange(planes.shape[1], dtype=np.int32))
+    return bits @ weights
+
+
+def build_user_lsh(profiles, n_tables=8, n_bits=12, seed=0):
+    """
+    Construye un índice de proyecciones aleatorias (LSH) sobre los perfiles de usuario.
+
+    Cada tabla asigna a cada usuario un código de n_bits según el lado de cada hiperplano aleatorio en el que cae
+    su perfil; usuarios con perfiles parecidos tienden a compartir cubeta. Los códigos se guardan ordenados para
+    recuperar una cubeta con una búsqueda binaria.
+
+    Args:
+        profiles (numpy.ndarray): Matriz float32 de perfiles normalizados (usuarios x géneros).
+        n_tables (int, opcional): Número de tablas independientes. Por defecto es 8.
+        n_bits (int, opcional): Número de hiperplanos por tabla, máximo 31. Por defecto es 12.
+        seed (int, opcional): Semilla de los hiperplanos aleatorios. Por defecto es 0.
+
+    Returns:
+        UserLSH: Índice con los hiperplanos y los códigos ordenados de cada tabla.
+    """
+    rng = np.random.default_rng(seed)
+    planes = rng.standard_normal((n_tables, n_bits, profiles.shape[1])).astype(np.float32)
+    return index_user_lsh(planes, profiles)
+
+
+def index_user_lsh(planes, profiles):
+    """
+    Calcula y ordena los códigos LSH de los perfiles con hiperplanos ya generados (por ejemplo, los de un índice
+    guardado, para volver a indexar los perfiles después de actualizarlos).
+    """
+    codes = _lsh_codes(planes, profiles)
+    order = np.argsort(codes, axis=1, kind='stable').astype(np.int32)
+    return UserLSH(planes, np.take_along_axis(codes, order, axis=1), order)
+
+
+def build_user_neighbors(df, mode='exact', n_tables=8, n_bits=12, seed=0):
+    """
+    Construye el motor de similitud entre usuarios para todos los usuarios del dataset.
+
+    Args:
+        df (pd.DataFrame o tuple): DataFrame con las columnas 'user_id', 'genres' y 'playtime_forever', o los
+            perfiles ya calculados (el resultado de build_user_profiles o build_user_profiles_from_codes).
+        mode (str, opcional): Modo de búsqueda por defecto, 'exact' o 'approx'. Por defecto es 'exact'.
+        n_tables (int, opcional): Número de tablas del índice LSH. Por defecto es 8.
+        n_bits (int, opcional): Número de hiperplanos por tabla del índice LSH. Por defecto es 12.
+        seed (int, opcional): Semilla de los hiperplanos aleatorios. Por defecto es 0.
+
+    Returns:
+        UserNeighbors: Motor con los perfiles de usuario y, en modo aproximado, el índice LSH.
+    """
+    if mode not in ('exact', 'approx'):
+        raise ValueError(f"Modo de búsqueda no soportado: {mode}")
+
+    user_index, genres, profiles = df if isinstance(df, tuple) else build_user_profiles(df)
+    lsh = build_user_lsh(profiles, n_tables, n_bits, seed) if mode == 'approx' else None
+    return UserNeighbors(user_index, genres, profiles, lsh, mode)
+
+
+def similar_users(user_neighbors, position, k=50, mode=None):
+    """
+    Busca los k usuarios más similares a un usuario, excluyendo al propio usuario.
+
+    En modo exacto compara el perfil contra todos los perfiles. En modo aproximado solo compara contra los usuarios
+    que comparten cubeta en alguna de las tablas LSH; si esos candidatos no alcanzan para k vecinos, recurre a la
+    búsqueda exacta.
+
+    Args:
+        user_neighbors (UserNeighbors): Motor de similitud entre usuarios.
+        position (int): Fila del usuario en la matriz de perfiles.
+        k (int, opcional): Número de vecinos a devolver. Por defecto es 50.
+        mode (str, opcional): 'exact' o 'approx'. Por defecto se usa el modo del motor.
+
+    Returns:
+        tuple: Dos arreglos de largo k (o menos si no hay suficientes usuarios):
+            - Filas de los usuarios similares, ordenadas de mayor a menor similitud.
+            - Similitud del coseno de cada uno.
+    """
+    mode = mode or user_neighbors.mode
+    profiles = user_neighbors.profiles
+    query = profiles[position]
+
+    candidates = None
+    if mode == 'approx':
+        if user_neighbors.lsh is None:
+            raise ValueError("El motor no tiene índice LSH; constrúyalo con mode='approx'.")
+        lsh = user_neighbors.lsh
+        query_codes = _lsh_codes(lsh.planes, query[None, :])[:, 0]
+        buckets = []
+        for table, code in enumerate(query_codes):
+            start, stop = np.searchsorted(lsh.codes[table], [code, code + 1])
+            buckets.append(lsh.order[table, start:stop])
+        candidates = np.unique(np.concatenate(buckets))
+        candidates = candidates[candidates != position]
+        if len(candidates) < k:
+            candidates = None
+
+    if candidates is None:
+        columns, top_scores = _exact_similar_users(profiles, np.array([position]), k)
+        return columns[0], top_scores[0]
+
+    scores = profiles[candidates] @ query
+    k = min(k, len(candidates))
+    columns, top_scores = top_k_rows(scores[None, :], k)
+    return candidates[columns[0]], top_scores[0]
+
+
+def _exact_similar_users(profiles, positions, k):
+    """
+    Búsqueda exacta de los k usuarios más similares a varios usuarios a la vez, excluyendo a cada uno.
+
+    Devuelve dos matrices de tamaño (len(positions) x k'), con k' = min(k, usuarios - 1): filas de los usuarios
+    similares y su similitud.
+    """
+    k = min(k, len(profiles) - 1)
+    if k <= 0:
+        return np.empty((len(positions), 0), dtype=np.int64), np.empty((len(positions), 0), dtype=np.float32)
+    scores = profiles[positions] @ profiles.T
+    scores[np.arange(len(positions)), positions] = -np.inf
+    return top_k_rows(scores, k)
+
+
+def similar_users_batch(user_neighbors, positions, k=50, mode=None, chunk_size=256):
+    """
+    Busca los k usuarios más similares a cada uno de varios usuarios.
+
+    En modo exacto compara un bloque de chunk_size perfiles contra todos los perfiles con una sola multiplicación
+    de matrices y selecciona los k mejores de cada fila, de modo que la memoria temporal es
+    chunk_size x usuarios. En modo aproximado los candidatos LSH son distintos para cada usuario y se buscan uno
+    por uno con similar_users. El resultado de cada fila es el mismo que devuelve similar_users.
+
+    Args:
+        user_neighbors (UserNeighbors): Motor de similitud entre usuarios.
+        positions (numpy.ndarray): Filas de los usuarios en la matriz de perfiles.
+        k (int, opcional): Número de vecinos por usuario. Por defecto es 50.
+        mode (str, opcional): 'exact' o 'approx'. Por defecto se usa el modo del motor.
+        chunk_size (int, opcional): Número de usuarios por bloque en modo exacto. Por defecto es 256.
+
+    Returns:
+        tuple: Dos matrices de tamaño (len(positions) x k') con k' = min(k, usuarios - 1):
+            - Filas de los usuarios similares, ordenadas de mayor a menor similitud.
+            - Similitud del coseno de cada uno.
+    """
+    mode = mode or user_neighbors.mode
+    positions = np.asarray(positions, dtype=np.int64)
+    if mode == 'approx':
+        k = min(k, len(user_neighbors.profiles) - 1)
+        indices = np.empty((len(positions), max(k, 0)), dtype=np.int64)
+        scores = np.empty((len(positions), max(k, 0)), dtype=np.float32)
+        for row, position in enumerate(positions):
+            indices[row], scores[row] = similar_users(user_neighbors, position, k=k, mode=mode)
+        return indices, scores
+
+    blocks = [_exact_similar_users(user_neighbors.profiles, positions[start:start + chunk_size], k)
+              for start in range(0, len(positions), chunk_size)]
+    if not blocks:
+        return _exact_similar_users(user_neighbors.profiles, positions, k)
+    return np.concatenate([b[0] for b in blocks]), np.concatenate([b[1] for b in blocks])
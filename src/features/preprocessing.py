@@ -1,33 +1,158 @@
 # Importamos las librerías a usar
+from collections import namedtuple
+
 import pandas as pd
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 
-def load_and_preprocess_data(file_path):
+from columnar import load_dataset
+from normalized import NormalizedDataset, load_normalized, table_nbytes, wide_rows
+from neighbors import (UserNeighbors, build_item_neighbors, build_item_similarity, build_user_neighbors,
+                       build_user_profiles_for, build_user_profiles_from_codes, index_user_lsh)
+from timing import frame_nbytes, phase, record_size
+from user_items import UserItems, build_user_items, build_user_items_from_codes, gather_rows
+
+# Modelo completo de los sistemas de recomendación:
+# - version (str o None): versión del artefacto del que se cargó el modelo; None si se construyó en memoria.
+# - df_item (pd.DataFrame): un registro por juego con al menos 'item_id' y 'app_name'; sus filas son los códigos de juego.
+# - item_tfidf (scipy.sparse.csr_matrix): vectores TF-IDF de los juegos (juegos x términos).
+# - vocabulary (list): término de cada columna de item_tfidf.
+# - item_neighbors (ItemNeighbors): índice de vecinos ítem-ítem.
+# - user_neighbors (UserNeighbors): motor de similitud entre usuarios.
+# - user_items (UserItems): índice CSR usuario -> juegos.
+# - item_similarity (ItemSimilarity): item_tfidf en float32 y su transpuesta, para calcular más vecinos ítem-ítem
+#   de los que guarda item_neighbors sin convertir la matriz en cada consulta. No se guarda en el artefacto: se
+#   calcula al construir o cargar el modelo.
+Model = namedtuple('Model', ['version', 'df_item', 'item_tfidf', 'vocabulary', 'item_neighbors', 'user_neighbors',
+                             'user_items', 'item_similarity'])
+
+
+def load_and_preprocess_data(file_path, n_vecinos_item=50, modo_usuarios='exact', max_usuarios=None):
     """
     Carga un dataset de juegos y realiza un preprocesamiento para su uso en sistemas de recomendación.
 
     Esta función lleva a cabo el preprocesamiento necesario para dos sistemas de recomendación diferentes:
     ítem-ítem y usuario-ítem. Para ítem-ítem, combina géneros y desarrolladores de juegos y utiliza
-    TF-IDF para transformarlos en vectores numéricos, luego calcula la similitud del coseno entre los juegos.
-    Para usuario-ítem, agrupa los datos por usuario y género y normaliza el tiempo total de juego,
-    calculando luego la similitud del coseno entre los patrones de juego de los usuarios.
+    TF-IDF para transformarlos en vectores numéricos, luego calcula la similitud del coseno entre los juegos y
+    conserva solamente los vecinos más similares de cada uno.
+    Para usuario-ítem, agrupa los datos por usuario y género y normaliza el tiempo total de juego, dejando
+    listos los perfiles para calcular bajo demanda la similitud del coseno entre los patrones de juego de los usuarios.
 
     Args:
-        file_path (str): Ruta al archivo CSV que contiene los datos del juego.
+        file_path (str): Ruta al archivo CSV que contiene los datos del juego; se carga mediante su artefacto columnar.
+        n_vecinos_item (int, opcional): Número de vecinos que se guardan por juego. Por defecto es 50.
+        modo_usuarios (str, opcional): Búsqueda de usuarios similares 'exact' o 'approx' (LSH). Por defecto es 'exact'.
+        max_usuarios (int, opcional): Si se indica, conserva solo los usuarios con más juegos. Por defecto no hay límite.
 
     Returns:
-        tuple: Contiene tres elementos en el siguiente orden:
+        tuple: Contiene cinco elementos en el siguiente orden:
             - DataFrame pandas con los datos del juego cargados.
-            - Matriz de similitud del coseno para el sistema de recomendación ítem-ítem.
-            - Matriz de similitud del coseno para el sistema de recomendación usuario-ítem.
+            - DataFrame pandas con un registro por juego.
+            - Índice de vecinos (ItemNeighbors) para el sistema de recomendación ítem-ítem.
+            - Motor de similitud entre usuarios (UserNeighbors) para el sistema de recomendación usuario-ítem.
+            - Índice CSR usuario -> juegos (UserItems) para el sistema de recomendación usuario-ítem.
     """
     
-    df = pd.read_csv(file_path)
+    # El dataset se lee del artefacto columnar mapeado en memoria, compartido con los endpoints de consultas (la
+    # primera vez se convierte desde el CSV, por lo que esta fase incluye la lectura del CSV)
+    with phase('load_dataset'):
+        df = load_dataset(file_path)
+    record_size('df', frame_nbytes(df))
+    with phase('normalize'):
+        data = load_normalized(file_path)
+    model = build_model(data, n_vecinos_item=n_vecinos_item, modo_usuarios=modo_usuarios, max_usuarios=max_usuarios)
+
+    return select_users(df, max_usuarios), model.df_item, model.item_neighbors, model.user_neighbors, model.user_items
+
+
+def select_users(df, max_usuarios=None):
+    """
+    Conserva solamente los 'max_usuarios' usuarios con más juegos (items_count). Si es None, no filtra.
+
+    Args:
+        df (pd.DataFrame): Dataset con las columnas 'user_id', 'playtime_forever' e 'items_count'.
+        max_usuarios (int, opcional): Número de usuarios a conservar. Por defecto no hay límite.
+
+    Returns:
+        pd.DataFrame: Dataset con los registros de los usuarios seleccionados.
+    """
+    if max_usuarios is None:
+        return df
+
+    # Calcular métricas clave
+    user_metrics = df.groupby('user_id', observed=True).agg(
+        tiempo_total_jugado=pd.NamedAgg(column='playtime_forever', aggfunc='sum'),
+        items_count=pd.NamedAgg(column='items_count', aggfunc='max')
+    ).reset_index()
+
+    # Ordenar usuarios por número de juegos jugados (items_count) y seleccionar los primeros 'max_usuarios'
+    usuarios_seleccionados = user_metrics.sort_values(by='items_count', ascending=False).head(max_usuarios)
+
+    # Filtrar el DataFrame original para incluir solo los usuarios seleccionados
+    return df[df['user_id'].isin(usuarios_seleccionados['user_id'])]
+
+
+def select_user_codes(tables, max_usuarios=None):
+    """
+    Como select_users, sobre la tabla de usuarios del modelo normalizado (con el mismo orden en los empates).
+
+    Returns:
+        numpy.ndarray o None: Máscara de los usuarios conservados, o None si no se filtra.
+    """
+    if max_usuarios is None:
+        return None
+    user_metrics = pd.DataFrame({'items_count': tables.users.items_count})
+    selected = np.zeros(len(user_metrics), dtype=bool)
+    selected[user_metrics.sort_values(by='items_count', ascending=False).head(max_usuarios).index] = True
+    return selected
+
+
+def item_table(tables):
+    """
+    DataFrame de juegos del modelo normalizado, con las mismas filas (y columnas de juego) que
+    drop_duplicates(subset='item_id') sobre el dataset: el género de cada juego es el de su primera fila.
+    """
+    items = tables.items
+    first_genre = tables.item_genres.genre_codes[tables.item_genres.indptr[:-1]]
+    return pd.DataFrame({
+        'item_id': items.item_id,
+        'genres': tables.genres[first_genre],
+        'app_name': tables.app_names[items.app_name],
+        'price': items.price,
+        'developer': tables.developers[items.developer],
+        'release_year': items.release_year,
+    })
+
+
+def build_model(df, n_vecinos_item=50, modo_usuarios='exact', max_usuarios=None, tfidf_params=None):
+    """
+    Construye el modelo de los sistemas de recomendación ítem-ítem y usuario-ítem a partir del dataset.
+
+    Con el modelo normalizado (normalized.py), la tabla de juegos, los perfiles y el índice usuario -> juegos se
+    calculan sobre sus códigos, sin decodificar el texto de cada fila; el modelo resultante es el mismo.
+
+    Args:
+        df (pd.DataFrame o NormalizedDataset): Dataset completo de juegos y usuarios, o sus tablas normalizadas.
+        n_vecinos_item (int, opcional): Número de vecinos que se guardan por juego. Por defecto es 50.
+        modo_usuarios (str, opcional): Búsqueda de usuarios similares 'exact' o 'approx' (LSH). Por defecto es 'exact'.
+        max_usuarios (int, opcional): Si se indica, conserva solo los usuarios con más juegos. Por defecto no hay límite.
+        tfidf_params (dict, opcional): Parámetros adicionales de TfidfVectorizer (por ejemplo, sublinear_tf), que
+            reemplazan a los de por defecto (stop_words='english').
+
+    Returns:
+        Model: Modelo con la tabla de juegos, los vectores TF-IDF, el índice de vecinos ítem-ítem, el motor de
+        similitud entre usuarios y el índice usuario -> juegos.
+    """
     
-    # Eliminar duplicados basados en 'item_id'
-    df_item = df.drop_duplicates(subset='item_id').copy()
+    tables = df if isinstance(df, NormalizedDataset) else None
+    if tables is not None:
+        record_size('tables', sum(table_nbytes(tables).values()))
+
+    # Eliminar duplicados basados en 'item_id'; el índice queda alineado con las filas del índice de vecinos
+    with phase('item_table'):
+        if tables is not None:
+            df_item = item_table(tables)
+        else:
+            df_item = df.drop_duplicates(subset='item_id').reset_index(drop=True)
 
     """
      Sistema de Recomendación Item - Item
@@ -53,15 +178,24 @@ def load_and_preprocess_data(file_path):
     # Preprocesamiento de datos para ítem-ítem
     
     # Combinamos los géneros y los desarrolladores de juegos en una sola cadena de texto
-    df_item['combined_features'] = df_item['genres'] + " " + df_item['developer']
+    df_item['combined_features'] = df_item['genres'].astype(str) + " " + df_item['developer'].astype(str)
+    record_size('df_item', frame_nbytes(df_item))
     
     # Utilizamos TF-IDF(Frecuencia de término - frecuencia inversa del documento) 
-    # para convertir el texto en un conjunto de vectores numéricos
-    tfidf_vectorizer = TfidfVectorizer(stop_words='english')
-    tfidf_matrix = tfidf_vectorizer.fit_transform(df_item['combined_features'])
+    # para convertir el texto en un conjunto de vectores numéricos. scikit-learn se importa aquí y no al cargar el
+    # módulo, porque la API solo lo necesita si tiene que construir el modelo
+    with phase('item_tfidf'):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        tfidf_vectorizer = TfidfVectorizer(**{'stop_words': 'english', **(tfidf_params or {})})
+        tfidf_matrix = tfidf_vectorizer.fit_transform(df_item['combined_features'])
     
-    # Calculamos la similitud del coseno entre estos vectores para entender qué tan similares son los juegos entre sí
-    cosine_sim_item = cosine_similarity(tfidf_matrix)
+    # Calculamos la similitud del coseno entre estos vectores para entender qué tan similares son los juegos entre sí.
+    # Se calcula por bloques y solo se guardan los vecinos más similares de cada juego, sin crear la matriz N x N
+    with phase('item_cosine'):
+        item_similarity = build_item_similarity(tfidf_matrix)
+        item_neighbors = build_item_neighbors(tfidf_matrix, df_item['item_id'], k=n_vecinos_item,
+                                              item_similarity=item_similarity)
 
     """
     Sistema de Recomendación Usuario - Item
@@ -83,41 +217,127 @@ def load_and_preprocess_data(file_path):
     """
     
     """
-    Debido a las limitaciones de memoria de la API, implementaremos un filtrado para los usuarios que más juegos tienen y
-    llevan más tiempo total de horas jugadas, esto nos resultará en una muestra de los datos del dataframe original 
-    para resolver el sistema de recomendación en un servidor virtual
+    La matriz de similitud usuarios x usuarios ya no se materializa: se guarda el perfil de géneros de cada usuario
+    en una matriz compacta (usuarios x géneros) y los vecinos se calculan bajo demanda, por lo que se atiende a
+    todos los usuarios del dataset con memoria lineal. Opcionalmente se puede seguir limitando a los usuarios con
+    más juegos mediante 'max_usuarios'.
     """
     
-    # Calcular métricas clave
-    user_metrics = df.groupby('user_id').agg(
-        tiempo_total_jugado=pd.NamedAgg(column='playtime_forever', aggfunc='sum'),
-        items_count=pd.NamedAgg(column='items_count', aggfunc='max')
-    ).reset_index()
+    # Preprocesamiento de datos para usuario-Ítem
+    
+    # Agrupamos los datos por usuario y género, sumamos el tiempo total del juego por género y normalizamos,
+    # lo que nos da la proporción del tiempo dedicado a cada género por usuario. La similitud del coseno entre
+    # usuarios se calcula bajo demanda (exacta o aproximada con LSH) a partir de estos perfiles. Después se
+    # construye el índice CSR con los juegos de cada usuario (en el orden de los perfiles)
+    if tables is not None:
+        user_neighbors, user_items = _user_model_from_tables(tables, df_item, modo_usuarios, max_usuarios)
+    else:
+        with phase('select_users'):
+            df = select_users(df, max_usuarios)
+        with phase('user_profiles'):
+            user_neighbors = build_user_neighbors(df, mode=modo_usuarios)
+        with phase('user_items'):
+            user_items = build_user_items(df, user_neighbors.user_index, df_item)
 
-    # Ordenar usuarios por número de juegos jugados (items_count) y seleccionar los primeros 'max_usuarios'
-    usuarios_seleccionados = user_metrics.sort_values(by='items_count', ascending=False).head(7000)
+    vocabulary = tfidf_vectorizer.get_feature_names_out().tolist()
+    return Model(None, df_item, tfidf_matrix.tocsr(), vocabulary, item_neighbors, user_neighbors, user_items,
+                 item_similarity)
 
-    # Obtener los IDs de los usuarios seleccionados
-    usuarios_seleccionados_ids = usuarios_seleccionados['user_id']
 
-    # Filtrar el DataFrame original para incluir solo los usuarios seleccionados
-    df = df[df['user_id'].isin(usuarios_seleccionados_ids)]
-    
-    # Preprocesamiento de datos para usuario-Ítem
-    
-    # Agrupamos los datos por usuario y género y sumamos el tiempo total del juego por género
-    user_genre_playtime = df.groupby(['user_id', 'genres'])['playtime_forever'].sum().unstack(fill_value=0)
-    
-    # Normalizamos estos datos para que cada fila sume 1, lo que nos da la proporción del tiempo dedicado a cada género
-    # por usuario
-    user_genre_playtime_normalized = user_genre_playtime.div(user_genre_playtime.sum(axis=1), axis=0)
-    user_genre_playtime_normalized = user_genre_playtime_normalized.fillna(0).replace([np.inf, -np.inf], 0)
-    
-    # Calculamos la similitud del coseno entre usuarios para entender qué tan similares son en términos de preferencia de juego
-    user_similarity_user = cosine_similarity(user_genre_playtime_normalized)
-    
-    # Convirtiendo la matriz de similitud a un DataFrame
-    user_similarity_df = pd.DataFrame(user_similarity_user, index=user_genre_playtime_normalized.index, columns=user_genre_playtime_normalized.index)
+def _user_model_from_tables(tables, df_item, modo_usuarios, max_usuarios):
+    """
+    Motor de similitud entre usuarios e índice usuario -> juegos a partir del modelo normalizado: los perfiles se
+    suman sobre las filas del dataset reconstruidas como códigos (wide_rows) y el índice CSR se toma directamente
+    de la tabla de hechos, cuyos códigos de juego son las filas de df_item.
+    """
+    facts = tables.user_items
+    with phase('select_users'):
+        selected = select_user_codes(tables, max_usuarios)
+        rows, genre_codes = wide_rows(tables)
+        pairs = np.arange(len(facts.user_codes))
+        if selected is not None:
+            kept = selected[facts.user_codes[rows]]
+            rows, genre_codes = rows[kept], genre_codes[kept]
+            pairs = pairs[selected[facts.user_codes]]
+
+    with phase('user_profiles'):
+        user_ids = tables.users.user_id
+        profiles = build_user_profiles_from_codes(user_ids[np.arange(len(user_ids))], tables.genres,
+                                                  facts.user_codes[rows], genre_codes, facts.playtime[rows])
+        user_neighbors = build_user_neighbors(profiles, mode=modo_usuarios)
+
+    with phase('user_items'):
+        # Códigos de usuario en el orden de los perfiles (solo los usuarios conservados)
+        user_used = np.bincount(facts.user_codes[pairs], minlength=len(user_ids)) > 0
+        user_codes = (np.cumsum(user_used) - 1)[facts.user_codes[pairs]]
+        user_items = build_user_items_from_codes(user_codes, facts.item_codes[pairs], facts.playtime[pairs],
+                                                 len(user_neighbors.user_index), df_item)
+    return user_neighbors, user_items
+
+
+def update_model(model, df, user_ids):
+    """
+    Actualiza el modelo de usuario-ítem para algunos usuarios después de añadir filas al dataset.
+
+    Solo se recalculan los perfiles de géneros y los juegos (índice CSR) de los usuarios indicados, a partir de sus
+    filas en el dataset; los usuarios nuevos se insertan en el orden de user_id que usa build_model. Los vecinos de
+    usuario se calculan bajo demanda a partir de los perfiles, por lo que quedan actualizados con ellos; en modo
+    aproximado se vuelven a indexar los perfiles con los mismos hiperplanos LSH. La parte ítem-ítem no cambia,
+    porque las filas nuevas solo pueden referirse a juegos que ya están en el modelo.
+
+    El resultado es el mismo que el de build_model sobre el dataset completo (sin 'max_usuarios').
+
+    Args:
+        model (Model): Modelo actual.
+        df (pd.DataFrame): Dataset completo, que ya incluye las filas nuevas.
+        user_ids (iterable): user_id de los usuarios con filas nuevas.
+
+    Returns:
+        Model: Modelo actualizado, sin versión.
+
+    Raises:
+        ValueError: Si las filas de esos usuarios tienen juegos o géneros que no están en el modelo; en ese caso
+            hay que reconstruir el modelo completo.
+    """
+    user_neighbors, user_items = model.user_neighbors, model.user_items
+    affected = pd.Index(sorted({str(user_id) for user_id in user_ids}))
+    rows = df[df['user_id'].isin(affected)]
+
+    unknown_items = set(rows['item_id']) - set(user_items.item_ids.tolist())
+    if unknown_items:
+        raise ValueError(f"Juegos que no están en el modelo: {sorted(unknown_items)[:10]}. Reconstruya el modelo.")
+    unknown_genres = set(rows['genres'].astype(str)) - set(user_neighbors.genres)
+    if unknown_genres:
+        raise ValueError(f"Géneros que no están en el modelo: {sorted(unknown_genres)}. Reconstruya el modelo.")
+
+    # Índice de usuarios ampliado con los nuevos, ordenado como el de build_user_profiles
+    old_index = pd.Index(list(user_neighbors.user_index))
+    new_users = affected[old_index.get_indexer(affected) < 0]
+    user_index = old_index.append(new_users).sort_values() if len(new_users) else old_index
+    old_positions = user_index.get_indexer(old_index)
+    affected_positions = user_index.get_indexer(affected)
+
+    # Perfiles: se copian los actuales y se recalculan los de los usuarios afectados
+    profiles = np.zeros((len(user_index), len(user_neighbors.genres)), dtype=np.float32)
+    profiles[old_positions] = user_neighbors.profiles
+    profiles[affected_positions] = build_user_profiles_for(rows, affected, user_neighbors.genres)
+    lsh = index_user_lsh(user_neighbors.lsh.planes, profiles) if user_neighbors.lsh is not None else None
 
+    # Índice CSR: las filas de los usuarios afectados se toman de un índice construido solo con sus filas
+    changed = build_user_items(rows, affected, model.df_item)
+    n_old = len(old_index)
+    indptr = np.concatenate([user_items.indptr, user_items.indptr[-1] + changed.indptr[1:]])
+    item_codes = np.concatenate([user_items.item_codes, changed.item_codes])
+    playtime = np.concatenate([user_items.playtime, changed.playtime])
+    source = np.empty(len(user_index), dtype=np.int64)
+    source[old_positions] = np.arange(n_old)
+    source[affected_positions] = n_old + np.arange(len(affected))
+    entries, _ = gather_rows(indptr, source)
+    new_indptr = np.zeros(len(user_index) + 1, dtype=np.int64)
+    np.cumsum(indptr[source + 1] - indptr[source], out=new_indptr[1:])
 
-    return df, df_item, cosine_sim_item, user_similarity_df
\ No newline at end of file
+    return model._replace(
+        version=None,
+        user_neighbors=UserNeighbors(user_index, user_neighbors.genres, profiles, lsh, user_neighbors.mode),
+        user_items=UserItems(new_indptr, item_codes[entries], playtime[entries], user_items.item_ids,
+                             user_items.app_names))
@@ -0,0 +1,329 @@
+"""
+Índices de posiciones ordenadas para las consultas ad hoc de agregación sobre el dataset.
+
+Los endpoints de consultas de funciones.py responden preguntas fijas a partir de los cubos de aggregates.py. Para
+las variantes (horas por desarrollador y año, reseñas positivas por género y rango de precio, ...) QueryIndex
+filtra y agrupa las filas del dataset por las dimensiones 'genres', 'release_year', 'developer', 'sentiment' y
+'price', sin recorrer la tabla completa en cada filtro:
+
+- Cada dimensión tiene un índice invertido (PositionIndex): sus valores distintos ordenados y, para cada valor, las
+  posiciones de sus filas como un rango contiguo de un arreglo int32 (índice CSR). Se construye la primera vez que
+  una consulta usa la dimensión.
+- Un filtro (lista de valores o rango mínimo-máximo) selecciona un conjunto de valores, cuyas filas se leen del
+  índice sin mirar las demás. Varios filtros se intersecan empezando por el que selecciona menos filas: a esas
+  filas candidatas se les consulta el código de las demás dimensiones (el índice guarda también el código de cada
+  fila), de modo que el costo es proporcional a la lista más corta y no al tamaño del dataset.
+- Los grupos se forman con los códigos de las dimensiones de agrupación de las filas que quedan, contados con
+  bincount; el precio se agrupa por rangos (PRICE_BANDS).
+
+Las filas sin año de lanzamiento (MISSING_YEAR) o sin género o desarrollador (nulos en el dataset) no cumplen
+ningún filtro de esa dimensión ni forman un grupo al agrupar por ella, como groupby no agrupaba los nulos; la
+métrica 'usuarios' no cuenta los user_id nulos, como nunique.
+
+Las métricas son 'filas' (filas del dataset, una por usuario, juego y género, como cuentan las reseñas los
+endpoints de consultas), 'horas' (suma de playtime_forever) y 'usuarios' (usuarios distintos).
+"""
+
+# Importamos las librerías a usar
+import math
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from columnar import MISSING_YEAR
+from user_items import gather_rows
+
+# Dimensiones que se pueden filtrar y agrupar, y métricas disponibles
+DIMENSIONS = ('genres', 'release_year', 'developer', 'sentiment', 'price')
+METRICS = ('filas', 'horas', 'usuarios')
+
+# Valor de las filas sin dato de cada dimensión que no se filtra ni se agrupa
+MISSING_VALUES = {'release_year': MISSING_YEAR}
+
+# Límites de los rangos de precio para agrupar: 0, (0, 5], (5, 10], (10, 20], (20, 40] y más de 40
+PRICE_BANDS = (0, 5, 10, 20, 40)
+PRICE_BAND_LABELS = ('0', '0-5', '5-10', '10-20', '20-40', '40+', 'sin precio')
+
+# Índice de una dimensión:
+# - values (np.ndarray): valores distintos ordenados (las categorías, para las columnas categóricas).
+# - offsets (np.ndarray int64, valores + 1): inicio del rango de cada valor en positions.
+# - positions (np.ndarray int32): posiciones de las filas, agrupadas por valor y en orden creciente dentro de cada uno.
+# - codes (np.ndarray): código (posición en values) de cada fila, para consultar el valor de las filas candidatas.
+PositionIndex = namedtuple('PositionIndex', ['values', 'offsets', 'positions', 'codes'])
+
+# Número máximo de combinaciones de las dimensiones de agrupación para contar los grupos con bincount; con más se
+# usa np.unique sobre las claves de las filas
+MAX_DENSE_GROUPS = 1 << 22
+
+# Resultado de una consulta: grupos totales antes del límite y filas (diccionarios) de los grupos devueltos
+QueryResult = namedtuple('QueryResult', ['total', 'rows'])
+
+
+def build_position_index(codes, values):
+    """
+    Construye el índice invertido de una columna codificada.
+
+    Args:
+        codes (numpy.ndarray): Código (posición en 'values') de cada fila.
+        values (numpy.ndarray): Valores distintos ordenados.
+
+    Returns:
+        PositionIndex: Índice de la columna.
+    """
+    positions = np.argsort(codes, kind='stable').astype(np.int32)
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(codes, minlength=len(values)), out=offsets[1:])
+    return PositionIndex(np.asarray(values), offsets, positions, codes)
+
+
+class QueryIndex:
+    """
+    Índices por dimensión y ejecución de consultas de agregación sobre un dataset.
+
+    Args:
+        dataset (pd.DataFrame): Dataset con las columnas de DIMENSIONS, 'user_id' y 'playtime_forever'; por
+            ejemplo, el del artefacto columnar, cuyas columnas categóricas ya están codificadas.
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.n_rows = len(dataset)
+        self._indexes = {}
+        self._lock = threading.Lock()
+
+    def _column(self, name):
+        """
+        Códigos (-1 para los nulos) y valores de una columna categórica, o los valores de una numérica (y None).
+        """
+        column = self.dataset[name]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return column.cat.codes.to_numpy(), np.asarray(column.cat.categories, dtype=object)
+        if column.dtype == object:
+            codes, values = pd.factorize(column.astype(str).where(column.notna()), sort=True)
+            return codes, np.asarray(values, dtype=object)
+        return column.to_numpy(), None
+
+    def index(self, dimension):
+        """
+        Índice invertido de una dimensión, construido la primera vez que se pide.
+        """
+        index = self._indexes.get(dimension)
+        if index is None:
+            with self._lock:
+                index = self._indexes.get(dimension)
+                if index is None:
+                    values, categories = self._column(dimension)
+                    if categories is None:
+                        categories, values = np.unique(values, return_inverse=True)
+                        values = values.astype(np.int16 if len(categories) < 2**15 else np.int32)
+                    elif (values < 0).any():
+                        # Los nulos son un valor más del índice, None, al final
+                        values = np.where(values < 0, len(categories), values)
+                        categories = np.append(categories, None)
+                    index = self._indexes[dimension] = build_position_index(values, categories)
+        return index
+
+    def row_codes(self, dimension, rows):
+        """
+        Código de cada fila de 'rows' en los valores del índice de la dimensión.
+        """
+        return self.index(dimension).codes[rows]
+
+    def _present(self, dimension):
+        """
+        Máscara de los valores del índice que no son el valor de las filas sin dato, o None si no hay tal valor.
+        """
+        values = self.index(dimension).values
+        if dimension in MISSING_VALUES:
+            return values != MISSING_VALUES[dimension]
+        if values.dtype == object and len(values) and values[-1] is None:
+            return np.arange(len(values)) < len(values) - 1
+        return None
+
+    def _allowed(self, dimension, condition):
+        """
+        Máscara de los valores del índice que cumplen una condición: lista de valores o {'min': ..., 'max': ...}.
+        """
+        allowed = self._matching(dimension, condition)
+        present = self._present(dimension)
+        return allowed if present is None else allowed & present
+
+    def _matching(self, dimension, condition):
+        values = self.index(dimension).values
+        if isinstance(condition, dict):
+            if values.dtype == object:
+                raise ValueError(f"La dimensión '{dimension}' no admite rangos, solo una lista de valores.")
+            unknown = set(condition) - {'min', 'max'}
+            if unknown:
+                raise ValueError(f"Claves de rango no soportadas: {sorted(unknown)}")
+            allowed = np.ones(len(values), dtype=bool)
+            if condition.get('min') is not None:
+                allowed &= values >= _numeric(dimension, condition['min'], values.dtype)
+            if condition.get('max') is not None:
+                allowed &= values <= _numeric(dimension, condition['max'], values.dtype)
+            return allowed
+        if values.dtype == object:
+            return np.isin(values, [str(value) for value in condition])
+        return np.isin(values, _numeric(dimension, condition, values.dtype))
+
+    def filter_rows(self, filters):
+        """
+        Posiciones (ordenadas) de las filas que cumplen todos los filtros.
+
+        Args:
+            filters (dict): Dimensión -> lista de valores o {'min': ..., 'max': ...}.
+
+        Returns:
+            numpy.ndarray: Posiciones de las filas.
+        """
+        if not filters:
+            return np.arange(self.n_rows)
+        allowed = {}
+        sizes = {}
+        for dimension, condition in filters.items():
+            _check_dimension(dimension)
+            allowed[dimension] = self._allowed(dimension, condition)
+            offsets = self.index(dimension).offsets
+            sizes[dimension] = int((offsets[1:] - offsets[:-1])[allowed[dimension]].sum())
+
+        # Filas de la lista más corta, leídas del índice
+        first = min(sizes, key=sizes.get)
+        index = self.index(first)
+        selected = np.flatnonzero(allowed[first])
+        entries, _ = gather_rows(index.offsets, selected)
+        rows = index.positions[entries]
+        if len(selected) > 1:
+            rows = np.sort(rows)
+
+        # Intersección con las demás: el valor de cada fila candidata debe estar entre los permitidos
+        for dimension in sorted(sizes, key=sizes.get)[1:]:
+            if len(rows) == 0:
+                break
+            rows = rows[allowed[dimension][self.row_codes(dimension, rows)]]
+        return rows
+
+    def _group_codes(self, dimension, rows):
+        """
+        Código del grupo de cada fila y etiqueta de cada código de grupo.
+        """
+        codes = self.row_codes(dimension, rows)
+        values = self.index(dimension).values
+        if dimension == 'price':
+            bands = np.searchsorted(PRICE_BANDS, values, side='left')
+            bands[np.isnan(values)] = len(PRICE_BAND_LABELS) - 1
+            return bands[codes], list(PRICE_BAND_LABELS)
+        labels = values.tolist()
+        return codes, labels
+
+    def query(self, filters=None, group_by=(), metric='filas', limit=None):
+        """
+        Filtra, agrupa y mide las filas del dataset.
+
+        Los grupos se ordenan de mayor a menor valor de la métrica y, en los empates, por los códigos de sus
+        dimensiones (el orden de los valores).
+
+        Args:
+            filters (dict, opcional): Dimensión -> lista de valores o {'min': ..., 'max': ...}.
+            group_by (sequence, opcional): Dimensiones de agrupación. Sin dimensiones hay un solo grupo.
+            metric (str, opcional): 'filas', 'horas' o 'usuarios'. Por defecto es 'filas'.
+            limit (int, opcional): Número máximo de grupos a devolver. Por defecto, todos.
+
+        Returns:
+            QueryResult: Número total de grupos y un iterador de diccionarios con las dimensiones y la métrica.
+
+        Raises:
+            ValueError: Si una dimensión, métrica o filtro no es válido.
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Métrica no soportada: {metric}. Use una de {list(METRICS)}")
+        group_by = list(group_by)
+        for dimension in group_by:
+            _check_dimension(dimension)
+        if len(set(group_by)) != len(group_by):
+            raise ValueError("Las dimensiones de agrupación no pueden repetirse.")
+
+        rows = self.filter_rows(filters or {})
+        for dimension in group_by:
+            present = self._present(dimension)
+            if present is not None:
+                rows = rows[present[self.row_codes(dimension, rows)]]
+
+        # Clave de grupo de cada fila: los códigos de las dimensiones combinados en un solo entero
+        codes, labels = [], []
+        for dimension in group_by:
+            dimension_codes, dimension_labels = self._group_codes(dimension, rows)
+            codes.append(dimension_codes)
+            labels.append(dimension_labels)
+        shape = [len(dimension_labels) for dimension_labels in labels]
+        keys = np.ravel_multi_index(codes, shape) if group_by else np.zeros(len(rows), dtype=np.intp)
+
+        # Con pocas combinaciones las claves son directamente las posiciones de los contadores (sin ordenar las
+        # filas); con muchas se compactan con np.unique
+        n_keys = math.prod(shape)
+        dense = n_keys <= MAX_DENSE_GROUPS
+        if dense:
+            groups = np.flatnonzero(np.bincount(keys, minlength=n_keys))
+            inverse, n_groups = keys, n_keys
+        else:
+            groups, inverse = np.unique(keys, return_inverse=True)
+            n_groups = len(groups)
+
+        if metric == 'filas':
+            values = np.bincount(inverse, minlength=n_groups)
+        elif metric == 'horas':
+            playtime = self.dataset['playtime_forever'].to_numpy()[rows].astype(np.float64)
+            values = np.bincount(inverse, weights=playtime, minlength=n_groups)
+        else:
+            users, _ = self._column('user_id')
+            n_users = int(users.max(initial=0)) + 1
+            users = users[rows]
+            known = users >= 0
+            pairs = np.unique(inverse[known].astype(np.int64) * n_users + users[known])
+            values = np.bincount(pairs // n_users, minlength=n_groups)
+        if dense:
+            values = values[groups]
+
+        order = np.lexsort((groups, -values))
+        if limit is not None:
+            order = order[:limit]
+        group_codes = np.unravel_index(groups[order], shape) if group_by else []
+        return QueryResult(len(groups), _result_rows(group_by, labels, group_codes, values[order], metric))
+
+
+def _check_dimension(dimension):
+    if dimension not in DIMENSIONS:
+        raise ValueError(f"Dimensión no soportada: {dimension}. Use una de {list(DIMENSIONS)}")
+
+
+def _numeric(dimension, value, dtype):
+    """
+    Convierte el valor (o la lista de valores) de un filtro numérico; los flotantes se llevan al tipo de la columna
+    para que, por ejemplo, 19.99 coincida con el precio guardado en float32.
+    """
+    try:
+        value = np.asarray(value, dtype=np.float64)
+    except (TypeError, ValueError):
+        raise ValueError(f"La dimensión '{dimension}' es numérica: {value}") from None
+    return value.astype(dtype) if np.issubdtype(dtype, np.floating) else value
+
+
+def _result_rows(group_by, labels, group_codes, values, metric):
+    """
+    Genera los diccionarios de los grupos, con tipos de Python para serializarlos como JSON.
+    """
+    convert = float if metric == 'horas' else int
+    columns = [[_python(dimension_labels[code]) for code in codes.tolist()]
+               for dimension_labels, codes in zip(labels, group_codes)]
+    for position, value in enumerate(values.tolist()):
+        row = {dimension: column[position] for dimension, column in zip(group_by, columns)}
+        row[metric] = convert(value)
+        yield row
+
+
+def _python(value):
+    """
+    Convierte un escalar de NumPy en su tipo de Python.
+    """
+    return value.item() if isinstance(value, np.generic) else value
@@ -0,0 +1,176 @@
+"""
+Análisis de sentimiento de las reseñas en paralelo y con caché en disco.
+
+Clasificar cada reseña con TextBlob es el paso más lento de la preparación de los datos. SentimentScorer
+clasifica las reseñas por bloques:
+
+- los textos repetidos (muy frecuentes: 'good game', '10/10', ...) se clasifican una sola vez;
+- los textos ya clasificados en ejecuciones anteriores se leen de una caché SQLite en disco, con la clave hash
+  del texto, por lo que las reseñas que no cambian no se vuelven a clasificar;
+- los textos restantes se reparten entre un pool de procesos.
+
+Cada texto se clasifica con classify_sentiment, la misma función del notebook, por lo que las etiquetas 0/1/2
+son idénticas a las de aplicarla reseña por reseña. La caché guarda la versión de TextBlob y se vacía si cambia.
+"""
+
+# Importamos las librerías a usar
+import hashlib
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+# Versión de la clasificación guardada en la caché; si cambia (o cambia la de TextBlob) la caché se vacía
+SENTIMENT_VERSION = 1
+
+# Número máximo de claves por consulta a la caché
+QUERY_BATCH = 500
+
+
+def classify_sentiment(review_text):
+    """
+    Clasifica el sentimiento del texto de una reseña.
+
+    Convierte el texto a cadena y usa la polaridad de TextBlob (entre -1 y 1): menor a -0.1 es negativo (0),
+    mayor a 0.1 es positivo (2) y el resto, al igual que las reseñas nulas ('nan'), es neutral (1).
+
+    Args:
+        review_text (str): Texto de la reseña.
+
+    Returns:
+        int: 0 (negativo), 1 (neutral) o 2 (positivo).
+    """
+    from textblob import TextBlob
+
+    review_text = str(review_text)
+    if review_text == 'nan':
+        return 1
+    polarity = TextBlob(review_text).sentiment.polarity
+    if polarity < -0.1:
+        return 0
+    elif polarity > 0.1:
+        return 2
+    return 1
+
+
+def _classify_all(texts):
+    """
+    Clasifica una lista de textos (se ejecuta en los procesos del pool).
+    """
+    return [classify_sentiment(text) for text in texts]
+
+
+def text_key(text):
+    """
+    Clave de caché de un texto: hash BLAKE2b de 16 bytes de su contenido.
+    """
+    return hashlib.blake2b(text.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+
+
+def _cache_version():
+    from textblob import __version__ as textblob_version
+    return f'{SENTIMENT_VERSION}-textblob-{textblob_version}'
+
+
+class SentimentScorer:
+    """
+    Clasifica reseñas por bloques con deduplicación, caché en disco y un pool de procesos.
+
+    Args:
+        cache_path (str, opcional): Archivo SQLite de la caché. Si es None, no se usa caché.
+        workers (int, opcional): Número de procesos. Por defecto, el número de CPUs; con 1 se clasifica en el
+            proceso actual.
+        chunk_size (int, opcional): Textos por tarea enviada al pool. Por defecto es 256.
+    """
+
+    def __init__(self, cache_path=None, workers=None, chunk_size=256):
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self._pool = None
+        self._db = None
+        if cache_path:
+            os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+            self._db = sqlite3.connect(cache_path)
+            self._open_cache()
+        self.reviews = 0
+        self.unique = 0
+        self.cached = 0
+        self.classified = 0
+
+    def _open_cache(self):
+        db = self._db
+        db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+        db.execute('CREATE TABLE IF NOT EXISTS labels (hash BLOB PRIMARY KEY, label INTEGER) WITHOUT ROWID')
+        row = db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        version = _cache_version()
+        if row is None or row[0] != version:
+            db.execute('DELETE FROM labels')
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (version,))
+        db.commit()
+
+    def _lookup(self, keys):
+        labels = {}
+        for start in range(0, len(keys), QUERY_BATCH):
+            batch = keys[start:start + QUERY_BATCH]
+            query = f"SELECT hash, label FROM labels WHERE hash IN ({','.join('?' * len(batch))})"
+            labels.update(self._db.execute(query, batch).fetchall())
+        return labels
+
+    def _classify(self, texts):
+        if self.workers == 1 or len(texts) <= self.chunk_size:
+            return _classify_all(texts)
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers)
+        chunks = [texts[start:start + self.chunk_size] for start in range(0, len(texts), self.chunk_size)]
+        return [label for labels in self._pool.map(_classify_all, chunks) for label in labels]
+
+    def score(self, reviews):
+        """
+        Clasifica una lista de reseñas.
+
+        Args:
+            reviews (list): Textos de las reseñas (pueden ser nulos o no ser cadenas, como en classify_sentiment).
+
+        Returns:
+            list: Etiqueta 0/1/2 de cada reseña, en el mismo orden.
+        """
+        texts = [str(review) for review in reviews]
+        unique = list(dict.fromkeys(texts))
+        keys = [text_key(text) for text in unique]
+        labels = self._lookup(keys) if self._db is not None else {}
+
+        missing = [i for i, key in enumerate(keys) if key not in labels]
+        if missing:
+            new_labels = self._classify([unique[i] for i in missing])
+            new_entries = [(keys[i], label) for i, label in zip(missing, new_labels)]
+            labels.update(new_entries)
+            if self._db is not None:
+                self._db.executemany('INSERT OR REPLACE INTO labels VALUES (?, ?)', new_entries)
+                self._db.commit()
+
+        self.reviews += len(texts)
+        self.unique += len(unique)
+        self.cached += len(unique) - len(missing)
+        self.classified += len(missing)
+        by_text = {text: labels[key] for text, key in zip(unique, keys)}
+        return [by_text[text] for text in texts]
+
+    def stats(self):
+        """
+        Reseñas recibidas, textos distintos, textos leídos de la caché y textos clasificados.
+        """
+        return {'reseñas': self.reviews, 'distintas': self.unique, 'en_cache': self.cached,
+                'clasificadas': self.classified}
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,68 @@
+"""
+Tiempos de las fases de preparación de los modelos y tamaños en memoria de sus estructuras.
+
+Cada fase con nombre (lectura del dataset, TF-IDF, coseno ítem-ítem, perfiles de usuario, coseno usuario-usuario
+bajo demanda, ...) se mide con el bloque `with phase(nombre):`, que acumula la duración de la última ejecución, el
+número de ejecuciones y el tiempo total. record_size() guarda el tamaño en bytes de una estructura cuando se
+construye. La API expone ambos en /metrics; el registro es del proceso, así que en los benchmarks y en
+src.models.build también se pueden leer directamente con phases() y sizes().
+"""
+
+# Importamos las librerías a usar
+import threading
+import time
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+
+# Nombre de la fase -> [segundos de la última ejecución, ejecuciones, segundos acumulados]
+_phases = {}
+
+# Nombre de la estructura -> bytes
+_sizes = {}
+
+
+@contextmanager
+def phase(name):
+    """
+    Mide la duración del bloque como una ejecución de la fase 'name' (también si el bloque lanza una excepción).
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        with _lock:
+            entry = _phases.setdefault(name, [0.0, 0, 0.0])
+            entry[0] = segundos
+            entry[1] += 1
+            entry[2] += segundos
+
+
+def phases():
+    """
+    Copia de las fases medidas: nombre -> (segundos de la última ejecución, ejecuciones, segundos acumulados).
+    """
+    with _lock:
+        return {name: tuple(entry) for name, entry in _phases.items()}
+
+
+def record_size(name, nbytes):
+    """
+    Guarda el tamaño en bytes de la estructura 'name'.
+    """
+    _sizes[name] = int(nbytes)
+
+
+def sizes():
+    """
+    Copia de los tamaños guardados: nombre -> bytes.
+    """
+    return dict(_sizes)
+
+
+def frame_nbytes(df):
+    """
+    Bytes de un DataFrame, incluidos los textos de las columnas de objetos y las categorías.
+    """
+    return int(df.memory_usage(index=True, deep=True).sum())
@@ -0,0 +1,95 @@
+"""
+Índice disperso (CSR) de los juegos de cada usuario para el sistema de recomendación usuario-ítem.
+
+Los juegos de cada usuario se guardan como un rango contiguo de un arreglo de códigos de juego: los juegos del
+usuario u son item_codes[indptr[u]:indptr[u + 1]]. Los códigos de juego son las filas del DataFrame de juegos
+(df_item), las mismas del índice de vecinos ítem-ítem, y el índice incluye la tabla código -> (item_id, app_name).
+Así la generación de candidatos y la diferencia de conjuntos se hacen con arreglos de NumPy, sin recorrer el
+DataFrame por cada usuario similar.
+"""
+
+# Importamos las librerías a usar
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+# Estructura del índice:
+# - indptr (np.ndarray int64, usuarios + 1): inicio del rango de cada usuario en item_codes.
+# - item_codes (np.ndarray int32): código de cada juego jugado, agrupado por usuario.
+# - playtime (np.ndarray float32): tiempo de juego de cada par (usuario, juego), alineado con item_codes.
+# - item_ids (np.ndarray int64): item_id de cada código de juego.
+# - app_names (np.ndarray object): nombre de cada código de juego.
+UserItems = namedtuple('UserItems', ['indptr', 'item_codes', 'playtime', 'item_ids', 'app_names'])
+
+
+def build_user_items(df, user_index, df_item):
+    """
+    Construye el índice CSR usuario -> juegos y la tabla de búsqueda de juegos.
+
+    Las filas del índice siguen el orden de user_index (el mismo de la matriz de perfiles de usuario) y los códigos
+    de juego siguen el orden de df_item. Los pares (usuario, juego) repetidos por la explosión de géneros se
+    cuentan una sola vez.
+
+    Args:
+        df (pd.DataFrame): DataFrame con las columnas 'user_id', 'item_id' y 'playtime_forever'.
+        user_index (pd.Index): user_id de cada fila del índice.
+        df_item (pd.DataFrame): DataFrame con un registro por juego y las columnas 'item_id' y 'app_name'.
+
+    Returns:
+        UserItems: Índice CSR con los juegos y el tiempo de juego de cada usuario.
+    """
+    pairs = df.drop_duplicates(subset=['user_id', 'item_id'])
+    user_codes = user_index.get_indexer(pairs['user_id'])
+    item_codes = pd.Index(df_item['item_id']).get_indexer(pairs['item_id'])
+
+    # Se descartan los usuarios que no están en el índice (por ejemplo, si se limitó el número de usuarios)
+    known = (user_codes >= 0) & (item_codes >= 0)
+    return build_user_items_from_codes(user_codes[known], item_codes[known],
+                                       pairs['playtime_forever'].to_numpy(dtype=np.float32)[known], len(user_index),
+                                       df_item)
+
+
+def build_user_items_from_codes(user_codes, item_codes, playtime, n_users, df_item):
+    """
+    Construye el índice CSR a partir de los pares (usuario, juego) ya codificados, por ejemplo la tabla de hechos
+    del modelo normalizado.
+
+    Args:
+        user_codes (numpy.ndarray): Fila del índice (código de usuario) de cada par.
+        item_codes (numpy.ndarray): Código de juego (fila de df_item) de cada par.
+        playtime (numpy.ndarray): Tiempo de juego de cada par.
+        n_users (int): Número de filas del índice.
+        df_item (pd.DataFrame): DataFrame con un registro por juego y las columnas 'item_id' y 'app_name'.
+
+    Returns:
+        UserItems: Índice CSR con los juegos y el tiempo de juego de cada usuario.
+    """
+    # Ordenamos por usuario para que los juegos de cada uno queden contiguos
+    order = np.argsort(user_codes, kind='stable')
+    indptr = np.zeros(n_users + 1, dtype=np.int64)
+    np.cumsum(np.bincount(user_codes, minlength=n_users), out=indptr[1:])
+
+    return UserItems(indptr, np.asarray(item_codes)[order].astype(np.int32),
+                     np.asarray(playtime, dtype=np.float32)[order], df_item['item_id'].to_numpy(),
+                     df_item['app_name'].to_numpy())
+
+
+def gather_rows(indptr, rows):
+    """
+    Devuelve las posiciones de todos los elementos de varias filas de un índice CSR, fila por fila y en orden.
+
+    Args:
+        indptr (numpy.ndarray): Arreglo de inicios de fila del índice CSR.
+        rows (numpy.ndarray): Filas a recuperar.
+
+    Returns:
+        tuple: Dos arreglos del mismo largo:
+            - Posiciones de los elementos en los arreglos de datos del índice.
+            - Posición en 'rows' de la fila a la que pertenece cada elemento.
+    """
+    starts = indptr[rows]
+    lengths = indptr[rows + 1] - starts
+    owner = np.repeat(np.arange(len(rows)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return starts[owner] + offsets, owner
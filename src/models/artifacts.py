@@ -0,0 +1,258 @@
+"""
+Artefactos versionados de los modelos de recomendación.
+
+Cada versión se guarda en su propio directorio dentro de models_dir:
+
+    models/
+        LATEST                      versión más reciente
+        20240102T120000-1a2b3c/
+            manifest.json           versión, origen, parámetros, tamaños y tipos de cada arreglo
+            id_maps.json            item_id -> app_name, géneros y vocabulario TF-IDF
+            *.npy                   arreglos del modelo (vecinos, perfiles, índice usuario -> juegos, TF-IDF,
+                                    TF-IDF en float32 y su transpuesta, user_id como bytes ordenados)
+
+Los arreglos se cargan con np.load(mmap_mode='r'), por lo que cargar una versión es rápido y no requiere volver
+a ajustar el TF-IDF ni recalcular los vecinos. Como los archivos se mapean en modo solo lectura, varios procesos
+(por ejemplo, los workers de la API) que cargan la misma versión comparten las mismas páginas de memoria física;
+los user_id también se guardan como un arreglo de bytes para que su búsqueda no requiera un objeto por usuario
+en cada proceso, y las matrices de model.item_similarity se guardan ya convertidas para no repetir la conversión
+(y su memoria) en cada proceso. Una versión se escribe en un directorio temporal que se renombra al
+terminar, y LATEST se actualiza al final, de modo que un lector nunca ve una versión a medias.
+"""
+
+# Importamos las librerías a usar
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from columnar import SortedStringIndex
+from neighbors import ItemNeighbors, ItemSimilarity, UserLSH, UserNeighbors, build_item_similarity, build_user_lsh
+from preprocessing import Model
+from timing import frame_nbytes
+from user_items import UserItems
+
+# Versión del formato de los artefactos
+ARTIFACTS_VERSION = 3
+
+LATEST_FILE = 'LATEST'
+
+
+def _model_arrays(model):
+    """
+    Devuelve un diccionario nombre -> arreglo con todos los arreglos numéricos del modelo.
+    """
+    arrays = {
+        'item_ids': np.asarray(model.df_item['item_id']),
+        'item_tfidf_data': model.item_tfidf.data,
+        'item_tfidf_indices': model.item_tfidf.indices,
+        'item_tfidf_indptr': model.item_tfidf.indptr,
+        'item_neighbors_indices': model.item_neighbors.indices,
+        'item_neighbors_scores': model.item_neighbors.scores,
+        'user_profiles': model.user_neighbors.profiles,
+        'user_items_indptr': model.user_items.indptr,
+        'user_items_item_codes': model.user_items.item_codes,
+        'user_items_playtime': model.user_items.playtime,
+    }
+    for prefix, matrix in zip(('item_similarity', 'item_similarity_transposed'), model.item_similarity):
+        arrays[f'{prefix}_data'] = matrix.data
+        arrays[f'{prefix}_indices'] = matrix.indices
+        arrays[f'{prefix}_indptr'] = matrix.indptr
+    user_ids, user_ids_sorter = SortedStringIndex.encode(model.user_neighbors.user_index)
+    arrays['user_ids'] = user_ids
+    if user_ids_sorter is not None:
+        arrays['user_ids_sorter'] = user_ids_sorter
+    if model.user_neighbors.lsh is not None:
+        arrays['user_lsh_planes'] = model.user_neighbors.lsh.planes
+        arrays['user_lsh_codes'] = model.user_neighbors.lsh.codes
+        arrays['user_lsh_order'] = model.user_neighbors.lsh.order
+    return arrays
+
+
+def _nbytes(*arrays):
+    return int(sum(np.asarray(values).nbytes for values in arrays if values is not None))
+
+
+def model_nbytes(model):
+    """
+    Devuelve un diccionario estructura -> bytes con el tamaño de las estructuras del modelo.
+
+    Los arreglos de una versión cargada están mapeados en memoria y son compartidos entre procesos, por lo que su
+    tamaño es el de sus archivos y no memoria propia de cada proceso.
+    """
+    user_index = model.user_neighbors.user_index
+    if isinstance(user_index, SortedStringIndex):
+        user_ids = _nbytes(user_index.values, user_index.sorter)
+    else:
+        user_ids = int(user_index.memory_usage(deep=True))
+    lsh = model.user_neighbors.lsh
+    return {
+        'df_item': frame_nbytes(model.df_item),
+        'item_tfidf': _nbytes(model.item_tfidf.data, model.item_tfidf.indices, model.item_tfidf.indptr),
+        'item_similarity': _nbytes(*(values for matrix in model.item_similarity
+                                     for values in (matrix.data, matrix.indices, matrix.indptr))),
+        'item_neighbors': _nbytes(model.item_neighbors.indices, model.item_neighbors.scores),
+        'user_profiles': _nbytes(model.user_neighbors.profiles),
+        'user_lsh': _nbytes(*lsh) if lsh is not None else 0,
+        'user_ids': user_ids,
+        'user_items': _nbytes(model.user_items.indptr, model.user_items.item_codes, model.user_items.playtime),
+    }
+
+
+def latest_version(models_dir):
+    """
+    Devuelve la versión más reciente guardada en models_dir, o None si no hay ninguna.
+    """
+    path = os.path.join(models_dir, LATEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding='utf-8') as file:
+        return file.read().strip() or None
+
+
+def list_versions(models_dir):
+    """
+    Devuelve las versiones completas guardadas en models_dir, de la más antigua a la más reciente.
+    """
+    if not os.path.isdir(models_dir):
+        return []
+    return sorted(name for name in os.listdir(models_dir)
+                  if os.path.exists(os.path.join(models_dir, name, 'manifest.json')))
+
+
+def save_model(model, models_dir, source=None, params=None):
+    """
+    Guarda el modelo como una nueva versión en models_dir y la marca como la más reciente.
+
+    Args:
+        model (Model): Modelo a guardar.
+        models_dir (str): Directorio raíz de los artefactos.
+        source (dict, opcional): Información del dataset de origen (ruta, suma de verificación).
+        params (dict, opcional): Parámetros con los que se construyó el modelo.
+
+    Returns:
+        str: Versión asignada al modelo.
+    """
+    os.makedirs(models_dir, exist_ok=True)
+    version = time.strftime('%Y%m%dT%H%M%S') + '-' + os.urandom(3).hex()
+    tmp_path = os.path.join(models_dir, f'.tmp-{version}')
+    os.makedirs(tmp_path)
+
+    arrays = _model_arrays(model)
+    for name, values in arrays.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), np.ascontiguousarray(values))
+
+    id_maps = {
+        'app_names': [str(name) for name in model.df_item['app_name']],
+        'genres': [str(genre) for genre in model.user_neighbors.genres],
+        'vocabulary': list(model.vocabulary),
+    }
+    with open(os.path.join(tmp_path, 'id_maps.json'), 'w', encoding='utf-8') as file:
+        json.dump(id_maps, file, ensure_ascii=False)
+
+    manifest = {
+        'format': ARTIFACTS_VERSION,
+        'version': version,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'source': source or {},
+        'params': params or {},
+        'counts': {
+            'items': len(model.df_item),
+            'users': len(model.user_neighbors.user_index),
+            'terms': len(model.vocabulary),
+        },
+        'item_tfidf_shape': list(model.item_tfidf.shape),
+        'user_mode': model.user_neighbors.mode,
+        'arrays': {name: {'dtype': str(values.dtype), 'shape': list(values.shape)} for name, values in arrays.items()},
+    }
+    with open(os.path.join(tmp_path, 'manifest.json'), 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2)
+
+    os.replace(tmp_path, os.path.join(models_dir, version))
+
+    # LATEST se escribe al final y con un renombrado atómico
+    latest_tmp = os.path.join(models_dir, f'.{LATEST_FILE}.tmp')
+    with open(latest_tmp, 'w', encoding='utf-8') as file:
+        file.write(version)
+    os.replace(latest_tmp, os.path.join(models_dir, LATEST_FILE))
+    return version
+
+
+def load_model(models_dir, version=None, mode=None):
+    """
+    Carga una versión del modelo con sus arreglos mapeados en memoria.
+
+    Args:
+        models_dir (str): Directorio raíz de los artefactos.
+        version (str, opcional): Versión a cargar. Por defecto la más reciente.
+        mode (str, opcional): Modo de búsqueda de usuarios similares, 'exact' o 'approx'. Por defecto el de la
+            versión guardada; si se pide 'approx' y la versión no tiene índice LSH, se construye al cargar.
+
+    Returns:
+        Model: Modelo cargado.
+    """
+    version = version or latest_version(models_dir)
+    if version is None:
+        raise FileNotFoundError(f"No hay modelos guardados en {models_dir}")
+    path = os.path.join(models_dir, version)
+    if not os.path.exists(os.path.join(path, 'manifest.json')):
+        raise FileNotFoundError(f"La versión {version} no existe en {models_dir}")
+
+    with open(os.path.join(path, 'manifest.json'), encoding='utf-8') as file:
+        manifest = json.load(file)
+    with open(os.path.join(path, 'id_maps.json'), encoding='utf-8') as file:
+        id_maps = json.load(file)
+    arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r') for name in manifest['arrays']}
+
+    df_item = pd.DataFrame({'item_id': arrays['item_ids'], 'app_name': id_maps['app_names']})
+    item_tfidf = sparse.csr_matrix(
+        (arrays['item_tfidf_data'], arrays['item_tfidf_indices'], arrays['item_tfidf_indptr']),
+        shape=tuple(manifest['item_tfidf_shape']))
+    item_neighbors = ItemNeighbors(pd.Index(arrays['item_ids']), arrays['item_neighbors_indices'],
+                                   arrays['item_neighbors_scores'])
+    if 'item_similarity_data' in arrays:
+        n_items, n_terms = item_tfidf.shape
+        item_similarity = ItemSimilarity(*(
+            sparse.csr_matrix((arrays[f'{prefix}_data'], arrays[f'{prefix}_indices'], arrays[f'{prefix}_indptr']),
+                              shape=shape)
+            for prefix, shape in (('item_similarity', (n_items, n_terms)),
+                                  ('item_similarity_transposed', (n_terms, n_items)))))
+    else:
+        # Formato 2: las matrices se convertían al cargar, en memoria propia de cada proceso
+        item_similarity = build_item_similarity(item_tfidf)
+
+    mode = mode or manifest['user_mode']
+    profiles = arrays['user_profiles']
+    lsh = None
+    if 'user_lsh_planes' in arrays:
+        lsh = UserLSH(arrays['user_lsh_planes'], arrays['user_lsh_codes'], arrays['user_lsh_order'])
+    elif mode == 'approx':
+        lsh = build_user_lsh(profiles)
+    if 'user_ids' in arrays:
+        user_index = SortedStringIndex(arrays['user_ids'], arrays.get('user_ids_sorter'))
+    else:
+        # Formato 1: los user_id se guardaban en id_maps.json
+        user_index = pd.Index(id_maps['user_ids'])
+    user_neighbors = UserNeighbors(user_index, pd.Index(id_maps['genres']), profiles, lsh, mode)
+
+    user_items = UserItems(arrays['user_items_indptr'], arrays['user_items_item_codes'],
+                           arrays['user_items_playtime'], np.asarray(arrays['item_ids']),
+                           df_item['app_name'].to_numpy())
+
+    return Model(version, df_item, item_tfidf, id_maps['vocabulary'], item_neighbors, user_neighbors, user_items,
+                 item_similarity)
+
+
+def remove_old_versions(models_dir, keep=3):
+    """
+    Elimina las versiones más antiguas, conservando las 'keep' más recientes y la marcada en LATEST.
+    """
+    latest = latest_version(models_dir)
+    versions = list_versions(models_dir)
+    for version in versions[:-keep] if keep else versions:
+        if version != latest:
+            shutil.rmtree(os.path.join(models_dir, version), ignore_errors=True)
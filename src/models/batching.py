@@ -0,0 +1,91 @@
+"""
+Micro-batching de peticiones individuales para los endpoints de recomendación.
+
+Las peticiones que llegan dentro de una ventana corta (unos milisegundos) se agrupan y se resuelven con una sola
+llamada a una función por lotes (por ejemplo recomendacion_usuario_batch), que se ejecuta en un pool de hilos
+(el BoundedExecutor de la API, si se indica) para no bloquear el bucle de eventos. Cada petición recibe su propio
+resultado; si la función falla, todas las peticiones del lote reciben la excepción.
+
+El lote se procesa cuando vence la ventana o cuando alcanza max_batch peticiones, lo que ocurra primero, por lo
+que la latencia adicional de una petición es como máximo la ventana.
+"""
+
+# Importamos las librerías a usar
+import asyncio
+
+
+class MicroBatcher:
+    """
+    Agrupa las claves enviadas con submit() y las resuelve por lotes con process(claves) -> resultados.
+
+    Args:
+        process (callable): Función que recibe una lista de claves y devuelve una lista de resultados del mismo
+            largo y en el mismo orden.
+        window (float, opcional): Segundos que se espera a más peticiones antes de procesar el lote. Por defecto
+            es 0.002.
+        max_batch (int, opcional): Tamaño máximo del lote. Por defecto es 256.
+        executor (BoundedExecutor, opcional): Pool donde se procesan los lotes. Por defecto, el pool de hilos del
+            bucle de eventos.
+    """
+
+    def __init__(self, process, window=0.002, max_batch=256, executor=None):
+        self.process = process
+        self.executor = executor
+        self.window = window
+        self.max_batch = max_batch
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+        self.batches = 0
+        self.requests = 0
+
+    async def submit(self, key):
+        """
+        Encola una clave y espera su resultado.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((key, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush(loop)
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush, loop)
+        return await future
+
+    def _flush(self, loop):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = loop.create_task(self._run(loop, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, loop, batch):
+        self.batches += 1
+        self.requests += len(batch)
+        try:
+            keys = [key for key, _ in batch]
+            if self.executor is not None:
+                results = await self.executor.run(self.process, keys)
+            else:
+                results = await loop.run_in_executor(None, self.process, keys)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        """
+        Número de lotes procesados, de peticiones atendidas y tamaño medio de los lotes.
+        """
+        return {
+            'lotes': self.batches,
+            'peticiones': self.requests,
+            'tamano_medio': self.requests / self.batches if self.batches else 0.0,
+        }
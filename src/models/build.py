@@ -0,0 +1,74 @@
+"""
+Construcción offline de los modelos de recomendación.
+
+Lee el dataset, ajusta el TF-IDF, calcula los vecinos ítem-ítem, los perfiles de usuario y el índice usuario ->
+juegos, y los guarda como una nueva versión de artefactos con su manifiesto. La API carga la versión más reciente
+al arrancar y puede cambiar a una versión nueva sin reiniciarse (POST /admin/reload).
+
+Uso (desde la raíz del repositorio):
+    python -m src.models.build --file-path ./src/data/dataset_full.csv --models-dir ./models
+"""
+
+import argparse
+import sys
+import time
+
+import pandas as pd
+
+# Añadir el directorio de los módulos a sys.path
+sys.path.append("./src/data")
+sys.path.append("./src/models")
+sys.path.append("./src/features")
+
+from columnar import file_checksum
+from normalized import load_normalized
+from preprocessing import build_model
+from artifacts import remove_old_versions, save_model
+from timing import frame_nbytes, phase, record_size
+
+
+def build_and_save(file_path, models_dir, n_vecinos_item=50, modo_usuarios='exact', max_usuarios=None):
+    """
+    Construye el modelo a partir del dataset y lo guarda como una nueva versión.
+
+    Args:
+        file_path (str): Ruta al archivo CSV del dataset.
+        models_dir (str): Directorio raíz de los artefactos.
+        n_vecinos_item (int, opcional): Número de vecinos que se guardan por juego. Por defecto es 50.
+        modo_usuarios (str, opcional): Modo de búsqueda de usuarios 'exact' o 'approx'. Por defecto es 'exact'.
+        max_usuarios (int, opcional): Si se indica, conserva solo los usuarios con más juegos.
+
+    Returns:
+        str: Versión guardada.
+    """
+    params = {'n_vecinos_item': n_vecinos_item, 'modo_usuarios': modo_usuarios, 'max_usuarios': max_usuarios}
+    # El modelo se construye sobre las tablas normalizadas, o sobre el DataFrame si el dataset no se puede normalizar;
+    # build_model registra el tamaño de las tablas y aquí solo se registra el del DataFrame
+    with phase('normalize'):
+        data = load_normalized(file_path)
+    if isinstance(data, pd.DataFrame):
+        record_size('df', frame_nbytes(data))
+    model = build_model(data, **params)
+    source = {'file_path': file_path, 'checksum': file_checksum(file_path)}
+    return save_model(model, models_dir, source=source, params=params)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--file-path', default='./src/data/dataset_full.csv')
+    parser.add_argument('--models-dir', default='./models')
+    parser.add_argument('--n-vecinos-item', type=int, default=50)
+    parser.add_argument('--modo-usuarios', choices=['exact', 'approx'], default='exact')
+    parser.add_argument('--max-usuarios', type=int, default=None)
+    parser.add_argument('--conservar', type=int, default=3, help='número de versiones anteriores a conservar')
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    version = build_and_save(args.file_path, args.models_dir, n_vecinos_item=args.n_vecinos_item,
+                             modo_usuarios=args.modo_usuarios, max_usuarios=args.max_usuarios)
+    remove_old_versions(args.models_dir, keep=args.conservar)
+    print(f"Modelo {version} guardado en {args.models_dir} ({time.perf_counter() - inicio:.1f} s)")
+
+
+if __name__ == '__main__':
+    main()
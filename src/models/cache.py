@@ -0,0 +1,127 @@
+"""
+Caché de respuestas de la API con desalojo LRU acotado por memoria.
+
+El tráfico se concentra en pocos géneros, años, desarrolladores y juegos populares, así que las respuestas de los
+endpoints se guardan con la clave (endpoint, parámetros normalizados). Cada entrada tiene un tamaño aproximado y,
+cuando el total supera max_bytes, se desalojan las entradas usadas hace más tiempo.
+
+La caché está asociada a una versión (por ejemplo, la suma de verificación del dataset y la versión del modelo):
+check_version() la vacía cuando la versión cambia y put() descarta las respuestas de otra versión (las que terminan
+de calcularse después de una recarga), de modo que nunca se sirve ni se guarda una respuesta calculada con datos o
+modelos anteriores. Con 'serialize', las respuestas se guardan ya serializadas como bytes JSON y un acierto no
+vuelve a serializar.
+"""
+
+# Importamos las librerías a usar
+import pickle
+import threading
+from collections import OrderedDict
+
+# Valor que devuelve get() cuando la clave no está en la caché
+MISS = object()
+
+
+def _sizeof(value):
+    """
+    Tamaño aproximado en bytes de una respuesta.
+    """
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+class ResponseCache:
+    """
+    Caché LRU de respuestas acotada por tamaño en bytes.
+
+    Args:
+        max_bytes (int): Tamaño máximo total de las entradas.
+        serialize (callable, opcional): Si se indica, put() guarda serialize(valor) (bytes JSON) en lugar del valor.
+    """
+
+    def __init__(self, max_bytes, serialize=None):
+        self.max_bytes = max_bytes
+        self.serialize = serialize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def check_version(self, version):
+        """
+        Vacía la caché si 'version' es distinta de la versión con la que se guardaron las entradas.
+        """
+        if version != self._version:
+            with self._lock:
+                if version != self._version:
+                    if self._entries:
+                        self.invalidations += 1
+                    self._entries.clear()
+                    self.size = 0
+                    self._version = version
+
+    def get(self, key):
+        """
+        Devuelve el valor guardado para 'key' (y lo marca como el más reciente) o MISS.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISS
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, version=None):
+        """
+        Guarda la respuesta de 'key' y desaloja las menos usadas si se supera max_bytes. Devuelve el valor guardado
+        (los bytes serializados si la caché guarda JSON).
+
+        Si se indica 'version' (la versión con la que se calculó la respuesta) y no es la versión actual de la
+        caché, la respuesta no se guarda: su clave ya no se volvería a pedir.
+        """
+        if self.serialize is not None:
+            value = self.serialize(value)
+        size = _sizeof(value)
+        if size > self.max_bytes:
+            return value
+        with self._lock:
+            if version is not None and version != self._version:
+                return value
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while self.size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        """
+        Entradas, bytes usados y contadores de aciertos, fallos, desalojos e invalidaciones.
+        """
+        total = self.hits + self.misses
+        return {
+            'entradas': len(self._entries),
+            'bytes': self.size,
+            'max_bytes': self.max_bytes,
+            'json': self.serialize is not None,
+            'aciertos': self.hits,
+            'fallos': self.misses,
+            'tasa_aciertos': self.hits / total if total else 0.0,
+            'desalojos': self.evictions,
+            'invalidaciones': self.invalidations,
+        }
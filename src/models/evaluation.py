@@ -0,0 +1,411 @@
+"""
+Evaluación offline de la calidad y la velocidad de los sistemas de recomendación.
+
+Separa de la tabla de hechos usuario-juego del dataset una parte de los juegos de cada usuario (holdout), construye
+el modelo con el resto y pide las recomendaciones de los usuarios evaluados a cada recomendador:
+
+- 'item': recomendacion_juego a partir del juego más jugado del usuario en el entrenamiento.
+- 'usuario' y 'usuario_weighted': recomendacion_usuario con scoring 'first' y 'weighted'.
+- 'hibrida': recomendacion_hibrida.
+
+Las recomendaciones se generan por bloques de usuarios en un pool de procesos. El modelo se guarda una vez como
+artefacto y cada proceso lo carga mapeado en memoria (load_model), de modo que todos comparten sus arreglos de
+solo lectura en lugar de recibir una copia. Para cada recomendador se reporta precision@k y recall@k (promedios
+por usuario evaluado, contando como fallos los usuarios sin recomendaciones), la cobertura del catálogo (fracción
+de juegos recomendados al menos una vez) y los usuarios y las recomendaciones por segundo (tiempo de pared de la
+generación, con el arranque del pool incluido).
+
+--barrido evalúa la combinación de varios valores de los parámetros: de construcción del modelo (n_vecinos_item,
+max_usuarios y los de TfidfVectorizer con el prefijo tfidf_, por ejemplo tfidf_sublinear_tf) y de recomendación
+(n_vecinos y alpha). Los modelos se reutilizan entre las combinaciones que solo cambian los de recomendación. Con
+--optuna N, optuna busca en N intentos los parámetros que maximizan recall@k del recomendador de --objetivo.
+
+En dataset_full.csv cada usuario tiene un solo juego y no hay nada que separar: --juegos-por-usuario N evalúa una
+copia del dataset con los usuarios agrupados de a N (regroup_users de benchmarks/synthetic.py), escrita en un
+directorio temporal.
+
+Uso (desde la raíz del repositorio):
+    python -m src.models.evaluation --file-path ./src/data/dataset_full.csv --juegos-por-usuario 5 --procesos 4
+    python -m src.models.evaluation --barrido n_vecinos=25,50,100 tfidf_sublinear_tf=false,true --salida eval.json
+    python -m src.models.evaluation --optuna 30 --objetivo hibrida
+"""
+
+import argparse
+import itertools
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Añadir el directorio de los módulos a sys.path
+sys.path.append("./src/data")
+sys.path.append("./src/models")
+sys.path.append("./src/features")
+
+from normalized import UserItemFacts, load_tables
+from preprocessing import build_model
+from artifacts import load_model, save_model
+from modelos import recomendacion_hibrida_batch, recomendacion_juego_batch, recomendacion_usuario_batch
+
+# Recomendadores que se evalúan
+RECOMMENDERS = ('item', 'usuario', 'usuario_weighted', 'hibrida')
+
+# Parámetros de construcción del modelo (además de los tfidf_*) y de las funciones de recomendación
+BUILD_PARAMS = ('n_vecinos_item', 'max_usuarios')
+RECOMMEND_PARAMS = ('n_vecinos', 'alpha')
+
+# Partición de evaluación:
+# - train (NormalizedDataset): tablas del dataset sin los juegos separados.
+# - user_ids (np.ndarray): usuarios evaluados, los que tienen juegos separados.
+# - seed_items (np.ndarray): juego más jugado de cada usuario evaluado en el entrenamiento (para 'item').
+# - held_indptr y held_items (np.ndarray): juegos separados de cada usuario evaluado (CSR, como item_id).
+Holdout = namedtuple('Holdout', ['train', 'user_ids', 'seed_items', 'held_indptr', 'held_items'])
+
+
+def split_holdout(tables, fraction=0.2, min_items=2, max_users=None, seed=0):
+    """
+    Separa al azar una fracción de los juegos de cada usuario con al menos 'min_items' juegos.
+
+    A cada usuario se le separa round(fraction * juegos) de sus juegos, al menos uno y conservando al menos uno en
+    el entrenamiento; los demás usuarios quedan completos en el entrenamiento y no se evalúan.
+
+    Args:
+        tables (NormalizedDataset): Tablas del dataset (load_tables).
+        fraction (float, opcional): Fracción de los juegos de cada usuario que se separa. Por defecto es 0.2.
+        min_items (int, opcional): Juegos mínimos para evaluar a un usuario. Por defecto es 2.
+        max_users (int, opcional): Si se indica, evalúa solo esa cantidad de usuarios tomados al azar.
+        seed (int, opcional): Semilla de la partición. Por defecto es 0.
+
+    Returns:
+        Holdout: Tablas de entrenamiento y juegos separados de los usuarios evaluados.
+    """
+    facts = tables.user_items
+    rng = np.random.default_rng(seed)
+    counts = np.bincount(facts.user_codes, minlength=len(tables.users.items_count))
+    n_held = np.minimum(np.maximum(np.round(counts * fraction), 1), counts - 1).astype(np.int64)
+    n_held[counts < min_items] = 0
+    if max_users is not None:
+        eligible = np.flatnonzero(n_held > 0)
+        if len(eligible) > max_users:
+            keep = np.zeros(len(n_held), dtype=bool)
+            keep[rng.choice(eligible, max_users, replace=False)] = True
+            n_held[~keep] = 0
+
+    # Orden aleatorio de los juegos dentro de cada usuario; se separan los primeros n_held
+    order = np.lexsort((rng.random(len(facts.user_codes)), facts.user_codes))
+    sorted_users = facts.user_codes[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_users, sorted_users)
+    held_sorted = rank < n_held[sorted_users]
+    held = np.zeros(len(order), dtype=bool)
+    held[order[held_sorted]] = True
+    train = tables._replace(user_items=UserItemFacts(*(column[~held] for column in facts)))
+
+    users = np.flatnonzero(n_held > 0)
+    held_indptr = np.zeros(len(users) + 1, dtype=np.int64)
+    np.cumsum(n_held[users], out=held_indptr[1:])
+    held_items = tables.items.item_id[facts.item_codes[order[held_sorted]]]
+
+    # Juego más jugado (el primero del dataset en los empates) de cada usuario en el entrenamiento
+    train_facts = train.user_items
+    by_playtime = np.lexsort((-train_facts.playtime, train_facts.user_codes))
+    first_users, first = np.unique(train_facts.user_codes[by_playtime], return_index=True)
+    seed_items = tables.items.item_id[train_facts.item_codes[by_playtime[first[np.searchsorted(first_users, users)]]]]
+
+    return Holdout(train, tables.users.user_id[users], seed_items, held_indptr, held_items)
+
+
+def recommend(model, recommender, user_ids, seed_items, k=5, n_vecinos=50, alpha=0.5):
+    """
+    item_id de las recomendaciones de un recomendador para cada usuario (lista vacía si no está en el modelo).
+    """
+    if recommender == 'item':
+        results = recomendacion_juego_batch(seed_items, model.df_item, model.item_neighbors, k)
+    elif recommender == 'hibrida':
+        results = recomendacion_hibrida_batch(user_ids, model.user_items, model.user_neighbors, model.item_tfidf, k,
+                                              n_vecinos, alpha)
+    elif recommender in ('usuario', 'usuario_weighted'):
+        scoring = 'weighted' if recommender == 'usuario_weighted' else 'first'
+        results = recomendacion_usuario_batch(user_ids, model.user_items, model.user_neighbors, k, n_vecinos,
+                                              scoring=scoring)
+    else:
+        raise ValueError(f"Recomendador no soportado: {recommender}. Use uno de {list(RECOMMENDERS)}")
+    return [[rec['item_id'] for rec in result] if isinstance(result, list) else [] for result in results]
+
+
+# Modelo de cada proceso del pool, cargado por _load_worker_model
+_worker_model = None
+
+
+def _load_worker_model(models_dir):
+    global _worker_model
+    _worker_model = load_model(models_dir)
+
+
+def _recommend_chunk(recommender, user_ids, seed_items, k, params):
+    return recommend(_worker_model, recommender, user_ids, seed_items, k, **params)
+
+
+def evaluation_pool(models_dir, procesos):
+    """
+    Pool de procesos que cargan el modelo guardado en models_dir (mapeado en memoria, compartido entre ellos).
+    """
+    return ProcessPoolExecutor(procesos, initializer=_load_worker_model, initargs=(models_dir,))
+
+
+def quality(recommendations, holdout, k, n_items):
+    """
+    precision@k, recall@k, cobertura del catálogo y fracción de usuarios con recomendaciones.
+    """
+    n_users = len(recommendations)
+    lengths = np.array([len(items) for items in recommendations], dtype=np.int64)
+    rec_items = np.fromiter(itertools.chain.from_iterable(recommendations), dtype=np.int64, count=lengths.sum())
+    rec_owner = np.repeat(np.arange(n_users), lengths)
+    held_counts = np.diff(holdout.held_indptr)
+    held_owner = np.repeat(np.arange(n_users), held_counts)
+
+    # Aciertos: pares (usuario evaluado, juego) recomendados que estaban entre los separados
+    base = int(max(rec_items.max(initial=0), holdout.held_items.max(initial=0))) + 1
+    hit = np.isin(rec_owner * base + rec_items, held_owner * base + holdout.held_items.astype(np.int64))
+    hits = np.bincount(rec_owner[hit], minlength=n_users)
+    return {
+        'precision': float(np.mean(hits / k)) if n_users else 0.0,
+        'recall': float(np.mean(hits / held_counts)) if n_users else 0.0,
+        'cobertura': len(np.unique(rec_items)) / n_items,
+        'usuarios_con_recomendaciones': float(np.mean(lengths > 0)) if n_users else 0.0,
+    }
+
+
+def evaluate(model, holdout, recommenders=RECOMMENDERS, k=5, pool=None, chunk_size=1000, **params):
+    """
+    Evalúa los recomendadores sobre los usuarios de la partición.
+
+    Args:
+        model (Model): Modelo construido con holdout.train.
+        holdout (Holdout): Partición de evaluación.
+        recommenders (sequence, opcional): Recomendadores a evaluar. Por defecto, todos (RECOMMENDERS).
+        k (int, opcional): Número de recomendaciones por usuario. Por defecto es 5.
+        pool (ProcessPoolExecutor, opcional): Pool de evaluation_pool con el mismo modelo. Sin pool, las
+            recomendaciones se generan en el proceso actual.
+        chunk_size (int, opcional): Usuarios por tarea del pool. Por defecto es 1000.
+        **params: n_vecinos y alpha de las funciones de recomendación.
+
+    Returns:
+        dict: Recomendador -> métricas (precision, recall, cobertura, usuarios_con_recomendaciones, segundos,
+        usuarios_por_segundo y recomendaciones_por_segundo).
+    """
+    user_ids = list(holdout.user_ids)
+    seed_items = holdout.seed_items.tolist()
+    chunks = [(user_ids[start:start + chunk_size], seed_items[start:start + chunk_size])
+              for start in range(0, len(user_ids), chunk_size)]
+    results = {}
+    for recommender in recommenders:
+        inicio = time.perf_counter()
+        if pool is None:
+            parts = [recommend(model, recommender, users, seeds, k, **params) for users, seeds in chunks]
+        else:
+            futures = [pool.submit(_recommend_chunk, recommender, users, seeds, k, params) for users, seeds in chunks]
+            parts = [future.result() for future in futures]
+        seconds = time.perf_counter() - inicio
+        recommendations = list(itertools.chain.from_iterable(parts))
+        metrics = quality(recommendations, holdout, k, len(model.df_item))
+        metrics['segundos'] = seconds
+        metrics['usuarios_por_segundo'] = len(user_ids) / seconds if seconds else 0.0
+        metrics['recomendaciones_por_segundo'] = sum(map(len, recommendations)) / seconds if seconds else 0.0
+        results[recommender] = metrics
+    return results
+
+
+class Evaluator:
+    """
+    Evalúa combinaciones de parámetros sobre una misma partición, reutilizando los modelos (y sus pools) de las
+    combinaciones con los mismos parámetros de construcción.
+
+    Args:
+        holdout (Holdout): Partición de evaluación.
+        recommenders (sequence): Recomendadores a evaluar.
+        k (int): Número de recomendaciones por usuario.
+        procesos (int): Procesos del pool; con 1 se evalúa en el proceso actual.
+        work_dir (str): Directorio donde se guardan los modelos que leen los procesos.
+        chunk_size (int, opcional): Usuarios por tarea del pool. Por defecto es 1000.
+    """
+
+    def __init__(self, holdout, recommenders, k, procesos, work_dir, chunk_size=1000):
+        self.holdout = holdout
+        self.recommenders = recommenders
+        self.k = k
+        self.procesos = procesos
+        self.work_dir = work_dir
+        self.chunk_size = chunk_size
+        self._models = {}
+
+    def _model(self, build_params):
+        key = json.dumps(build_params, sort_keys=True)
+        if key not in self._models:
+            tfidf_params = {name[len('tfidf_'):]: value for name, value in build_params.items()
+                            if name.startswith('tfidf_')}
+            model = build_model(self.holdout.train, tfidf_params=tfidf_params,
+                                **{name: value for name, value in build_params.items() if name in BUILD_PARAMS})
+            pool = None
+            if self.procesos > 1:
+                models_dir = os.path.join(self.work_dir, f'modelo_{len(self._models)}')
+                save_model(model, models_dir, params=build_params)
+                pool = evaluation_pool(models_dir, self.procesos)
+            self._models[key] = (model, pool)
+        return self._models[key]
+
+    def run(self, params):
+        """
+        Métricas de cada recomendador con una combinación de parámetros.
+        """
+        for name in params:
+            if name not in BUILD_PARAMS + RECOMMEND_PARAMS and not name.startswith('tfidf_'):
+                raise ValueError(f"Parámetro no soportado: {name}")
+        model, pool = self._model({name: value for name, value in params.items() if name not in RECOMMEND_PARAMS})
+        return evaluate(model, self.holdout, self.recommenders, self.k, pool, self.chunk_size,
+                        **{name: value for name, value in params.items() if name in RECOMMEND_PARAMS})
+
+    def close(self):
+        for model, pool in self._models.values():
+            if pool is not None:
+                pool.shutdown()
+
+
+def parse_value(text):
+    """
+    Valor de un parámetro del barrido: None (vacío o 'none'), booleano, entero, flotante o texto.
+    """
+    if text.lower() in ('', 'none'):
+        return None
+    if text.lower() in ('true', 'false'):
+        return text.lower() == 'true'
+    for convert in (int, float):
+        try:
+            return convert(text)
+        except ValueError:
+            pass
+    return text
+
+
+def parse_sweep(entries):
+    """
+    Combinaciones de parámetros a partir de entradas 'nombre=valor1,valor2'.
+    """
+    grid = {}
+    for entry in entries:
+        name, _, values = entry.partition('=')
+        grid[name] = [parse_value(value) for value in values.split(',')]
+    return [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+
+
+def optuna_search(evaluator, trials, objetivo, seed=0):
+    """
+    Busca con optuna los parámetros que maximizan recall@k del recomendador 'objetivo'.
+
+    Returns:
+        list: Pares (parámetros, métricas) de cada intento.
+    """
+    # optuna solo se importa si se pide la búsqueda
+    import optuna
+
+    history = []
+
+    def objective(trial):
+        params = {
+            'n_vecinos': trial.suggest_int('n_vecinos', 10, 200, log=True),
+            'tfidf_sublinear_tf': trial.suggest_categorical('tfidf_sublinear_tf', [False, True]),
+            'tfidf_binary': trial.suggest_categorical('tfidf_binary', [False, True]),
+        }
+        if objetivo == 'hibrida':
+            params['alpha'] = trial.suggest_float('alpha', 0.0, 1.0)
+        results = evaluator.run(params)
+        print_results(params, results, evaluator.k)
+        history.append((params, results))
+        return results[objetivo]['recall']
+
+    study = optuna.create_study(direction='maximize', sampler=optuna.samplers.TPESampler(seed=seed))
+    study.optimize(objective, n_trials=trials)
+    print(f"\nMejores parámetros para {objetivo}: {study.best_params} (recall@k {study.best_value:.4f})")
+    return history
+
+
+def print_results(params, results, k):
+    print(f"\n{params or 'parámetros por defecto'}")
+    print(f"{'recomendador':>18} {f'prec@{k}':>8} {f'rec@{k}':>8} {'cobert.':>8} {'con recs':>8} "
+          f"{'usuarios/s':>11} {'recs/s':>10}")
+    for recommender, metrics in results.items():
+        print(f"{recommender:>18} {metrics['precision']:>8.4f} {metrics['recall']:>8.4f} "
+              f"{metrics['cobertura']:>8.4f} {metrics['usuarios_con_recomendaciones']:>8.3f} "
+              f"{metrics['usuarios_por_segundo']:>11.1f} {metrics['recomendaciones_por_segundo']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--file-path', default='./src/data/dataset_full.csv')
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--fraccion', type=float, default=0.2, help='fracción de juegos de cada usuario a separar')
+    parser.add_argument('--min-juegos', type=int, default=2)
+    parser.add_argument('--juegos-por-usuario', type=int, default=0,
+                        help='evalúa una copia con los usuarios agrupados de a N (benchmarks/synthetic.py)')
+    parser.add_argument('--usuarios', type=int, default=None, help='usuarios evaluados (al azar); por defecto todos')
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--recomendadores', nargs='+', choices=RECOMMENDERS, default=list(RECOMMENDERS))
+    parser.add_argument('--procesos', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--bloque', type=int, default=1000, help='usuarios por tarea del pool')
+    parser.add_argument('--barrido', nargs='*', default=[], help="valores de los parámetros: nombre=v1,v2")
+    parser.add_argument('--optuna', type=int, default=0, help='número de intentos de la búsqueda con optuna')
+    parser.add_argument('--objetivo', choices=RECOMMENDERS, default='hibrida')
+    parser.add_argument('--salida', default=None, help='archivo JSON de resultados')
+    args = parser.parse_args()
+
+    if args.optuna and args.objetivo not in args.recomendadores:
+        args.recomendadores.append(args.objetivo)
+
+    salida = []
+    with tempfile.TemporaryDirectory(prefix='evaluacion-') as work_dir:
+        file_path = args.file_path
+        if args.juegos_por_usuario:
+            # El generador de datos sintéticos solo se importa si se pide el reagrupamiento
+            sys.path.append("./benchmarks")
+            from synthetic import regroup_users
+
+            file_path = os.path.join(work_dir, 'dataset_reagrupado.csv')
+            print(regroup_users(args.file_path, file_path, args.juegos_por_usuario, args.semilla))
+
+        tables = load_tables(file_path)
+        holdout = split_holdout(tables, args.fraccion, args.min_juegos, args.usuarios, args.semilla)
+        print(f"{len(tables.users.items_count)} usuarios, {len(holdout.user_ids)} evaluados, "
+              f"{len(holdout.held_items)} juegos separados, {args.procesos} procesos")
+        if len(holdout.user_ids) == 0:
+            parser.exit(1, f"Ningún usuario tiene al menos {args.min_juegos} juegos: no hay juegos que separar. "
+                           f"Con un juego por usuario, use --juegos-por-usuario N.\n")
+
+        evaluator = Evaluator(holdout, args.recomendadores, args.k, args.procesos, work_dir, args.bloque)
+        try:
+            if args.optuna:
+                history = optuna_search(evaluator, args.optuna, args.objetivo, args.semilla)
+            else:
+                history = []
+                for params in parse_sweep(args.barrido):
+                    results = evaluator.run(params)
+                    print_results(params, results, args.k)
+                    history.append((params, results))
+        finally:
+            evaluator.close()
+
+    for params, results in history:
+        salida.extend({'params': params, 'recomendador': recommender, 'k': args.k, **metrics}
+                      for recommender, metrics in results.items())
+    if args.salida:
+        os.makedirs(os.path.dirname(os.path.abspath(args.salida)), exist_ok=True)
+        with open(args.salida, 'w', encoding='utf-8') as file:
+            json.dump(salida, file, ensure_ascii=False, indent=2)
+        print(f"\nResultados guardados en {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Pool acotado de hilos para el trabajo de CPU de los endpoints de recomendación.
+
+Los endpoints async no deben calcular recomendaciones en el bucle de eventos: mientras lo hacen, ninguna otra
+petición avanza, ni siquiera las consultas baratas. BoundedExecutor ejecuta ese trabajo en un pool de hilos de
+tamaño fijo (NumPy libera el GIL en las operaciones pesadas y los hilos comparten el modelo sin copiarlo, cosa que
+un pool de procesos no permitiría) y limita cuántas tareas pueden esperar en cola. Cuando el pool está lleno y la
+cola también, run() lanza Overloaded de inmediato para que la API responda 503 en lugar de acumular latencia.
+
+Cada tarea se ejecuta con una copia del contexto (contextvars) de quien la envió y, si se indica on_task, se mide
+su tiempo de CPU en el hilo del pool, por ejemplo para atribuirlo a la ruta de la petición en /metrics.
+"""
+
+# Importamos las librerías a usar
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+
+class Overloaded(Exception):
+    """
+    El pool y su cola están llenos.
+    """
+
+
+class BoundedExecutor:
+    """
+    Ejecuta funciones en un pool de hilos con un límite de tareas en espera.
+
+    Args:
+        max_workers (int, opcional): Número de hilos. Por defecto, el número de CPUs.
+        max_queue (int, opcional): Número máximo de tareas esperando un hilo libre. Por defecto es 16.
+        on_task (callable, opcional): Se llama en el hilo del pool, con el contexto de la tarea, con los segundos
+            de CPU de cada tarea terminada.
+    """
+
+    def __init__(self, max_workers=None, max_queue=16, on_task=None):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self.on_task = on_task
+        self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='cpu')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+            self.completed += 1
+
+    def _timed(self, function):
+        inicio = time.thread_time()
+        try:
+            return function()
+        finally:
+            self.on_task(time.thread_time() - inicio)
+
+    async def run(self, function, *args, **kwargs):
+        """
+        Ejecuta function(*args, **kwargs) en el pool y espera su resultado sin bloquear el bucle de eventos.
+
+        Raises:
+            Overloaded: Si ya hay max_workers tareas en ejecución y max_queue en espera.
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self.rejected += 1
+                raise Overloaded(f"Hay {self._pending} tareas en curso o en espera")
+            self._pending += 1
+        # La tarea se libera al terminar en el pool, aunque la petición que la esperaba se haya cancelado
+        task = partial(function, *args, **kwargs)
+        context = contextvars.copy_context()
+        try:
+            if self.on_task is not None:
+                future = self._executor.submit(context.run, self._timed, task)
+            else:
+                future = self._executor.submit(context.run, task)
+        except BaseException:
+            # Por ejemplo, RuntimeError si el pool ya se cerró: la tarea no ocupa un lugar
+            with self._lock:
+                self._pending -= 1
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        """
+        Hilos, tareas en ejecución y en espera, y tareas completadas y rechazadas.
+        """
+        pending = self._pending
+        return {
+            'hilos': self.max_workers,
+            'max_cola': self.max_queue,
+            'en_curso': min(pending, self.max_workers),
+            'en_cola': max(pending - self.max_workers, 0),
+            'completadas': self.completed,
+            'rechazadas': self.rejected,
+        }
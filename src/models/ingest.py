@@ -0,0 +1,164 @@
+"""
+Ingesta incremental de datos de juego nuevos.
+
+Añade al dataset eventos (usuario, juego, tiempo de juego y, opcionalmente, sentimiento de la reseña) y actualiza
+todo lo que depende de él sin reconstruirlo desde cero:
+
+- el CSV y su artefacto columnar (append_rows);
+- los agregados de los endpoints de consultas, recalculando solo los géneros, años y desarrolladores afectados;
+- el modelo de recomendación, recalculando solo los perfiles y los juegos de los usuarios afectados, que se guarda
+  como una versión nueva y se marca en LATEST (la API la carga con POST /admin/reload o con MODEL_WATCH_INTERVAL).
+
+Los juegos de los eventos deben existir en el dataset: sus atributos (géneros, nombre, precio, desarrollador, año)
+se toman del catálogo. Un juego nuevo cambia el TF-IDF y los vecinos ítem-ítem, y requiere reconstruir el modelo
+con src.models.build.
+
+Uso (desde la raíz del repositorio):
+    python -m src.models.ingest --events eventos.csv --file-path ./src/data/dataset_full.csv --models-dir ./models
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+# Añadir el directorio de los módulos a sys.path
+sys.path.append("./src/data")
+sys.path.append("./src/models")
+sys.path.append("./src/features")
+
+from columnar import MISSING_YEAR, append_rows, decoded, file_checksum, load_dataset
+from aggregates import load_or_build_aggregates, save_aggregates, update_aggregates
+from preprocessing import update_model
+from artifacts import latest_version, load_model, remove_old_versions, save_model
+
+# Columnas de los eventos; 'sentiment' es opcional y los nulos se guardan como neutrales (1)
+EVENT_COLUMNS = ['user_id', 'item_id', 'playtime_forever']
+
+# Columnas que se toman del catálogo de juegos
+ITEM_COLUMNS = ['item_id', 'genres', 'app_name', 'price', 'developer', 'release_year']
+
+
+def events_to_rows(dataset, events):
+    """
+    Convierte los eventos en filas del dataset, con los atributos de cada juego tomados del catálogo.
+
+    Cada evento genera una fila por género del juego, como en el dataset. 'items_count' se conserva para los
+    usuarios existentes y, para los nuevos, es el número de juegos distintos de sus eventos.
+
+    Args:
+        dataset (pd.DataFrame): Dataset actual.
+        events (pd.DataFrame): Eventos con las columnas 'user_id', 'item_id', 'playtime_forever' y, opcionalmente,
+            'sentiment'.
+
+    Returns:
+        pd.DataFrame: Filas a añadir, con las columnas del dataset.
+
+    Raises:
+        ValueError: Si faltan columnas, hay sentimientos fuera de 0/1/2 o juegos que no están en el dataset.
+    """
+    missing = set(EVENT_COLUMNS) - set(events.columns)
+    if missing:
+        raise ValueError(f"Faltan columnas en los eventos: {sorted(missing)}")
+    events = events.copy()
+    events['user_id'] = events['user_id'].astype(str)
+    events['sentiment'] = events['sentiment'].fillna(1) if 'sentiment' in events else 1
+    if not events['sentiment'].isin([0, 1, 2]).all():
+        raise ValueError("El sentimiento debe ser 0 (negativo), 1 (neutral) o 2 (positivo).")
+
+    catalog = decoded(dataset, ITEM_COLUMNS).drop_duplicates(subset=['item_id', 'genres'])
+    # Los juegos sin año se escriben en el CSV sin año, no con el valor con el que los guarda el artefacto
+    catalog['release_year'] = catalog['release_year'].where(catalog['release_year'] != MISSING_YEAR).astype('Int64')
+    unknown = set(events['item_id']) - set(catalog['item_id'])
+    if unknown:
+        raise ValueError(f"Juegos que no están en el dataset: {sorted(unknown)[:10]}. Reconstruya el modelo.")
+
+    users = decoded(dataset, ['user_id', 'items_count']).groupby('user_id')['items_count'].max()
+    counts = events['user_id'].map(users)
+    new_counts = events.groupby('user_id')['item_id'].transform('nunique')
+    events['items_count'] = counts.fillna(new_counts).astype(int)
+
+    rows = events.drop(columns=[c for c in ITEM_COLUMNS[1:] if c in events]).merge(catalog, on='item_id', how='left',
+                                                                                  sort=False)
+    return rows[list(dataset.columns)]
+
+
+def ingest_events(file_path, models_dir, events, conservar=3):
+    """
+    Añade los eventos al dataset y actualiza los agregados y el modelo de forma incremental.
+
+    Cada paso deja archivos consistentes: si el proceso se detiene entre pasos, los agregados y el modelo tienen
+    la suma de verificación del dataset anterior, por lo que los agregados se recalculan al arrancar la API y el
+    modelo se puede reconstruir con src.models.build.
+
+    Args:
+        file_path (str): Ruta al archivo CSV del dataset.
+        models_dir (str): Directorio raíz de los artefactos.
+        events (pd.DataFrame): Eventos a añadir (ver events_to_rows).
+        conservar (int, opcional): Número de versiones anteriores del modelo a conservar. Por defecto es 3.
+
+    Returns:
+        dict: Filas añadidas, usuarios actualizados, versión del modelo y tiempo de cada paso en segundos.
+    """
+    tiempos = {}
+    inicio = time.perf_counter()
+    dataset = load_dataset(file_path)
+    cubes = load_or_build_aggregates(file_path, lambda: dataset)
+
+    # El modelo se valida antes de modificar el dataset, para no dejarlo a medias
+    version = latest_version(models_dir)
+    manifest = None
+    if version is not None:
+        with open(os.path.join(models_dir, version, 'manifest.json'), encoding='utf-8') as file:
+            manifest = json.load(file)
+        if manifest['params'].get('max_usuarios') is not None:
+            raise ValueError("El modelo se construyó con 'max_usuarios'; reconstrúyalo con src.models.build.")
+        if manifest['source'].get('checksum') != file_checksum(file_path):
+            raise ValueError("El modelo no corresponde al dataset actual; reconstrúyalo con src.models.build.")
+
+    rows = events_to_rows(dataset, events)
+    n_anteriores = len(dataset)
+    tiempos['validar'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    append_rows(file_path, rows)
+    dataset = load_dataset(file_path)
+    tiempos['dataset'] = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    update_aggregates(cubes, dataset, dataset.iloc[n_anteriores:])
+    save_aggregates(file_path, cubes)
+    tiempos['agregados'] = time.perf_counter() - inicio
+
+    user_ids = rows['user_id'].unique()
+    nueva_version = None
+    if manifest is not None:
+        inicio = time.perf_counter()
+        model = update_model(load_model(models_dir, version), dataset, user_ids)
+        source = {'file_path': file_path, 'checksum': file_checksum(file_path), 'incremental_from': version}
+        nueva_version = save_model(model, models_dir, source=source, params=manifest['params'])
+        remove_old_versions(models_dir, keep=conservar)
+        tiempos['modelo'] = time.perf_counter() - inicio
+
+    return {'filas': len(rows), 'usuarios': len(user_ids), 'version': nueva_version, 'tiempos': tiempos}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', required=True, help='CSV con user_id, item_id, playtime_forever y sentiment')
+    parser.add_argument('--file-path', default='./src/data/dataset_full.csv')
+    parser.add_argument('--models-dir', default='./models')
+    parser.add_argument('--conservar', type=int, default=3, help='número de versiones anteriores a conservar')
+    args = parser.parse_args()
+
+    events = pd.read_csv(args.events, dtype={'user_id': str})
+    result = ingest_events(args.file_path, args.models_dir, events, conservar=args.conservar)
+    pasos = ', '.join(f"{paso} {segundos:.2f} s" for paso, segundos in result['tiempos'].items())
+    print(f"{result['filas']} filas de {result['usuarios']} usuarios añadidas; modelo {result['version']} ({pasos})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,311 @@
+"""
+Métricas de la API en el formato de texto de Prometheus.
+
+MetricsRegistry guarda contadores, medidores (gauges) e histogramas con etiquetas y los escribe en el formato de
+exposición de texto de Prometheus (version 0.0.4) para el endpoint /metrics. Los medidores pueden tener una función
+que se evalúa en cada lectura, para los valores que ya existen en otra parte (tamaños de las estructuras, tiempos de
+las fases, contadores de la caché) y que no hace falta actualizar en cada petición.
+
+MetricsMiddleware es un middleware ASGI que mide cada petición por ruta (la plantilla de la ruta, por ejemplo
+/recomendacion-usuario/{user_id}, y no la URL, para que el número de series no crezca con los IDs): peticiones por
+estado, histograma de latencia y peticiones en curso. El tiempo de CPU del pool de recomendaciones se atribuye a la
+ruta de la petición que envió la tarea mediante la variable de contexto current_route.
+
+Con uvicorn y varios workers cada proceso tiene sus propias métricas; /metrics responde con las del worker que
+atiende la petición.
+"""
+
+# Importamos las librerías a usar
+import contextvars
+import math
+import os
+import threading
+import time
+
+from starlette.routing import Match
+
+# Ruta (plantilla) de la petición en curso; la copian las tareas enviadas al pool de CPU
+current_route = contextvars.ContextVar('current_route', default=None)
+
+# Límites de los histogramas de latencia, en segundos
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Etiqueta de las peticiones que no corresponden a ninguna ruta
+OTHER_ROUTE = 'otras'
+
+# Tipo de contenido de /metrics (Starlette añade '; charset=utf-8')
+CONTENT_TYPE = 'text/plain; version=0.0.4'
+
+
+def _format_value(value):
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    if math.isnan(value):
+        return 'NaN'
+    return repr(float(value))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+class _Metric:
+    """
+    Métrica con nombre, descripción y etiquetas; sus valores se guardan por tupla de valores de etiquetas.
+    """
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.function = function
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _samples(self):
+        """
+        Lista de (nombre, nombres de etiquetas, valores de etiquetas, valor) de cada serie.
+        """
+        if self.function is None:
+            with self._lock:
+                values = dict(self._values)
+        elif self.labelnames:
+            values = {labels if isinstance(labels, tuple) else (labels,): value
+                      for labels, value in self.function().items()}
+        else:
+            values = {(): self.function()}
+        return [(self.name, self.labelnames, labels, value) for labels, value in values.items()]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {_escape(self.documentation)}', f'# TYPE {self.name} {self.type}']
+        for name, labelnames, labels, value in self._samples():
+            lines.append(f'{name}{_format_labels(labelnames, labels)} {_format_value(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    """
+    Valor que solo aumenta (peticiones, segundos acumulados).
+    """
+
+    type = 'counter'
+
+    def inc(self, labels=(), amount=1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """
+    Valor que sube y baja (peticiones en curso, bytes).
+    """
+
+    type = 'gauge'
+
+    def set(self, labels=(), value=0.0):
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, labels=(), amount=1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, labels=(), amount=1.0):
+        self.inc(labels, -amount)
+
+
+class Histogram(_Metric):
+    """
+    Distribución de observaciones en cubetas acumuladas, con su suma y su conteo.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, labels=(), value=0.0):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0.0]
+            counts = entry[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            entry[1] += value
+
+    def _samples(self):
+        with self._lock:
+            values = [(labels, list(counts), total) for labels, (counts, total) in self._values.items()]
+        samples = []
+        bucket_names = self.labelnames + ('le',)
+        for labels, counts, total in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                samples.append((f'{self.name}_bucket', bucket_names, labels + (_format_value(bound),), cumulative))
+            samples.append((f'{self.name}_sum', self.labelnames, labels, total))
+            samples.append((f'{self.name}_count', self.labelnames, labels, cumulative))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    Conjunto de métricas de un proceso, que render() escribe en el formato de texto de Prometheus.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def _register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=(), function=None):
+        return self._register(Counter(name, documentation, labelnames, function))
+
+    def gauge(self, name, documentation, labelnames=(), function=None):
+        return self._register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """
+        Texto de todas las métricas. Una función de medidor que falla no impide escribir las demás.
+        """
+        lines = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                lines.append(f'# {metric.name}: {_escape(e)}')
+        return '\n'.join(lines) + '\n'
+
+
+def process_resident_bytes():
+    """
+    Memoria residente del proceso en bytes (VmRSS de /proc/self/status), o 0 si no está disponible.
+    """
+    try:
+        with open('/proc/self/status', encoding='ascii') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def register_process_metrics(registry):
+    """
+    Registra el tiempo de CPU, la memoria residente y la hora de inicio del proceso.
+    """
+    start_time = time.time()
+    registry.counter('process_cpu_seconds_total', 'Tiempo de CPU del proceso (usuario y sistema).',
+                     function=time.process_time)
+    registry.gauge('process_resident_memory_bytes', 'Memoria residente del proceso.',
+                   function=process_resident_bytes)
+    registry.gauge('process_start_time_seconds', 'Hora de inicio del proceso (segundos desde epoch).',
+                   function=lambda: start_time)
+    registry.gauge('process_pid', 'PID del proceso (un worker por proceso).', function=os.getpid)
+
+
+class HttpMetrics:
+    """
+    Métricas de las peticiones HTTP por ruta: conteo por estado, latencia, peticiones en curso, tiempo de CPU en el
+    pool de recomendaciones y peticiones lentas perfiladas.
+
+    Args:
+        registry (MetricsRegistry): Registro donde se crean las métricas.
+    """
+
+    def __init__(self, registry):
+        self.requests = registry.counter('api_requests_total', 'Peticiones atendidas por ruta y estado.',
+                                         ('method', 'route', 'status'))
+        self.latency = registry.histogram('api_request_duration_seconds', 'Latencia de las peticiones por ruta.',
+                                          ('method', 'route'))
+        self.in_flight = registry.gauge('api_requests_in_flight', 'Peticiones en curso por ruta.', ('route',))
+        self.cpu = registry.counter('api_request_cpu_seconds_total',
+                                    'Tiempo de CPU de las tareas del pool de recomendaciones por ruta.', ('route',))
+        self.slow = registry.counter('api_slow_requests_total',
+                                     'Peticiones más lentas que el umbral del perfilador, por ruta.', ('route',))
+
+    def add_cpu_time(self, seconds):
+        """
+        Suma segundos de CPU a la ruta de la petición en curso (se llama desde el pool, con su contexto).
+        """
+        self.cpu.inc((current_route.get() or OTHER_ROUTE,), seconds)
+
+
+def route_of(routes, scope):
+    """
+    Plantilla de la ruta que atiende la petición, o OTHER_ROUTE si ninguna coincide.
+    """
+    partial = None
+    for route in routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or OTHER_ROUTE
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que registra las métricas de cada petición HTTP.
+
+    Args:
+        app: Aplicación ASGI interna.
+        metrics (HttpMetrics): Métricas a actualizar.
+        routes (list): Rutas de la aplicación, para obtener la plantilla de cada petición.
+        profiler (SlowRequestProfiler, opcional): Perfilador de las peticiones lentas.
+    """
+
+    def __init__(self, app, metrics, routes, profiler=None):
+        self.app = app
+        self.metrics = metrics
+        self.routes = routes
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        route = route_of(self.routes, scope)
+        method = scope['method']
+        status = [500]
+
+        async def send_with_status(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        metrics = self.metrics
+        token = current_route.set(route)
+        metrics.in_flight.inc((route,))
+        sample = self.profiler.begin() if self.profiler is not None else None
+        inicio = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            segundos = time.perf_counter() - inicio
+            metrics.in_flight.dec((route,))
+            metrics.requests.inc((method, route, str(status[0])))
+            metrics.latency.observe((method, route), segundos)
+            if sample is not None and self.profiler.end(sample, method, route, segundos):
+                metrics.slow.inc((route,))
+            current_route.reset(token)
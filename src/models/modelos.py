@@ -1,11 +1,14 @@
 # Importar las librerías a usar
+import numpy as np
 import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from sklearn.preprocessing import MinMaxScaler
+from scipy import sparse
+
+from neighbors import similar_items, similar_users_batch, top_k_rows
+from timing import phase
+from user_items import gather_rows
 
 # Función para recomendación ítem-ítem
-def recomendacion_juego(item_id, df, cosine_sim):
+def recomendacion_juego(item_id, df, item_neighbors, num_recommendations=5, item_similarity=None):
     """
     Genera una lista de juegos recomendados similares a un juego específico.
 
@@ -15,90 +18,309 @@ def recomendacion_juego(item_id, df, cosine_sim):
 
     Args:
         item_id (int): El ID del juego para el cual se harán las recomendaciones.
-        df (pd.DataFrame): El DataFrame que contiene los datos de los juegos, incluyendo 'item_id', 'genres', y 'developer'.
-        cosine_sim (numpy.ndarray): Matriz de similitud del coseno precalculada para los juegos.
+        df (pd.DataFrame): El DataFrame con un registro por juego, alineado con las filas del índice de vecinos.
+        item_neighbors (ItemNeighbors): Índice precalculado con los vecinos más similares de cada juego.
+        num_recommendations (int, opcional): Número de recomendaciones a generar. Por defecto es 5.
+        item_similarity (ItemSimilarity, opcional): Matrices TF-IDF del modelo (model.item_similarity), para pedir
+            más recomendaciones de los vecinos que guarda el índice (ver recomendacion_juego_batch).
 
     Returns:
         list of dict: Una lista de diccionarios, donde cada diccionario contiene 'item_id' y 'app_name' 
                       de los juegos recomendados. Devuelve una lista vacía si el juego no se encuentra en el dataset.
     
     Ejemplo:
-        recomendaciones = recomendacion_juego(123, df, cosine_sim)
+        recomendaciones = recomendacion_juego(123, df_item, item_neighbors)
         # Esto podría devolver juegos similares al juego con ID 123.
     """
-    
-    # Si el juego no está en el DataFrame, devuelve un mensaje de error.
-    if item_id not in df['item_id'].values:
-        return "El juego con el ID proporcionado no se encuentra en el dataset."
-    
-    # Busca el índice del juego en el DataFrame usando el ID proporcionado.
-    idx = df.index[df['item_id'] == item_id].tolist()[0]
-    
-    # Crea una lista de pares (índice, puntuación de similitud) para todos los juegos, 
-    # basándose en la fila correspondiente al juego en la matriz de similitud.
-    sim_scores = list(enumerate(cosine_sim[idx]))
-    
-    # Ordena los juegos de acuerdo a su puntuación de similitud, de mayor a menor.
-    sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)
-    
-    # Selecciona los primeros 5 juegos (excluyendo el propio juego que es el más similar a sí mismo).
-    sim_scores = sim_scores[1:6]  # El primero es el propio juego
-    
-    # Extrae los índices de los juegos recomendados de los pares (índice, puntuación).
-    game_indices = [i[0] for i in sim_scores]
-    
-    # Utiliza los índices para obtener los IDs y nombres de los juegos recomendados del DataFrame y los devuelve.
-    recomendaciones = df.iloc[game_indices][['item_id', 'app_name']].to_dict('records')
-    return recomendaciones
+    return recomendacion_juego_batch([item_id], df, item_neighbors, num_recommendations, item_similarity)[0]
+
+# Función para recomendación ítem-ítem de varios juegos a la vez
+def recomendacion_juego_batch(item_ids, df, item_neighbors, num_recommendations=5, item_similarity=None,
+                              chunk_size=256):
+    """
+    Genera las recomendaciones ítem-ítem de varios juegos con una sola lectura del índice de vecinos.
+
+    Como los vecinos de cada juego ya están precalculados a partir de la matriz TF-IDF, las filas de todos los
+    juegos pedidos se toman de una vez del índice, sin volver a calcular similitudes. Si se piden más
+    recomendaciones de las que guarda el índice y se pasa item_similarity, los vecinos se calculan por bloques con
+    selección parcial (similar_items) sobre las matrices ya convertidas del modelo; sus primeras filas coinciden
+    con las del índice.
+
+    Args:
+        item_ids (list of int): IDs de los juegos.
+        df (pd.DataFrame): El DataFrame con un registro por juego, alineado con las filas del índice de vecinos.
+        item_neighbors (ItemNeighbors): Índice precalculado con los vecinos más similares de cada juego.
+        num_recommendations (int, opcional): Número de recomendaciones por juego. Por defecto es 5.
+        item_similarity (ItemSimilarity, opcional): Matrices TF-IDF del modelo (model.item_similarity), alineadas con
+            las filas del índice de vecinos. Sin ellas, las recomendaciones se limitan a los vecinos guardados.
+        chunk_size (int, opcional): Juegos por bloque al calcular los vecinos desde item_similarity. Por defecto es 256.
+
+    Returns:
+        list: Un elemento por cada ID, en el mismo orden: la lista de recomendaciones del juego (como en
+              recomendacion_juego) o el mensaje de error si el juego no se encuentra en el dataset.
+    """
+    # Busca las filas de los juegos en el índice de vecinos.
+    idx = item_neighbors.item_index.get_indexer(list(item_ids))
+    found = np.flatnonzero(idx >= 0)
+
+    k = min(num_recommendations, len(df) - 1)
+    if item_similarity is not None and k > item_neighbors.indices.shape[1]:
+        # Más vecinos de los guardados: similitud con todos los juegos y selección parcial, por bloques
+        game_indices = np.empty((len(found), k), dtype=np.int64)
+        for start in range(0, len(found), chunk_size):
+            rows = idx[found[start:start + chunk_size]]
+            game_indices[start:start + len(rows)] = similar_items(item_similarity.tfidf, rows, k,
+                                                                  item_similarity.tfidf_transposed)[0]
+    else:
+        # Los vecinos ya están ordenados de mayor a menor similitud y excluyen al propio juego,
+        # por lo que basta con tomar los primeros de cada fila.
+        game_indices = item_neighbors.indices[idx[found], :num_recommendations]
+
+    # IDs y nombres de todos los juegos recomendados, tomados de una vez de las columnas del DataFrame.
+    rec_ids = df['item_id'].to_numpy()[game_indices].tolist()
+    rec_names = df['app_name'].to_numpy()[game_indices].tolist()
+
+    resultados = ["El juego con el ID proporcionado no se encuentra en el dataset."] * len(idx)
+    for row, position in enumerate(found):
+        resultados[position] = [{'item_id': int(i), 'app_name': name} for i, name in zip(rec_ids[row], rec_names[row])]
+    return resultados
 
 # Función para recomendación usuario-item
-def recomendacion_usuario(user_id, df, user_similarity_df, num_recommendations=5):
+def recomendacion_usuario(user_id, user_items, user_neighbors, num_recommendations=5, n_vecinos=50, mode=None,
+                          scoring='first'):
     """
     Genera recomendaciones de juegos para un usuario específico basándose en usuarios similares.
 
     Esta función busca usuarios con patrones de juego similares al usuario dado y recomienda juegos que 
-    estos usuarios similares han jugado, pero que el usuario en cuestión aún no ha probado. Utiliza la 
-    matriz de similitud del coseno entre usuarios para determinar qué usuarios son similares.
+    estos usuarios similares han jugado, pero que el usuario en cuestión aún no ha probado. Los usuarios similares
+    se calculan bajo demanda con la similitud del coseno entre los perfiles de géneros de los usuarios, y sus juegos
+    se obtienen del índice CSR usuario -> juegos.
+
+    Hay dos formas de puntuar los juegos candidatos:
+    - 'first': toma los primeros juegos no jugados en el orden de los usuarios más similares.
+    - 'weighted': suma, para cada juego, la similitud de cada vecino que lo jugó ponderada por log(1 + horas
+      jugadas por ese vecino), y devuelve los juegos con mayor puntuación.
 
     Args:
         user_id (int): El ID del usuario para el cual se realizará la recomendación.
-        df (pd.DataFrame): El DataFrame que contiene los datos de los juegos y usuarios.
-        user_similarity_df (pd.DataFrame): DataFrame que representa la matriz de similitud del coseno entre usuarios.
+        user_items (UserItems): Índice CSR con los juegos de cada usuario y la tabla de búsqueda de juegos.
+        user_neighbors (UserNeighbors): Motor de similitud entre usuarios con los perfiles de géneros.
         num_recommendations (int, opcional): Número de recomendaciones a generar. Por defecto es 5.
+        n_vecinos (int, opcional): Número de usuarios similares a consultar. Por defecto es 50.
+        mode (str, opcional): Búsqueda 'exact' o 'approx'. Por defecto se usa el modo del motor.
+        scoring (str, opcional): Puntuación de candidatos 'first' o 'weighted'. Por defecto es 'first'.
 
     Returns:
         list of dict: Una lista de diccionarios, donde cada diccionario contiene 'item_id' y 'app_name' 
                       de los juegos recomendados. Devuelve una lista vacía si el usuario no se encuentra en el dataset.
 
     Ejemplo:
-        recomendaciones_usuario = recomendacion_usuario_mod(456, df, user_similarity_df)
+        recomendaciones_usuario = recomendacion_usuario(456, user_items, user_neighbors)
         # Esto podría devolver juegos recomendados para el usuario con ID 456.
     """
-    
-    # Si el usuario no está en el DataFrame, devuelve un mensaje de error.
-    if user_id not in user_similarity_df.index:
-        return "El usuario con el ID proporcionado no se encuentra en el dataset."
+    return recomendacion_usuario_batch([user_id], user_items, user_neighbors, num_recommendations, n_vecinos,
+                                       mode, scoring)[0]
 
-    # Ordena a los usuarios en función de su similitud con el usuario objetivo y selecciona los más similares
-    similar_users = user_similarity_df[user_id].sort_values(ascending=False).index[1:]
-    
-    # Crea un conjunto de IDs de juegos que el usuario objetivo ya ha jugado.
-    user_games = set(df[df['user_id'] == user_id]['item_id'])
-    
-    # Recorre los usuarios similares, recopilando juegos que ellos han jugado pero el usuario objetivo no. 
-    # Detiene el bucle una vez que se alcanza el número deseado de recomendaciones.
-    recommended_games = set()
-    for similar_user in similar_users:
-        similar_user_games = set(df[df['user_id'] == similar_user]['item_id'])
-        new_recommendations = similar_user_games.difference(user_games)
-        
-        # Actualiza el conjunto de juegos recomendados, pero solo hasta alcanzar num_recommendations
-        recommended_games.update(new_recommendations)
-        if len(recommended_games) >= num_recommendations:
-            break
-        
-    # Se asegura que sólo devuelva exactamente el número de juegos recomendados
-    final_recommendations = list(recommended_games)[:num_recommendations]
-    recomendaciones = df[df['item_id'].isin(final_recommendations)].drop_duplicates(subset='item_id')[['item_id', 'app_name']].to_dict('records')
-
-    return recomendaciones
\ No newline at end of file
+# Función para recomendación usuario-item de varios usuarios a la vez
+def recomendacion_usuario_batch(user_ids, user_items, user_neighbors, num_recommendations=5, n_vecinos=50,
+                                mode=None, scoring='first'):
+    """
+    Genera las recomendaciones usuario-ítem de varios usuarios con operaciones sobre todo el lote.
+
+    Los usuarios similares de todo el lote se buscan con una multiplicación de matrices entre sus perfiles y la
+    matriz de perfiles, con selección parcial de los mejores por fila (similar_users_batch). Los juegos de los
+    vecinos se identifican con la clave (usuario del lote, juego), de modo que descartar los ya jugados, quitar
+    duplicados y acumular las puntuaciones se hace una sola vez para todo el lote. El resultado de cada usuario
+    es el mismo que devuelve recomendacion_usuario.
+
+    Args:
+        user_ids (list of str): IDs de los usuarios.
+        user_items (UserItems): Índice CSR con los juegos de cada usuario y la tabla de búsqueda de juegos.
+        user_neighbors (UserNeighbors): Motor de similitud entre usuarios con los perfiles de géneros.
+        num_recommendations (int, opcional): Número de recomendaciones por usuario. Por defecto es 5.
+        n_vecinos (int, opcional): Número de usuarios similares a consultar. Por defecto es 50.
+        mode (str, opcional): Búsqueda 'exact' o 'approx'. Por defecto se usa el modo del motor.
+        scoring (str, opcional): Puntuación de candidatos 'first' o 'weighted'. Por defecto es 'first'.
+
+    Returns:
+        list: Un elemento por cada ID, en el mismo orden: la lista de recomendaciones del usuario (como en
+              recomendacion_usuario) o el mensaje de error si el usuario no se encuentra en el dataset.
+    """
+    if scoring not in ('first', 'weighted'):
+        raise ValueError(f"Puntuación no soportada: {scoring}")
+
+    # Busca las filas de los usuarios en la matriz de perfiles.
+    positions = user_neighbors.user_index.get_indexer(list(user_ids))
+    found = np.flatnonzero(positions >= 0)
+    queries = positions[found]
+
+    # Usuarios más similares a cada usuario del lote, ordenados de mayor a menor similitud
+    with phase('user_cosine'):
+        neighbor_positions, neighbor_scores = similar_users_batch(user_neighbors, queries, k=n_vecinos, mode=mode)
+    n_vecinos = max(neighbor_positions.shape[1], 1)
+    n_items = len(user_items.item_ids)
+
+    # Juegos que cada usuario del lote ya ha jugado, como claves (usuario del lote, juego).
+    own_entries, own_owner = gather_rows(user_items.indptr, queries)
+    seen = own_owner * n_items + user_items.item_codes[own_entries]
+
+    # Juegos de los usuarios similares, usuario por usuario y en orden de similitud, sin los ya jugados.
+    entries, owner = gather_rows(user_items.indptr, neighbor_positions.ravel())
+    keys = (owner // n_vecinos) * n_items + user_items.item_codes[entries]
+    unseen = ~np.isin(keys, seen)
+    keys, entries, owner = keys[unseen], entries[unseen], owner[unseen]
+
+    if scoring == 'first':
+        # Primera aparición de cada juego, conservando el orden de los usuarios similares
+        _, first = np.unique(keys, return_index=True)
+        selected = keys[np.sort(first)]
+    else:
+        # Similitud del vecino ponderada por sus horas jugadas, acumulada por (usuario del lote, juego); cada
+        # usuario del lote queda de mayor a menor puntuación y, en los empates, por código de juego
+        weights = neighbor_scores.ravel()[owner] * np.log1p(user_items.playtime[entries])
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        scores = np.bincount(inverse, weights=weights, minlength=len(unique_keys))
+        selected = unique_keys[np.lexsort((unique_keys, -scores, unique_keys // n_items))]
+
+    # Las primeras num_recommendations de cada usuario del lote
+    query = selected // n_items
+    rank = np.arange(len(selected)) - np.searchsorted(query, query)
+    selected = selected[rank < num_recommendations]
+    query, codes = selected // n_items, selected % n_items
+    bounds = np.searchsorted(query, np.arange(len(queries) + 1))
+
+    rec_ids = user_items.item_ids[codes].tolist()
+    rec_names = user_items.app_names[codes].tolist()
+
+    resultados = ["El usuario con el ID proporcionado no se encuentra en el dataset."] * len(positions)
+    for row, position in enumerate(found):
+        start, stop = bounds[row], bounds[row + 1]
+        resultados[position] = [{'item_id': int(i), 'app_name': name}
+                                for i, name in zip(rec_ids[start:stop], rec_names[start:stop])]
+    return resultados
+
+# Función para recomendación híbrida (contenido + usuarios similares)
+def recomendacion_hibrida(user_id, user_items, user_neighbors, item_tfidf, num_recommendations=5, n_vecinos=50,
+                          alpha=0.5, mode=None):
+    """
+    Genera recomendaciones de juegos para un usuario combinando la similitud de contenido con toda su biblioteca y
+    las preferencias de usuarios similares.
+
+    A diferencia de recomendacion_juego, que parte de un solo juego, la puntuación de contenido considera todos los
+    juegos del usuario ponderados por sus horas jugadas; a diferencia de recomendacion_usuario, puede recomendar
+    juegos que ningún usuario similar ha jugado. Ver recomendacion_hibrida_batch.
+
+    Args:
+        user_id (str): El ID del usuario para el cual se realizará la recomendación.
+        user_items (UserItems): Índice CSR con los juegos de cada usuario y la tabla de búsqueda de juegos.
+        user_neighbors (UserNeighbors): Motor de similitud entre usuarios con los perfiles de géneros.
+        item_tfidf (scipy.sparse.csr_matrix): Vectores TF-IDF de los juegos, alineados con los códigos de juego.
+        num_recommendations (int, opcional): Número de recomendaciones a generar. Por defecto es 5.
+        n_vecinos (int, opcional): Número de usuarios similares a consultar. Por defecto es 50.
+        alpha (float, opcional): Peso de la puntuación de contenido (1 - alpha para la de usuarios similares).
+            Por defecto es 0.5.
+        mode (str, opcional): Búsqueda 'exact' o 'approx'. Por defecto se usa el modo del motor.
+
+    Returns:
+        list of dict: Una lista de diccionarios con 'item_id' y 'app_name' de los juegos recomendados, o el mensaje
+                      de error si el usuario no se encuentra en el dataset.
+    """
+    return recomendacion_hibrida_batch([user_id], user_items, user_neighbors, item_tfidf, num_recommendations,
+                                       n_vecinos, alpha, mode)[0]
+
+def _playtime_matrix(user_items, rows):
+    """
+    Matriz dispersa (len(rows) x juegos) con log(1 + horas jugadas) de los juegos de cada fila del índice CSR.
+    Devuelve también las posiciones de sus elementos en el índice y la fila de cada uno (como gather_rows).
+    """
+    entries, owner = gather_rows(user_items.indptr, rows)
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(user_items.indptr[rows + 1] - user_items.indptr[rows], out=indptr[1:])
+    matrix = sparse.csr_matrix((np.log1p(user_items.playtime[entries]), user_items.item_codes[entries], indptr),
+                               shape=(len(rows), len(user_items.item_ids)))
+    return matrix, entries, owner
+
+def _scale_rows(scores):
+    """
+    Divide cada fila por su máximo (las filas sin puntuaciones positivas quedan igual).
+    """
+    maxima = scores.max(axis=1, keepdims=True)
+    return np.divide(scores, maxima, out=scores, where=maxima > 0)
+
+# Función para recomendación híbrida de varios usuarios a la vez
+def recomendacion_hibrida_batch(user_ids, user_items, user_neighbors, item_tfidf, num_recommendations=5,
+                                n_vecinos=50, alpha=0.5, mode=None, chunk_size=256):
+    """
+    Genera las recomendaciones híbridas de varios usuarios puntuando todos los juegos candidatos con productos
+    de matrices dispersas.
+
+    Para cada bloque de chunk_size usuarios:
+    - Contenido: P @ T @ T.T, con P la matriz dispersa usuarios x juegos de log(1 + horas jugadas) y T los vectores
+      TF-IDF (normalizados), es decir, la suma de la similitud del coseno de cada juego con todos los juegos del
+      usuario ponderada por sus horas, sin materializar la matriz de similitud juegos x juegos.
+    - Colaborativa: la suma de log(1 + horas jugadas) de cada juego por los n_vecinos usuarios más similares,
+      ponderada por su similitud (como scoring='weighted' de recomendacion_usuario), también como un producto
+      disperso entre la matriz de similitudes del bloque y la matriz de juegos de los vecinos.
+
+    Cada puntuación se divide por su máximo en la fila y se combinan como alpha * contenido + (1 - alpha) *
+    colaborativa. Los juegos ya jugados se descartan y los mejores se eligen con selección parcial (top_k_rows);
+    los empates se resuelven por código de juego y los juegos sin puntuación no se recomiendan.
+
+    Args:
+        user_ids (list of str): IDs de los usuarios.
+        user_items (UserItems): Índice CSR con los juegos de cada usuario y la tabla de búsqueda de juegos.
+        user_neighbors (UserNeighbors): Motor de similitud entre usuarios con los perfiles de géneros.
+        item_tfidf (scipy.sparse.csr_matrix): Vectores TF-IDF de los juegos, alineados con los códigos de juego.
+        num_recommendations (int, opcional): Número de recomendaciones por usuario. Por defecto es 5.
+        n_vecinos (int, opcional): Número de usuarios similares a consultar. Por defecto es 50.
+        alpha (float, opcional): Peso de la puntuación de contenido, entre 0 y 1. Por defecto es 0.5.
+        mode (str, opcional): Búsqueda 'exact' o 'approx'. Por defecto se usa el modo del motor.
+        chunk_size (int, opcional): Usuarios por bloque; la memoria temporal es chunk_size x juegos. Por defecto es 256.
+
+    Returns:
+        list: Un elemento por cada ID, en el mismo orden: la lista de recomendaciones del usuario o el mensaje de
+              error si el usuario no se encuentra en el dataset.
+    """
+    if not 0 <= alpha <= 1:
+        raise ValueError(f"alpha debe estar entre 0 y 1: {alpha}")
+
+    positions = user_neighbors.user_index.get_indexer(list(user_ids))
+    found = np.flatnonzero(positions >= 0)
+    k = min(num_recommendations, len(user_items.item_ids))
+
+    resultados = ["El usuario con el ID proporcionado no se encuentra en el dataset."] * len(positions)
+    if k <= 0:
+        for position in found:
+            resultados[position] = []
+        return resultados
+
+    for start in range(0, len(found), chunk_size):
+        rows = found[start:start + chunk_size]
+        queries = positions[rows]
+
+        # Contenido: biblioteca de cada usuario por la similitud entre juegos, (P @ T) @ T.T
+        own, own_entries, own_rows = _playtime_matrix(user_items, queries)
+        content = _scale_rows(((own @ item_tfidf) @ item_tfidf.T).toarray())
+
+        # Colaborativa: similitud de cada vecino por sus horas jugadas, sumada por usuario del bloque
+        with phase('user_cosine'):
+            neighbor_positions, neighbor_scores = similar_users_batch(user_neighbors, queries, k=n_vecinos,
+                                                                      mode=mode)
+        weights = sparse.csr_matrix((neighbor_scores.ravel(), np.arange(neighbor_scores.size),
+                                     np.arange(len(queries) + 1) * neighbor_positions.shape[1]),
+                                    shape=(len(queries), neighbor_scores.size))
+        theirs = _playtime_matrix(user_items, neighbor_positions.ravel())[0]
+        collaborative = _scale_rows((weights @ theirs).toarray())
+
+        # Mezcla, descarte de los juegos ya jugados (también los de 0 horas) y selección parcial de los mejores
+        scores = alpha * content + (1 - alpha) * collaborative
+        scores[own_rows, user_items.item_codes[own_entries]] = -np.inf
+        columns, top_scores = top_k_rows(scores, k)
+
+        rec_ids = user_items.item_ids[columns].tolist()
+        rec_names = user_items.app_names[columns].tolist()
+        for row, position in enumerate(rows):
+            keep = top_scores[row] > 0
+            resultados[position] = [{'item_id': int(i), 'app_name': name}
+                                    for i, name, ok in zip(rec_ids[row], rec_names[row], keep) if ok]
+    return resultados
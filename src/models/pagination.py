@@ -0,0 +1,65 @@
+"""
+Paginación por cursor de las listas ordenadas de la API (recomendaciones y rankings).
+
+Una página son 'limit' elementos a partir de una posición. La respuesta incluye el cursor de la página siguiente
+(o None en la última), que el cliente envía tal cual para continuar. El cursor es opaco: codifica en base64 (para
+URL) la posición y una huella de la versión de los datos y del modelo, de modo que un cursor emitido antes de una
+recarga se rechaza en lugar de devolver una página de otra ordenación.
+"""
+
+# Importamos las librerías a usar
+import base64
+import hashlib
+import json
+
+
+def version_tag(version):
+    """
+    Huella corta de una versión (cualquier valor con repr estable, por ejemplo la tupla de versiones de la caché).
+    """
+    return hashlib.sha1(repr(version).encode('utf-8')).hexdigest()[:12]
+
+
+def encode_cursor(offset, version):
+    """
+    Cursor de la página que empieza en 'offset' para la versión de los datos 'version'.
+    """
+    payload = json.dumps({'o': int(offset), 'v': version_tag(version)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Posición y huella de versión de un cursor.
+
+    Returns:
+        tuple: (offset, huella de versión); (0, None) si no hay cursor.
+
+    Raises:
+        ValueError: Si el cursor no es válido.
+    """
+    if not cursor:
+        return 0, None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        offset, tag = int(payload['o']), str(payload['v'])
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Cursor inválido") from None
+    if offset < 0:
+        raise ValueError("Cursor inválido")
+    return offset, tag
+
+
+def next_cursor(offset, limit, total, version):
+    """
+    Cursor de la página siguiente a la que empieza en 'offset', o None si era la última.
+
+    Args:
+        offset (int): Posición de la página actual.
+        limit (int): Tamaño de la página.
+        total (int): Elementos de la lista. Para las listas que se calculan solo hasta la página pedida basta con
+            calcular un elemento más (offset + limit + 1) para saber si hay otra página.
+        version: Versión de los datos de la lista.
+    """
+    stop = offset + limit
+    return encode_cursor(stop, version) if stop < total else None
@@ -0,0 +1,139 @@
+"""
+Perfilador por muestreo de las peticiones lentas.
+
+Mientras hay peticiones en curso, un hilo toma cada 'interval' segundos la pila de todos los hilos del proceso
+(sys._current_frames) y la guarda con su hora en un búfer circular; los hilos inactivos (esperando en una cola, un
+lock o el selector del bucle de eventos) se descartan. Cuando una petición termina y tardó más que 'threshold', se
+escriben en un archivo las pilas muestreadas durante esa petición, agrupadas en el formato "folded" (una pila por
+línea, de la raíz a la hoja separada por ';', seguida del número de muestras) que lee flamegraph.pl.
+
+Las muestras son de todo el proceso: si hay otras peticiones concurrentes, sus pilas aparecen también en el perfil
+(cada línea empieza con el nombre del hilo, por ejemplo 'cpu_0' para el pool de recomendaciones). El muestreo solo
+corre mientras hay peticiones en curso, y su costo es el de recorrer las pilas de los hilos en cada intervalo.
+"""
+
+# Importamos las librerías a usar
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+# Archivos y funciones en los que la hoja de la pila indica un hilo inactivo (el pool espera las tareas en una
+# SimpleQueue de C, por lo que su hoja es _worker)
+IDLE_FILES = {'threading.py', 'queue.py', 'selectors.py'}
+IDLE_FRAMES = {('thread.py', '_worker')}
+
+
+def _folded_stack(frame):
+    """
+    Pila de un frame como 'archivo:función' de la raíz a la hoja, o None si el hilo está inactivo.
+    """
+    leaf = os.path.basename(frame.f_code.co_filename)
+    if leaf in IDLE_FILES or (leaf, frame.f_code.co_name) in IDLE_FRAMES:
+        return None
+    names = []
+    while frame is not None:
+        names.append(f'{os.path.basename(frame.f_code.co_filename)}:{frame.f_code.co_name}')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class SlowRequestProfiler:
+    """
+    Muestrea las pilas de los hilos mientras hay peticiones en curso y escribe el perfil de las peticiones lentas.
+
+    Args:
+        threshold (float): Duración en segundos a partir de la cual se escribe el perfil de una petición.
+        interval (float, opcional): Segundos entre muestras. Por defecto es 0.01.
+        output_dir (str, opcional): Directorio de los perfiles. Por defecto es './reports/profiles'.
+        keep (int, opcional): Número de perfiles que se conservan; los más antiguos se eliminan. Por defecto es 100.
+        max_samples (int, opcional): Tamaño del búfer de muestras. Por defecto es 100000.
+    """
+
+    def __init__(self, threshold, interval=0.01, output_dir='./reports/profiles', keep=100, max_samples=100000):
+        self.threshold = threshold
+        self.interval = interval
+        self.output_dir = output_dir
+        self.keep = keep
+        self._samples = deque(maxlen=max_samples)
+        self._pending = deque()
+        self._written = deque()
+        self._active = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        self.profiles = 0
+
+    def start(self):
+        """
+        Inicia el hilo de muestreo.
+        """
+        if self._thread is None:
+            os.makedirs(self.output_dir, exist_ok=True)
+            self._thread = threading.Thread(target=self._run, name='profiler', daemon=True)
+            self._thread.start()
+        return self
+
+    def begin(self):
+        """
+        Registra el inicio de una petición. Devuelve la hora de inicio, que se pasa a end().
+        """
+        with self._lock:
+            self._active += 1
+        return time.perf_counter()
+
+    def end(self, start, method, route, seconds):
+        """
+        Registra el fin de una petición; si tardó más que el umbral, programa la escritura de su perfil.
+
+        Returns:
+            bool: True si la petición fue lenta.
+        """
+        with self._lock:
+            self._active -= 1
+        if seconds < self.threshold:
+            return False
+        self._pending.append((start, time.perf_counter(), method, route, seconds))
+        return True
+
+    def _run(self):
+        own = threading.get_ident()
+        while True:
+            time.sleep(self.interval)
+            if self._active:
+                now = time.perf_counter()
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    stack = _folded_stack(frame)
+                    if stack is not None:
+                        self._samples.append((now, f'{names.get(ident, ident)};{stack}'))
+            while self._pending:
+                self._write(*self._pending.popleft())
+
+    def _write(self, start, stop, method, route, seconds):
+        stacks = Counter(stack for when, stack in list(self._samples) if start <= when <= stop)
+        name = re.sub(r'[^0-9A-Za-z]+', '_', route).strip('_') or 'raiz'
+        path = os.path.join(self.output_dir,
+                            f"{time.strftime('%Y%m%dT%H%M%S')}-{seconds * 1000:.0f}ms-{name}-{self.profiles}.txt")
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(f'# {method} {route} {seconds * 1000:.1f} ms, {sum(stacks.values())} muestras '
+                       f'cada {self.interval * 1000:g} ms\n')
+            for stack, count in stacks.most_common():
+                file.write(f'{stack} {count}\n')
+        self.profiles += 1
+        self._written.append(path)
+        while len(self._written) > self.keep:
+            try:
+                os.remove(self._written.popleft())
+            except OSError:
+                pass
+
+    def stats(self):
+        """
+        Umbral, intervalo, directorio y número de perfiles escritos.
+        """
+        return {'umbral_ms': self.threshold * 1000, 'intervalo_ms': self.interval * 1000,
+                'directorio': self.output_dir, 'perfiles': self.profiles}
@@ -0,0 +1,131 @@
+"""
+Registro del modelo activo de la API, con recarga en segundo plano y cambio atómico de versión.
+
+El modelo activo es una sola referencia a un Model inmutable. Cada petición toma esa referencia una vez al
+comenzar y la usa hasta terminar, por lo que cuando se carga una versión nueva las peticiones en curso terminan
+con la versión anterior y las siguientes usan la nueva. La carga de la versión nueva se hace en un hilo aparte y
+el cambio es una única asignación.
+
+Cuando la API corre con varios workers, cada proceso tiene su propio registro; watch_latest() hace que cada worker
+cargue por sí mismo la versión que se marque en LATEST, de modo que todos terminan sirviendo (y compartiendo
+mapeados en memoria) los mismos arreglos.
+"""
+
+# Importamos las librerías a usar
+import os
+import threading
+import time
+
+from artifacts import latest_version, load_model
+from timing import phase
+
+
+class ModelRegistry:
+    """
+    Mantiene el modelo activo y permite reemplazarlo por otra versión sin detener la API.
+
+    Args:
+        models_dir (str): Directorio raíz de los artefactos versionados.
+        mode (str, opcional): Modo de búsqueda de usuarios similares con el que se cargan los modelos.
+        on_load (callable, opcional): Se llama con cada modelo cargado justo antes de activarlo (por ejemplo, para
+            recargar datos que dependen del mismo dataset).
+    """
+
+    def __init__(self, models_dir, mode=None, on_load=None):
+        self.models_dir = models_dir
+        self.mode = mode
+        self.on_load = on_load
+        self._model = None
+        self._lock = threading.Lock()
+        self._reloading = None
+        self.last_error = None
+
+    @property
+    def model(self):
+        """
+        Modelo activo. Las peticiones deben leerlo una sola vez y usar esa referencia hasta terminar.
+        """
+        return self._model
+
+    @property
+    def version(self):
+        return self._model.version if self._model is not None else None
+
+    def load(self, version=None):
+        """
+        Carga una versión (por defecto la más reciente) y la activa. Devuelve la versión activada.
+        """
+        with phase('load_model'):
+            model = load_model(self.models_dir, version, mode=self.mode)
+        if self.on_load is not None:
+            self.on_load(model)
+        self._model = model
+        return model.version
+
+    def load_or_build(self, build):
+        """
+        Carga la versión más reciente; si no hay ninguna, la construye con build() (que debe guardarla) y la carga.
+        """
+        if latest_version(self.models_dir) is None:
+            build()
+        return self.load()
+
+    def reload_in_background(self, version=None):
+        """
+        Inicia la carga de una versión en un hilo aparte y la activa al terminar.
+
+        Args:
+            version (str, opcional): Versión a cargar. Por defecto la más reciente.
+
+        Returns:
+            str o None: Versión que se está cargando, o None si ya había una recarga en curso.
+        """
+        version = version or latest_version(self.models_dir)
+        if version is None or not os.path.exists(os.path.join(self.models_dir, version, 'manifest.json')):
+            raise FileNotFoundError(f"La versión {version} no existe en {self.models_dir}")
+
+        with self._lock:
+            if self._reloading is not None:
+                return None
+            self._reloading = version
+
+        def run():
+            try:
+                self.load(version)
+                self.last_error = None
+            except Exception as e:
+                self.last_error = f"{version}: {e}"
+            finally:
+                with self._lock:
+                    self._reloading = None
+
+        threading.Thread(target=run, name=f'reload-{version}', daemon=True).start()
+        return version
+
+    def watch_latest(self, interval=30):
+        """
+        Inicia un hilo que revisa LATEST cada 'interval' segundos y recarga el modelo cuando cambia.
+        """
+        def run():
+            while True:
+                time.sleep(interval)
+                latest = latest_version(self.models_dir)
+                if latest is not None and latest != self.version:
+                    try:
+                        self.reload_in_background(latest)
+                    except FileNotFoundError as e:
+                        self.last_error = str(e)
+
+        threading.Thread(target=run, name='watch-latest', daemon=True).start()
+
+    def status(self):
+        """
+        Estado del registro: versión activa, versión en carga y último error de recarga.
+        """
+        return {
+            'version': self.version,
+            'pid': os.getpid(),
+            'recargando': self._reloading,
+            'ultimo_error': self.last_error,
+            'latest': latest_version(self.models_dir),
+        }
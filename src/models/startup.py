@@ -0,0 +1,113 @@
+"""
+Arranque de la API en segundo plano, con estado de vida (liveness) y de preparación (readiness).
+
+Cargar los agregados y los modelos (y construirlos si todavía no existen) puede tardar más que el plazo de las
+comprobaciones de salud del orquestador, que reinicia el proceso si el puerto no responde. Startup ejecuta esos
+pasos en orden, en el proceso actual (run) o en un hilo aparte (start), y guarda en qué paso va, si terminó y el
+error si alguno falló. ReadinessMiddleware responde 503 con Retry-After a las peticiones de datos mientras el
+arranque no termina, de modo que el puerto se abre de inmediato y /health/live responde desde el primer momento.
+"""
+
+# Importamos las librerías a usar
+import json
+import threading
+import time
+
+# Rutas que responden aunque los datos no estén listos
+EXEMPT_PATHS = ('/health/', '/metrics', '/docs', '/redoc', '/openapi.json')
+
+
+class Startup:
+    """
+    Ejecuta los pasos del arranque y mantiene su estado.
+
+    Args:
+        steps (list): Pares (nombre, función sin argumentos), en el orden en que se ejecutan.
+        retry_after (int, opcional): Segundos que se sugieren en Retry-After mientras no está listo. Por defecto es 5.
+    """
+
+    def __init__(self, steps, retry_after=5):
+        self.steps = steps
+        self.retry_after = retry_after
+        self.step = None
+        self.error = None
+        self._ready = threading.Event()
+        self._started = time.monotonic()
+        self.seconds = None
+
+    @property
+    def ready(self):
+        return self._ready.is_set()
+
+    def run(self):
+        """
+        Ejecuta los pasos en el proceso actual. Si un paso falla, guarda el error, no ejecuta los siguientes y
+        vuelve a lanzar la excepción.
+        """
+        try:
+            for name, function in self.steps:
+                self.step = name
+                function()
+        except Exception as e:
+            self.error = f"{self.step}: {e!r}"
+            raise
+        self.step = None
+        self.seconds = time.monotonic() - self._started
+        self._ready.set()
+
+    def start(self):
+        """
+        Ejecuta los pasos en un hilo aparte.
+        """
+        threading.Thread(target=self.run, name='startup', daemon=True).start()
+        return self
+
+    def wait(self, timeout=None):
+        """
+        Espera a que el arranque termine. Devuelve True si está listo.
+        """
+        return self._ready.wait(timeout)
+
+    def status(self):
+        """
+        Estado del arranque: listo, paso en curso, error y segundos (transcurridos o totales al terminar).
+        """
+        return {
+            'listo': self.ready,
+            'paso': self.step,
+            'error': self.error,
+            'segundos': self.seconds if self.seconds is not None else time.monotonic() - self._started,
+        }
+
+
+class ReadinessMiddleware:
+    """
+    Middleware ASGI que responde 503 con Retry-After a las peticiones HTTP mientras el arranque no termina.
+
+    Args:
+        app: Aplicación ASGI interna.
+        startup (Startup): Estado del arranque.
+        exempt (tuple, opcional): Prefijos de las rutas que se atienden siempre (además de '/').
+    """
+
+    def __init__(self, app, startup, exempt=EXEMPT_PATHS):
+        self.app = app
+        self.startup = startup
+        self.exempt = exempt
+
+    async def __call__(self, scope, receive, send):
+        startup = self.startup
+        if scope['type'] != 'http' or startup.ready or scope['path'] == '/' or scope['path'].startswith(self.exempt):
+            await self.app(scope, receive, send)
+            return
+
+        if startup.error is not None:
+            detail = f"El arranque de la API falló ({startup.error})"
+        else:
+            detail = f"La API se está iniciando (paso: {startup.step}), intente de nuevo"
+        body = json.dumps({'detail': detail}, ensure_ascii=False).encode('utf-8')
+        await send({'type': 'http.response.start', 'status': 503,
+                    'headers': [(b'content-type', b'application/json'),
+                                (b'content-length', str(len(body)).encode()),
+                                (b'retry-after', str(startup.retry_after).encode())]})
+        await send({'type': 'http.response.body', 'body': body})
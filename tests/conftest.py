@@ -0,0 +1,101 @@
+"""
+Fixtures de las pruebas: una copia del dataset con sus modelos ya construidos y la API iniciada con serve.py.
+
+Los artefactos (columnar, agregados y modelos) se escriben en un directorio temporal, no junto al dataset del
+repositorio. Las pruebas se ejecutan desde la raíz del repositorio: python -m pytest -q
+"""
+
+import http.client
+import json
+import os
+import shutil
+import socket
+import subprocess
+import sys
+from contextlib import contextmanager
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Añadir el directorio de los módulos a sys.path
+for directory in ('src/data', 'src/models', 'src/features', 'benchmarks', ''):
+    sys.path.append(os.path.join(ROOT, directory))
+
+from bench_workers import wait_ready
+from serve import prepare
+
+
+@pytest.fixture(scope='session')
+def artifacts(tmp_path_factory):
+    """
+    Ruta de la copia del dataset, directorio de los modelos y versión servida.
+    """
+    directory = tmp_path_factory.mktemp('api')
+    file_path = str(directory / 'dataset_full.csv')
+    shutil.copy(os.path.join(ROOT, 'src', 'data', 'dataset_full.csv'), file_path)
+    models_dir = str(directory / 'models')
+    return file_path, models_dir, prepare(file_path, models_dir)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def api_server(artifacts):
+    """
+    Inicia la API con serve.py; devuelve un administrador de contexto que entrega el proceso y su puerto.
+    """
+    file_path, models_dir, _ = artifacts
+
+    @contextmanager
+    def start(workers=1, **env):
+        port = free_port()
+        server = subprocess.Popen([sys.executable, 'serve.py', '--workers', str(workers), '--host', '127.0.0.1',
+                                   '--port', str(port), '--file-path', file_path, '--models-dir', models_dir,
+                                   '--vigilar', '0'],
+                                  cwd=ROOT, env=dict(os.environ, **env), stdout=subprocess.DEVNULL,
+                                  stderr=subprocess.DEVNULL)
+        try:
+            wait_ready(port, 300)
+            yield server, port
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+
+    return start
+
+
+def request(port, method, path, body=None):
+    """
+    Petición a la API; devuelve el código de estado y el JSON de la respuesta.
+    """
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        if body is None:
+            connection.request(method, path)
+        else:
+            connection.request(method, path, json.dumps(body), {'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+    finally:
+        connection.close()
+
+
+@pytest.fixture
+def http_get():
+    """
+    Función get(port, path) que hace una petición GET a la API y devuelve el código de estado y el JSON.
+    """
+    return lambda port, path: request(port, 'GET', path)
+
+
+@pytest.fixture
+def http_post():
+    """
+    Función post(port, path, body) que envía body como JSON a la API y devuelve el código de estado y el JSON.
+    """
+    return lambda port, path, body: request(port, 'POST', path, body)
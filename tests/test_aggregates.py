@@ -0,0 +1,94 @@
+"""
+Los agregados calculados sobre las tablas normalizadas son los mismos que sobre el DataFrame, incluidos los
+empates, y el dataset vuelve al DataFrame cuando la ingesta deja filas que no se pueden normalizar.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from aggregates import build_aggregates
+from columnar import append_rows, load_dataset
+from normalized import NormalizedDataset, load_normalized, load_tables
+
+COLUMNS = ['user_id', 'item_id', 'sentiment', 'items_count', 'playtime_forever', 'genres', 'app_name', 'price',
+           'developer', 'release_year']
+
+# item_id -> (géneros, app_name, precio, desarrollador, año)
+ITEMS = {
+    10: (['Action', 'Indie'], 'Alpha', 9.99, 'Dev A', 2010.0),
+    20: (['Action'], 'Beta', 0.0, 'Dev B', 2010.0),
+    30: (['Indie', 'RPG'], 'Gamma', 4.99, 'Dev A', 2012.0),
+    40: (['RPG'], 'Delta', 19.99, 'Dev C', None),
+}
+
+# (user_id, item_id, sentiment, playtime): u1 y u2 empatan en horas de Action, Alpha y Beta en filas con reseñas
+# positivas de 2010 y Dev A y Dev B en filas con reseñas negativas de 2010 (una fila por género)
+REVIEWS = [
+    ('u1', 10, 2, 100.0), ('u1', 30, 0, 5.0),
+    ('u2', 20, 1, 60.0), ('u2', 10, 0, 40.0),
+    ('u3', 20, 2, 0.0), ('u3', 40, 1, 7.0),
+    ('u4', 20, 0, 3.0), ('u4', 30, 2, 12.5),
+    ('u5', 20, 0, 1.0),
+]
+
+
+def write_dataset(path):
+    counts = pd.Series([user for user, *_ in REVIEWS]).value_counts()
+    rows = []
+    for user, item, sentiment, playtime in REVIEWS:
+        genres, app_name, price, developer, year = ITEMS[item]
+        rows += [(user, item, sentiment, counts[user], playtime, genre, app_name, price, developer, year)
+                 for genre in genres]
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, index=False)
+
+
+def assert_same(left, right):
+    if isinstance(left, dict):
+        assert list(left) == list(right)
+        for key in left:
+            assert_same(left[key], right[key])
+    elif isinstance(left, tuple):
+        assert len(left) == len(right)
+        for left_values, right_values in zip(left, right):
+            np.testing.assert_array_equal(left_values, right_values)
+    else:
+        assert left == right
+
+
+def test_normalized_aggregates_match_dataframe(tmp_path):
+    path = str(tmp_path / 'dataset.csv')
+    write_dataset(path)
+
+    tables = load_normalized(path)
+    assert isinstance(tables, NormalizedDataset)
+    cubes = build_aggregates(tables)
+    assert_same(cubes, build_aggregates(load_dataset(path)))
+
+    # Los empates se resuelven en el mismo orden que value_counts sobre el DataFrame
+    users, hours = cubes['genre_user_playtime']['Action']
+    assert list(users[:2]) == ['u1', 'u2'] and list(hours[:2]) == [100.0, 100.0]
+    apps, counts = cubes['year_app_positive'][2010]
+    assert sorted(apps[:2]) == ['Alpha', 'Beta'] and list(counts[:2]) == [2, 2]
+    developers, counts = cubes['year_developer_negative'][2010]
+    assert sorted(developers) == ['Dev A', 'Dev B'] and list(counts) == [2, 2]
+    assert 2012 in cubes['genre_year_playtime']['RPG'] and len(cubes['genre_year_playtime']['RPG']) == 1
+
+
+def test_append_rows_falls_back_to_dataframe(tmp_path):
+    path = str(tmp_path / 'dataset.csv')
+    write_dataset(path)
+    assert isinstance(load_normalized(path), NormalizedDataset)
+
+    # Una nueva fila de un par (usuario, juego) que ya existía queda separada de las demás filas del par
+    genres, app_name, price, developer, year = ITEMS[10]
+    append_rows(path, pd.DataFrame([('u1', 10, 1, 2, 50.0, genres[0], app_name, price, developer, year)],
+                                   columns=COLUMNS))
+
+    with pytest.raises(ValueError):
+        load_tables(path)
+    dataset = load_normalized(path)
+    assert isinstance(dataset, pd.DataFrame) and len(dataset) == 14
+    cubes = build_aggregates(dataset)
+    users, hours = cubes['genre_user_playtime']['Action']
+    assert list(users[:2]) == ['u1', 'u2'] and list(hours[:2]) == [150.0, 100.0]
@@ -0,0 +1,42 @@
+"""
+ResponseCache: invalidación por versión de los datos y del modelo.
+"""
+
+from cache import MISS, ResponseCache
+
+
+def test_reload_invalidates_entries():
+    cache = ResponseCache(1 << 20)
+    old, new = ('datos-1', 'modelo-1'), ('datos-1', 'modelo-2')
+    cache.check_version(old)
+    cache.put((old, 'item', 10), {'recomendaciones': [1]}, old)
+    assert cache.get((old, 'item', 10)) == {'recomendaciones': [1]}
+
+    cache.check_version(new)
+    assert cache.get((old, 'item', 10)) is MISS
+    assert cache.stats()['entradas'] == 0 and cache.invalidations == 1
+
+
+def test_late_put_after_reload_is_not_stored():
+    cache = ResponseCache(1 << 20)
+    old, new = ('datos-1', 'modelo-1'), ('datos-1', 'modelo-2')
+
+    # Una petición busca con la versión anterior y calcula su respuesta mientras se recarga el modelo
+    cache.check_version(old)
+    assert cache.get((old, 'item', 10)) is MISS
+    cache.check_version(new)
+    assert cache.put((old, 'item', 10), {'recomendaciones': [1]}, old) == {'recomendaciones': [1]}
+
+    assert cache.get((old, 'item', 10)) is MISS
+    assert cache.get((new, 'item', 10)) is MISS
+    assert cache.stats()['entradas'] == 0 and cache.size == 0
+
+    cache.put((new, 'item', 10), {'recomendaciones': [2]}, new)
+    assert cache.get((new, 'item', 10)) == {'recomendaciones': [2]}
+
+
+def test_serialized_cache_returns_bytes_even_when_put_is_dropped():
+    cache = ResponseCache(1 << 20, serialize=lambda value: repr(value).encode())
+    cache.check_version('v2')
+    assert cache.put(('v1', 'x'), [1], 'v1') == b'[1]'
+    assert cache.size == 0
@@ -0,0 +1,21 @@
+"""
+Con el pool de CPU y su cola llenos, la API rechaza las recomendaciones con 503 y las consultas siguen
+respondiendo (ver bench_concurrency.py).
+"""
+
+from artifacts import load_model
+from bench_concurrency import requests_mix, run_load
+
+
+def test_overload_is_shed_with_503(artifacts, api_server):
+    _, models_dir, version = artifacts
+    mix = requests_mix(load_model(models_dir, version), 2000)
+    weights = {'consultas': 2, 'item': 1, 'usuario': 1, 'lote': 4}
+
+    with api_server(CPU_WORKERS='1', CPU_QUEUE='1') as (_, port):
+        results = run_load(port, mix, weights, 16, 3)
+
+    statuses = {kind: [status for status, _ in samples] for kind, samples in results.items()}
+    assert all(status in (200, 503) for kind_statuses in statuses.values() for status in kind_statuses)
+    assert 503 in statuses['item'] + statuses['usuario'] + statuses['lote']
+    assert statuses['consultas'] and set(statuses['consultas']) == {200}
@@ -0,0 +1,81 @@
+"""
+Evaluación offline sobre un dataset pequeño con varios juegos por usuario: la partición de split_holdout y
+precision@k y recall@k de un bloque de evaluación, comparados con valores calculados a mano.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from evaluation import evaluate, quality, split_holdout
+from normalized import load_tables
+from preprocessing import build_model
+
+COLUMNS = ['user_id', 'item_id', 'sentiment', 'items_count', 'playtime_forever', 'genres', 'app_name', 'price',
+           'developer', 'release_year']
+
+# item_id -> (géneros, app_name, desarrollador)
+ITEMS = {
+    1: (['Action'], 'Alpha Strike', 'Dev A'),
+    2: (['Action', 'Indie'], 'Beta Blast', 'Dev A'),
+    3: (['Indie'], 'Gamma Garden', 'Dev B'),
+    4: (['RPG'], 'Delta Quest', 'Dev C'),
+    5: (['RPG', 'Indie'], 'Epsilon Saga', 'Dev C'),
+    6: (['Strategy'], 'Zeta Empire', 'Dev D'),
+}
+
+# user_id -> [(item_id, horas)]: 'a' tiene 4 juegos, 'b' 2 y 'c' 1 (no se evalúa)
+LIBRARIES = {
+    'a': [(1, 50.0), (2, 40.0), (3, 30.0), (4, 20.0)],
+    'b': [(5, 10.0), (6, 5.0)],
+    'c': [(1, 1.0)],
+}
+
+
+@pytest.fixture
+def tables(tmp_path):
+    rows = []
+    for user, library in LIBRARIES.items():
+        for item, playtime in library:
+            genres, app_name, developer = ITEMS[item]
+            rows += [(user, item, 2, len(library), playtime, genre, app_name, 9.99, developer, 2015.0)
+                     for genre in genres]
+    path = str(tmp_path / 'dataset.csv')
+    pd.DataFrame(rows, columns=COLUMNS).to_csv(path, index=False)
+    return load_tables(path)
+
+
+def test_split_holdout(tables):
+    holdout = split_holdout(tables, fraction=0.5, min_items=2, seed=3)
+
+    # round(0.5 * 4) = 2 juegos separados de 'a', 1 de 'b'; 'c' queda completo en el entrenamiento
+    assert list(holdout.user_ids) == ['a', 'b']
+    assert holdout.held_indptr.tolist() == [0, 2, 3]
+    held_a, held_b = set(holdout.held_items[:2].tolist()), set(holdout.held_items[2:].tolist())
+    assert held_a < {1, 2, 3, 4} and held_b < {5, 6}
+    assert len(holdout.train.user_items.user_codes) == 7 - 3
+
+    # El juego semilla es el más jugado de los que quedan en el entrenamiento
+    assert holdout.seed_items[0] == max({1, 2, 3, 4} - held_a, key=dict(LIBRARIES['a']).get)
+    assert holdout.seed_items[1] == ({5, 6} - held_b).pop()
+
+
+def test_evaluation_chunk_precision_and_recall(tables):
+    holdout = split_holdout(tables, fraction=0.5, min_items=2, seed=3)
+    model = build_model(holdout.train)
+
+    # Con k = 5 el recomendador 'item' devuelve todos los juegos salvo la semilla, que está en el entrenamiento,
+    # de modo que acierta todos los separados: precision = (2/5 + 1/5) / 2 y recall = 1
+    results = evaluate(model, holdout, ['item'], k=5, chunk_size=1)
+    assert results['item']['precision'] == pytest.approx(0.3)
+    assert results['item']['recall'] == pytest.approx(1.0)
+    assert results['item']['usuarios_con_recomendaciones'] == 1.0
+
+    # Recomendaciones fijas: 'a' acierta 1 de sus 2 juegos separados con k = 2 y 'b' no recibe recomendaciones
+    held_a = holdout.held_items[:2].tolist()
+    missed = ({1, 2, 3, 4, 5, 6} - set(held_a)).pop()
+    metrics = quality([[held_a[0], missed], []], holdout, 2, 6)
+    assert metrics['precision'] == pytest.approx((1 / 2 + 0) / 2)
+    assert metrics['recall'] == pytest.approx((1 / 2 + 0) / 2)
+    assert metrics['cobertura'] == pytest.approx(2 / 6)
+    assert metrics['usuarios_con_recomendaciones'] == 0.5
@@ -0,0 +1,38 @@
+"""
+BoundedExecutor: límite de tareas en espera y liberación de los lugares.
+"""
+
+import asyncio
+import threading
+
+import pytest
+
+from executor import BoundedExecutor, Overloaded
+
+
+def test_rejects_when_pool_and_queue_are_full():
+    async def scenario():
+        executor = BoundedExecutor(max_workers=1, max_queue=1)
+        release = threading.Event()
+        running = [asyncio.ensure_future(executor.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(Overloaded):
+            await executor.run(release.wait)
+        release.set()
+        await asyncio.gather(*running)
+        assert executor.stats()['rechazadas'] == 1
+        assert await executor.run(lambda: 42) == 42
+
+    asyncio.run(scenario())
+
+
+def test_failed_submit_releases_its_slot():
+    async def scenario():
+        executor = BoundedExecutor(max_workers=1, max_queue=0)
+        executor._executor.shutdown()
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                await executor.run(lambda: None)
+        assert executor._pending == 0
+
+    asyncio.run(scenario())
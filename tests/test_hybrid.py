@@ -0,0 +1,68 @@
+"""
+Recomendación híbrida sobre un modelo pequeño construido a mano: los juegos jugados se descartan (también los de
+0 horas) y alpha = 1 y alpha = 0 se reducen a la puntuación de contenido y a la colaborativa.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from modelos import recomendacion_hibrida_batch
+from neighbors import UserNeighbors
+from user_items import UserItems
+
+# Vectores TF-IDF (normalizados) de los juegos 100 a 104: la similitud del coseno del juego 100 con los demás es
+# 0.6, 0, 0 y 0.8
+ITEM_TFIDF = sparse.csr_matrix(np.array([
+    [1.0, 0.0, 0.0],
+    [0.6, 0.8, 0.0],
+    [0.0, 1.0, 0.0],
+    [0.0, 0.0, 1.0],
+    [0.8, 0.0, 0.6],
+], dtype=np.float32))
+
+# u0 jugó 100 (10 horas) y 101 (0 horas); u1 tiene el mismo perfil que u0 y jugó 100, 102 y 103; u2 tiene un
+# perfil ortogonal (similitud 0) y jugó 104
+USER_ITEMS = UserItems(
+    indptr=np.array([0, 2, 5, 6], dtype=np.int64),
+    item_codes=np.array([0, 1, 0, 2, 3, 4], dtype=np.int32),
+    playtime=np.array([10, 0, 5, 20, 1, 100], dtype=np.float32),
+    item_ids=np.array([100, 101, 102, 103, 104], dtype=np.int64),
+    app_names=np.array(['A', 'B', 'C', 'D', 'E'], dtype=object),
+)
+USER_NEIGHBORS = UserNeighbors(pd.Index(['u0', 'u1', 'u2']), pd.Index(['Action', 'RPG']),
+                               np.array([[1, 0], [1, 0], [0, 1]], dtype=np.float32), None, 'exact')
+
+
+def recommend(alpha, user_ids=('u0',)):
+    results = recomendacion_hibrida_batch(list(user_ids), USER_ITEMS, USER_NEIGHBORS, ITEM_TFIDF,
+                                          num_recommendations=5, n_vecinos=2, alpha=alpha)
+    return [[r['item_id'] for r in result] if isinstance(result, list) else result for result in results]
+
+
+@pytest.mark.parametrize('alpha, expected', [
+    # Contenido: 0.8 para 104; 102 y 103 no tienen similitud con 100 y no se recomiendan
+    (1, [104]),
+    # Colaborativa: log(1 + horas) de u1, escalado por el máximo: 102 -> 1, 103 -> log(2) / log(21) = 0.23
+    (0, [102, 103]),
+    # Mezcla: 102 -> 0.5, 104 -> 0.4, 103 -> 0.11
+    (0.5, [102, 104, 103]),
+])
+def test_alpha_extremes_and_mix(alpha, expected):
+    assert recommend(alpha) == [expected]
+
+
+@pytest.mark.parametrize('alpha', [0, 0.5, 1])
+def test_played_items_are_never_recommended(alpha):
+    # 101 tiene similitud 0.6 con 100 pero u0 ya lo jugó (con 0 horas); 100 es el juego más puntuado por u1
+    for user_id, result in zip(['u0', 'u1', 'u2'], recommend(alpha, ['u0', 'u1', 'u2'])):
+        row = USER_NEIGHBORS.user_index.get_loc(user_id)
+        played = USER_ITEMS.item_ids[USER_ITEMS.item_codes[USER_ITEMS.indptr[row]:USER_ITEMS.indptr[row + 1]]]
+        assert not set(result) & set(played.tolist())
+
+
+def test_unknown_user_and_invalid_alpha():
+    assert isinstance(recommend(0.5, ['nadie'])[0], str)
+    with pytest.raises(ValueError):
+        recommend(1.5)
@@ -0,0 +1,22 @@
+"""
+Los vecinos ítem-ítem calculados bajo demanda coinciden con los guardados en el índice del modelo.
+"""
+
+import numpy as np
+
+from artifacts import load_model
+from neighbors import similar_items
+
+
+def test_similar_items_match_stored_neighbors(artifacts):
+    _, models_dir, version = artifacts
+    model = load_model(models_dir, version)
+    stored = model.item_neighbors
+    k = stored.indices.shape[1]
+    assert k == 50
+
+    rows = np.arange(len(model.df_item))
+    indices, scores = similar_items(model.item_similarity.tfidf, rows, 4 * k, model.item_similarity.tfidf_transposed)
+
+    np.testing.assert_array_equal(indices[:, :k], stored.indices)
+    np.testing.assert_array_equal(scores[:, :k], stored.scores)
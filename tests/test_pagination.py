@@ -0,0 +1,73 @@
+"""
+Paginación por cursor de las recomendaciones: recorrido completo, cursores inválidos o de otra versión y límite
+REC_MAX_K.
+"""
+
+import base64
+import json
+from urllib.parse import quote
+
+import pytest
+
+from pagination import decode_cursor, encode_cursor, next_cursor
+
+ITEM = '/recomendacion-item/1250'
+
+
+def moved(cursor, offset):
+    """
+    El mismo cursor (con la misma huella de versión) apuntando a otra posición.
+    """
+    _, tag = decode_cursor(cursor)
+    payload = json.dumps({'o': offset, 'v': tag}).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def test_cursor_round_trip():
+    offset, tag = decode_cursor(encode_cursor(40, ('v1', 'm1')))
+    assert offset == 40 and tag == decode_cursor(encode_cursor(0, ('v1', 'm1')))[1]
+    assert tag != decode_cursor(encode_cursor(40, ('v2', 'm1')))[1]
+    assert decode_cursor(None) == (0, None)
+    assert next_cursor(10, 5, 15, 'v') is None
+    assert decode_cursor(next_cursor(10, 5, 16, 'v'))[0] == 15
+
+
+@pytest.mark.parametrize('cursor', ['x', '%%%', encode_cursor(0, 'v')[:-3], 'eyJvIjogLTF9', 'WzEsMl0', 'e30'])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_recommendation_pages(api_server, http_get):
+    with api_server(REC_MAX_K='30') as (_, port):
+        status, full = http_get(port, f'{ITEM}?k=30')
+        assert status == 200 and len(full['recomendaciones']) == 30 and full['siguiente'] is None
+
+        # Las páginas de 7 recorren la misma lista; la última se recorta en REC_MAX_K y no tiene siguiente
+        pages, cursor, first = [], '', None
+        while True:
+            status, page = http_get(port, f'{ITEM}?k=7&cursor={quote(cursor)}')
+            assert status == 200
+            pages.append(page['recomendaciones'])
+            cursor = page['siguiente']
+            first = first or cursor
+            if cursor is None:
+                break
+        assert [len(page) for page in pages] == [7, 7, 7, 7, 2]
+        assert sum(pages, []) == full['recomendaciones']
+
+        # Un k mayor que REC_MAX_K también se recorta
+        status, clamped = http_get(port, f'{ITEM}?k=100')
+        assert status == 200 and clamped['recomendaciones'] == full['recomendaciones']
+
+        # Un cursor en REC_MAX_K o más allá (solo uno fabricado) responde 400
+        status, _ = http_get(port, f'{ITEM}?k=5&cursor={moved(first, 30)}')
+        assert status == 400
+
+        for cursor in ('x', '%25%25', 'eyJvIjogLTF9', 'WzEsMl0'):
+            status, error = http_get(port, f'{ITEM}?cursor={cursor}')
+            assert status == 400, error
+
+        # Un cursor de otra versión de los datos o del modelo responde 410
+        status, _ = http_get(port, f"{ITEM}?cursor={encode_cursor(7, ('otra', 'version'))}")
+        assert status == 410
@@ -0,0 +1,92 @@
+"""
+Las consultas de QueryIndex dan los mismos grupos que pandas (filtros, agrupación y métricas), incluidos los
+valores nulos y MISSING_YEAR, y la API rechaza con 413 un 'limite' mayor que QUERY_MAX_GROUPS.
+"""
+
+import pandas as pd
+import pytest
+
+from columnar import MISSING_YEAR, load_dataset
+from query_index import QueryIndex
+
+COLUMNS = ['user_id', 'item_id', 'sentiment', 'items_count', 'playtime_forever', 'genres', 'app_name', 'price',
+           'developer', 'release_year']
+
+# Incluye un juego sin desarrollador, uno sin año, un usuario nulo y usuarios repetidos entre grupos
+ROWS = [
+    ('u1', 10, 2, 2, 100.0, 'Action', 'Alpha', 9.99, 'Dev A', 2010.0),
+    ('u1', 10, 2, 2, 100.0, 'Indie', 'Alpha', 9.99, 'Dev A', 2010.0),
+    ('u1', 30, 0, 2, 5.0, 'RPG', 'Gamma', 4.99, 'Dev A', 2012.0),
+    ('u2', 20, 1, 3, 60.0, 'Action', 'Beta', 0.0, 'Dev B', 2010.0),
+    ('u2', 40, 1, 3, 7.0, 'RPG', 'Delta', 19.99, 'Dev C', None),
+    ('u2', 50, 0, 3, 2.5, 'Indie', 'Epsilon', 1.99, None, 2012.0),
+    ('u3', 20, 2, 2, 0.0, 'Action', 'Beta', 0.0, 'Dev B', 2010.0),
+    ('u3', 50, 2, 2, 8.0, 'Indie', 'Epsilon', 1.99, None, 2012.0),
+    (None, 30, 1, 1, 3.0, 'RPG', 'Gamma', 4.99, 'Dev A', 2012.0),
+    ('u4', 40, 0, 1, 12.5, 'RPG', 'Delta', 19.99, 'Dev C', None),
+]
+
+QUERIES = [
+    ({}, [], 'filas'),
+    ({}, ['genres'], 'horas'),
+    ({}, ['developer'], 'usuarios'),
+    ({}, ['release_year', 'sentiment'], 'usuarios'),
+    ({'genres': ['RPG']}, ['release_year'], 'horas'),
+    ({'developer': ['Dev A', 'No existe']}, ['genres'], 'filas'),
+    ({'release_year': {'min': 2010, 'max': 2011}}, ['developer'], 'usuarios'),
+    ({'release_year': [MISSING_YEAR]}, [], 'filas'),
+    ({'price': {'min': 1, 'max': 10}, 'sentiment': [0, 2]}, ['genres', 'developer'], 'horas'),
+    ({'genres': ['Indie'], 'developer': ['Dev A']}, [], 'usuarios'),
+    ({'genres': ['No existe']}, ['genres'], 'filas'),
+]
+
+
+def reference(df, filters, group_by, metric):
+    """
+    Grupos -> métrica calculados con pandas; los nulos no cumplen ningún filtro ni forman grupos.
+    """
+    mask = pd.Series(True, index=df.index)
+    for dimension, condition in filters.items():
+        if isinstance(condition, dict):
+            mask &= df[dimension].between(condition.get('min', -float('inf')), condition.get('max', float('inf')))
+        else:
+            mask &= df[dimension].isin(condition)
+    selected = df[mask].dropna(subset=group_by)
+    if selected.empty:
+        return {}
+    measure = {'filas': 'size', 'horas': 'sum', 'usuarios': 'nunique'}[metric]
+    column = 'user_id' if metric == 'usuarios' else 'playtime_forever'
+    if not group_by:
+        return {(): selected[column].agg(measure)}
+    values = selected.groupby(group_by)[column].agg(measure)
+    return {key if isinstance(key, tuple) else (key,): value for key, value in values.items()}
+
+
+@pytest.fixture(scope='module')
+def datasets(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('consultas') / 'dataset.csv')
+    pd.DataFrame(ROWS, columns=COLUMNS).to_csv(path, index=False)
+    return pd.read_csv(path, dtype={'user_id': str}), QueryIndex(load_dataset(path))
+
+
+@pytest.mark.parametrize('filters, group_by, metric', QUERIES)
+def test_query_matches_pandas(datasets, filters, group_by, metric):
+    df, index = datasets
+    expected = reference(df, filters, group_by, metric)
+
+    result = index.query(filters, group_by, metric)
+    rows = list(result.rows)
+    groups = {tuple(row[dimension] for dimension in group_by): row[metric] for row in rows}
+
+    assert result.total == len(expected) == len(rows)
+    assert groups == pytest.approx(expected)
+    values = [row[metric] for row in rows]
+    assert values == sorted(values, reverse=True)
+
+
+def test_limit_above_query_max_groups_is_413(api_server, http_post):
+    with api_server(QUERY_MAX_GROUPS='10') as (_, port):
+        status, body = http_post(port, '/consulta', {'agrupar': ['genres'], 'limite': 11})
+        assert status == 413, body
+        status, body = http_post(port, '/consulta', {'agrupar': ['genres'], 'limite': 10})
+        assert status == 200 and len(body['grupos']) <= 10 and body['grupos_total'] >= len(body['grupos'])
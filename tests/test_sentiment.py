@@ -0,0 +1,35 @@
+"""
+SentimentScorer: mismas etiquetas que classify_sentiment reseña por reseña y caché por versión de TextBlob.
+"""
+
+import pandas as pd
+
+import sentiment
+from bench_sentiment import generate_reviews
+from sentiment import SentimentScorer, classify_sentiment
+
+
+def test_labels_match_per_row_apply():
+    reviews = generate_reviews(400, seed=1) + [None, float('nan'), 10, '', "It's \"ok\" I guess"]
+    expected = pd.Series(reviews, dtype=object).apply(classify_sentiment).tolist()
+    with SentimentScorer(workers=2, chunk_size=32) as scorer:
+        labels = [label for start in range(0, len(reviews), 100)
+                  for label in scorer.score(reviews[start:start + 100])]
+    assert labels == expected
+    assert scorer.classified == scorer.unique < scorer.reviews
+
+
+def test_cache_is_reused_and_wiped_when_version_changes(tmp_path, monkeypatch):
+    cache_path = str(tmp_path / 'sentiment.sqlite')
+    reviews = generate_reviews(50, seed=2)
+    with SentimentScorer(cache_path, workers=1) as scorer:
+        labels = scorer.score(reviews)
+
+    with SentimentScorer(cache_path, workers=1) as scorer:
+        assert scorer.score(reviews) == labels
+        assert scorer.classified == 0 and scorer.cached == scorer.unique
+
+    monkeypatch.setattr(sentiment, '_cache_version', lambda: 'otra-version-de-textblob')
+    with SentimentScorer(cache_path, workers=1) as scorer:
+        assert scorer.score(reviews) == labels
+        assert scorer.cached == 0 and scorer.classified == scorer.unique
@@ -0,0 +1,39 @@
+"""
+Los workers de serve.py comparten los arreglos del modelo mapeados desde el archivo (ver bench_workers.py).
+"""
+
+import json
+import os
+
+import pytest
+
+from bench_workers import check, children, load_test, smaps
+
+pytestmark = pytest.mark.skipif(not os.path.exists('/proc/self/smaps'), reason='requiere /proc/<pid>/smaps')
+
+
+def test_model_pages_are_shared_between_workers(artifacts, api_server):
+    _, models_dir, version = artifacts
+    prefix = os.path.join(os.path.abspath(models_dir), version) + os.sep
+    with open(os.path.join(prefix, 'manifest.json'), encoding='utf-8') as file:
+        expected = {name + '.npy' for name in json.load(file)['arrays']}
+
+    with api_server(workers=2) as (server, port):
+        # Peticiones hasta que los dos workers hayan cargado las páginas de los perfiles y de las matrices TF-IDF
+        # (el sistema operativo reparte las conexiones entre ellos); con k=100 los vecinos ítem-ítem pasan de los
+        # guardados en el índice y se calculan con model.item_similarity
+        paths = ['/recomendacion-item/1250', '/recomendacion-item/1250?k=100',
+                 '/recomendacion-usuario/76561197970982479']
+        touched = ['user_profiles.npy', 'item_similarity_data.npy', 'item_similarity_transposed_data.npy']
+        pids = children(server.pid)
+        for _ in range(20):
+            load_test(port, paths, 0.5, 8)
+            files = {pid: smaps(pid, prefix)[1] for pid in pids}
+            if all(worker_files.get(name, {}).get('Rss') for worker_files in files.values() for name in touched):
+                break
+
+    assert len(pids) == 2
+    assert {'item_similarity_data.npy', 'item_similarity_transposed_indptr.npy'} <= expected
+    for worker_files in files.values():
+        assert all(worker_files[name]['Rss'] for name in touched)
+    assert check(2, files, expected) == []